@@ -0,0 +1,53 @@
+# Gunicorn configuration for serving WatchIT in production
+import multiprocessing
+import os
+import subprocess
+import sys
+
+# Bind to the same port as the development server
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Make the `services` package and the `app` module importable
+pythonpath = "src"
+
+# Threaded workers: each thread serves one request. In async serving mode
+# (WATCHIT_ASYNC_MODE=true) threads only wait for results from the worker's
+# shared event loop, so a high thread count stays cheap and lets a single
+# process keep hundreds of slow upstream requests in flight.
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "256" if os.getenv("WATCHIT_ASYNC_MODE") == "true" else "8"))
+
+# Every worker hashes passwords in its own process pool: split the CPUs between
+# them (services.password_hasher.default_pool_size) unless set explicitly
+os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Requests waiting on TMDb are bounded by the client timeouts, keep some headroom
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Do not preload: thread pools, event loops and database clients must be
+# created in each worker after the fork
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """
+    Calibrate the bcrypt cost once for every worker, then create the indexes and
+    verify the query plans once per deployment, in a separate process so the
+    master never opens database connections before forking.
+    """
+    source_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+    if os.getenv("BCRYPT_ROUNDS") == "auto":
+        # Workers inherit the result instead of each timing bcrypt at import, all at once
+        sys.path.insert(0, source_dir)
+        from services.password_hasher import calibrate_rounds
+        os.environ["BCRYPT_ROUNDS"] = str(calibrate_rounds(float(os.getenv("BCRYPT_TARGET_MS", "250"))))
+
+    if os.getenv("WATCHIT_INIT_DB", "true") != "true" or os.getenv("TEST_ENV"):
+        return
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "init-db"], cwd=source_dir, check=True)
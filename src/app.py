@@ -1,14 +1,40 @@
+import asyncio
+import codecs
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from json import dumps
 import os
 from flask import Flask, g, json, jsonify, request
 import logging
 import tempfile
-from pymongo import MongoClient
-from flask_jwt_extended import JWTManager, get_jwt, jwt_required, get_jwt_identity, create_access_token
-from flask import render_template, redirect, url_for, session
+from pymongo import AsyncMongoClient, MongoClient
+import requests
+from flask_jwt_extended import JWTManager, get_jwt, jwt_required, get_jwt_identity, create_access_token, decode_token
+from flask import render_template, redirect, url_for, session, send_file, Response, stream_with_context
+from markupsafe import Markup
+from services.async_runtime import AsyncRuntime, resolve
+from services.async_tmdb_service import AsyncTMDbService
+from services.api_serialization import (CONTENT_ENCODINGS, FastJSONProvider, compress_response, orjson, parse_fields,
+                                         select_fields)
+from services.async_user_service import AsyncUserService
+from services.cache_service import MongoCache, TieredCache, TTLCache
+from services.http_cache import content_hash, directory_hash, make_etag
+from services.image_proxy import ImageProxy, ImageStore
+from services.item_similarity import FEEDBACK_LISTS, ItemSimilarityService
+from services.movie_service import MovieService, tmdb_keyed
+from services.pagination import page_limit
+from services.password_hasher import (DEFAULT_ROUNDS, HasherBusyError, PasswordHasher, calibrate_rounds,
+                                      default_pool_size)
+from services.query_plans import verify_query_plans
+from services.recommendation_service import PROFILE_WEIGHTS, RecommendationService, load_catalog
+from services.search_cache import SearchCache
+from services.search_index import SearchIndex
+from services.static_assets import StaticAssets
+from services.tmdb_mirror import TMDbMirror
 from services.tmdb_service import TMDbService
-from services.user_service import UserService
+from services.token_blocklist import TokenBlocklist
+from services.transfer_format import FORMATS, parse_list_entries, read_records, write_records
+from services.user_service import DEFAULT_LISTS, USER_NOT_FOUND, UserService
 from datetime import timedelta
 import json 
 
@@ -17,13 +43,14 @@ import json
 # Flask application setup
 app = Flask(__name__)
 
-# Set for managing token blacklist
-blacklist = set()
-
 # JWT configuration
 app.secret_key = os.getenv("JWT_SECRET_KEY")
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)  # Token expires in 1 hour
+
+# Faster JSON encoding for the API responses, with the same output as the default provider
+if orjson is not None:
+    app.json = FastJSONProvider(app)
 jwt = JWTManager(app)
 
 # MongoDB setup
@@ -32,9 +59,216 @@ MONGO_URI = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
 client = MongoClient(MONGO_URI)
 db = client["watchit_db"]
 
+# Revoked tokens, shared by every worker and expired together with the tokens
+blacklist = TokenBlocklist(
+    db["revoked_tokens"],
+    capacity=int(os.getenv("REVOKED_TOKENS_CAPACITY", "100000")),
+    refresh_interval=float(os.getenv("REVOKED_TOKENS_REFRESH", "5")),
+)
+
+# Movie details cache: per-process LRU (L1) backed by a collection shared by all workers (L2)
+TMDB_CACHE_SIZE = int(os.getenv("TMDB_CACHE_SIZE", "2048"))
+TMDB_CACHE_TTL = int(os.getenv("TMDB_CACHE_TTL", "3600"))  # Seconds an entry is fresh
+TMDB_CACHE_STALE_TTL = int(os.getenv("TMDB_CACHE_STALE_TTL", "86400"))  # Seconds a stale entry can still be served
+TMDB_CACHE_STARTUP_MOVIES = int(os.getenv("TMDB_CACHE_STARTUP_MOVIES", "5000"))  # Most recent entries loaded at startup
+tmdb_cache = TieredCache(
+    TTLCache(max_size=TMDB_CACHE_SIZE, ttl=TMDB_CACHE_TTL, stale_ttl=TMDB_CACHE_STALE_TTL),
+    MongoCache(db["tmdb_cache"], ttl=TMDB_CACHE_TTL, stale_ttl=TMDB_CACHE_STALE_TTL),
+)
+
+# Search results cache keyed by normalized query
+search_cache = SearchCache(
+    max_bytes=int(os.getenv("TMDB_SEARCH_CACHE_BYTES", str(8 * 1024 * 1024))),
+    ttl=int(os.getenv("TMDB_SEARCH_CACHE_TTL", "600")),
+    prefix_reuse=os.getenv("TMDB_SEARCH_PREFIX_REUSE") == "true",  # Serve refined queries from cached prefixes
+)
+
+# Local full-text index over the catalog and the cached TMDb records
+search_index = SearchIndex()
+
+# Content-based recommendations over the bundled catalog, the movies collection and the cached TMDb records
+RECOMMENDATION_CATALOG = os.getenv(
+    "RECOMMENDATION_CATALOG", os.path.join(os.path.dirname(__file__), "data", "movies.json")
+)
+recommendation_service = RecommendationService()
+
+# Per-user recommendations, dropped as soon as the user's lists change
+recommendation_cache = TTLCache(
+    max_size=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("RECOMMENDATION_CACHE_TTL", "30")),
+)
+
+# Short-lived per-process user cache; the lists are stored apart, so list updates do not touch it
+user_cache = TTLCache(
+    max_size=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "5")),
+)
+
+# Rendered movie summaries, shared by every user and keyed by the content of the TMDb record,
+# so an updated record is rendered again while the user's list statuses are merged per request
+fragment_cache = TTLCache(
+    max_size=int(os.getenv("FRAGMENT_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("FRAGMENT_CACHE_TTL", "3600")),
+)
+
+# Fingerprinted static assets, built by `services.static_assets` before deploying
+static_assets = StaticAssets()
+
+# Part of every page ETag, so pages cached by browsers are rendered again after a template or asset change
+TEMPLATES_VERSION = make_etag(directory_hash(os.path.join(app.root_path, app.template_folder)), static_assets.version)
+
+# Password hashing in a dedicated process pool; BCRYPT_ROUNDS=auto calibrates the cost on this machine.
+# Under gunicorn both are set once for the host by gunicorn.conf.py, before the workers start.
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS", str(DEFAULT_ROUNDS))
+password_hasher = PasswordHasher(
+    rounds=calibrate_rounds(float(os.getenv("BCRYPT_TARGET_MS", "250"))) if BCRYPT_ROUNDS == "auto" else int(BCRYPT_ROUNDS),
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS") or default_pool_size(int(os.getenv("GUNICORN_WORKERS", "1")))),
+    max_pending=int(os.getenv("PASSWORD_HASH_QUEUE", "64")),
+)
+
 # Service initialization
-tmdb_service = TMDbService() # Service to interact with TMDb API
-user_service = UserService(db["users"]) # User management service
+tmdb_mirror = TMDbMirror(db["movies"]) # Local copy of the TMDb catalog, kept up to date by `services.tmdb_mirror`
+tmdb_service = TMDbService(cache=tmdb_cache, search_cache=search_cache, search_index=search_index,
+                           recommendations=recommendation_service, mirror=tmdb_mirror) # Service to interact with TMDb API
+user_service = UserService(db["users"], user_cache=user_cache, password_hasher=password_hasher) # User management service
+movie_service = MovieService(db["movies"], search_index=search_index) # Local movie catalog service
+image_proxy = ImageProxy(ImageStore()) # Poster thumbnails served from a disk cache
+
+# List changes refresh the recommendations incrementally. Co-occurrence updates run on a
+# single background thread, so they are applied in order without delaying the request;
+# stale "because you liked" neighbors are recomputed on the same thread after their reads.
+list_change_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="list-changes")
+item_similarity = ItemSimilarityService(user_service.entries_collection, db["item_neighbors"], db["item_cooccurrence"],
+                                        executor=list_change_executor) # "Because you liked" neighbors
+
+
+def on_profile_change(event):
+    """
+    Invalidates the user's cached recommendations.
+    """
+    recommendation_cache.delete(event["username"])
+
+
+def on_feedback_change(event):
+    """
+    Updates the item co-occurrence counts on the background thread, which reads the user's
+    feedback lists itself, so the request does not.
+    """
+    list_change_executor.submit(item_similarity.apply_change, event)
+
+
+user_service.subscribe(on_profile_change, lists=list(PROFILE_WEIGHTS))
+user_service.subscribe(on_feedback_change, lists=FEEDBACK_LISTS)
+
+def init_database(verify_plans=None):
+    """
+    Creates the indexes, moves the lists still embedded in user documents to the
+    list entries, and fails if a hot query would scan a whole collection.
+    Run once per deployment before the workers start, with `flask --app app init-db`
+    (see gunicorn.conf.py), instead of on import in every worker.
+
+    Args:
+        verify_plans (bool): Whether to check the query plans with `explain()`. By default
+            they are checked unless VERIFY_QUERY_PLANS=false or TEST_ENV is set.
+    """
+    user_service.ensure_indexes()
+    movie_service.ensure_indexes()
+    tmdb_mirror.ensure_indexes()
+    tmdb_cache.l2.ensure_indexes()
+    blacklist.ensure_indexes()
+    item_similarity.ensure_indexes()
+    user_service.migrate_embedded_lists()
+    if verify_plans is None:
+        verify_plans = os.getenv("VERIFY_QUERY_PLANS", "true") == "true" and not os.getenv("TEST_ENV")
+    if verify_plans:
+        verify_query_plans(
+            user_service.get_hot_queries() + movie_service.get_hot_queries() + tmdb_mirror.get_hot_queries()
+            + item_similarity.get_hot_queries()
+        )
+
+
+@app.cli.command("init-db")
+def init_database_command():
+    """
+    Create the indexes and verify the query plans of the hot queries.
+    """
+    init_database()
+    logger.info("Database initialized")
+
+
+def load_startup_movies():
+    """
+    Loads the movies of the search index and the recommendations, keyed by TMDb ID like the
+    lists and the details pages: the bundled catalog movies that have a TMDb ID, a bounded
+    number of the most popular mirrored movies, and of the most recently cached TMDb records,
+    freshest last.
+    If MongoDB cannot be read, the app still starts with the bundled catalog only.
+
+    Returns:
+        list: Movies in the TMDb API format.
+    """
+    movies = list(tmdb_keyed(load_catalog(RECOMMENDATION_CATALOG)))
+    try:
+        movies += list(tmdb_mirror.iter_movies())
+        movies += reversed(list(tmdb_cache.l2.iter_values(limit=TMDB_CACHE_STARTUP_MOVIES)))
+    except Exception as e:
+        logging.getLogger("WatchIT").warning(f"Loading only the bundled catalog at startup: {e}")
+    return movies
+
+
+# Build the search index and the recommendation features
+startup_movies = load_startup_movies()
+search_index.add_many(startup_movies)
+recommendation_service.build(startup_movies)
+
+# Clients awaited by the I/O-bound async views. By default they are the blocking services,
+# called in place except for the calls a view gathers, which run in threads so they overlap;
+# in async serving mode the views run on a shared event loop and await async clients instead,
+# so a worker thread is not pinned while TMDb or MongoDB answer.
+ASYNC_MODE = os.getenv("WATCHIT_ASYNC_MODE") == "true"
+tmdb_client = tmdb_service
+user_client = user_service
+if ASYNC_MODE:
+    async_runtime = AsyncRuntime()
+    app.async_to_sync = async_runtime.async_to_sync
+    tmdb_client = AsyncTMDbService(cache=tmdb_cache, search_cache=search_cache, search_index=search_index,
+                                   recommendations=recommendation_service, mirror=tmdb_mirror)
+    user_client = AsyncUserService(AsyncMongoClient(MONGO_URI)["watchit_db"]["users"], user_cache=user_cache)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking call (MongoDB queries, searching, rendering) from an async view.
+    In async serving mode it runs in a worker thread, so the shared event loop keeps
+    serving the other requests meanwhile; otherwise the view has its own loop and
+    the call runs in place.
+
+    Args:
+        func (callable): The blocking function.
+
+    Returns:
+        The result of the call.
+    """
+    if ASYNC_MODE:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+
+async def call_client(method, *args):
+    """
+    Calls a client method from an async view, for calls gathered with others. Async
+    clients are awaited; the blocking ones run in a worker thread, so the calls of a
+    gather overlap instead of running one after the other.
+
+    Args:
+        method (callable): Method of `tmdb_client` or `user_client`.
+
+    Returns:
+        The result of the call.
+    """
+    if ASYNC_MODE:
+        return await resolve(method(*args))
+    return await asyncio.to_thread(method, *args)
 
 
 
@@ -67,6 +301,47 @@ logger = logging.getLogger("WatchIT")
 def inject_user():
     g.user_logged_in = "token" in session
 
+    # Request-scoped identity and user, filled lazily by current_identity() and current_user()
+    g.identity = None
+    g.user = None
+
+
+# After request: compress large JSON and HTML responses for the clients accepting it
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
+
+def current_identity():
+    """
+    Returns the decoded JWT identity of the request, parsing it only once per request.
+    Must be called from a view protected by `jwt_required`.
+    """
+    if g.identity is None:
+        identity = get_jwt_identity()
+        if identity:
+            g.identity = json.loads(identity) if isinstance(identity, str) else identity
+    return g.identity
+
+
+def current_username():
+    """
+    Returns the username of the authenticated user, or None if the request is anonymous.
+    """
+    identity = current_identity()
+    return identity.get("username") if identity else None
+
+
+def current_user():
+    """
+    Returns the authenticated user, fetched at most once per request.
+    """
+    if g.user is None:
+        username = current_username()
+        if username:
+            g.user = user_service.get_user(username)
+    return g.user
+
 
 # Decorator for role-based access
 def role_required(role):
@@ -77,8 +352,8 @@ def role_required(role):
         @wraps(func)
         @jwt_required()
         def wrapper(*args, **kwargs):
-            identity = get_jwt_identity()
-            if identity.get("role") != role:
+            identity = current_identity()
+            if not identity or identity.get("role") != role:
                 return jsonify({"error": "Unauthorized"}), 403
             return func(*args, **kwargs)
         return wrapper
@@ -105,7 +380,7 @@ def check_if_token_in_blacklist(jwt_header, jwt_payload):
     Verifies if a token is revoked by checking the blacklist.
     """
     jti = jwt_payload["jti"]  # Unique identifier for a JWT
-    return jti in blacklist
+    return blacklist.is_revoked(jti)
 
 # Callback for revoked tokens
 @jwt.revoked_token_loader
@@ -131,7 +406,10 @@ def register_view():
         if not username or not password:
             return render_template("register.html", error="Username and password are required"), 400
 
-        result, status = user_service.create_user(username, password)
+        try:
+            result, status = user_service.create_user(username, password)
+        except HasherBusyError:
+            return render_template("register.html", error="The server is busy, please try again later"), 503
         if status == 201:
             return render_template("register.html", success="Registration successful! Please log in.")
         else:
@@ -148,12 +426,7 @@ def me():
     Fetches the details of the currently authenticated user.
     """
     try:
-        identity = get_jwt_identity()
-        logger.info(f"Raw token identity: {identity}")
-        identity = json.loads(identity)  # Deserialize JSON into a dictionary
-        logger.info(f"Deserialized identity: {identity}")
-
-        user = user_service.get_user(identity["username"])
+        user = current_user()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -163,6 +436,75 @@ def me():
         return jsonify({"error": "An unexpected error occurred"}), 500
 
 
+# Session state for the pages, answered from the token alone
+@app.route("/auth/session", methods=["GET"])
+@jwt_required(optional=True)
+def auth_session():
+    """
+    Lightweight session check made by the pages once per token, without querying the database.
+    Invalid, expired and revoked tokens are rejected with 401.
+
+    Returns:
+        JSON response with `authenticated` and, for an authenticated user, the username,
+        the role and the expiry time of the token.
+    """
+    identity = current_identity()
+    if not identity:
+        response = jsonify({"authenticated": False})
+    else:
+        response = jsonify({
+            "authenticated": True,
+            "username": identity.get("username"),
+            "role": identity.get("role"),
+            "expires": get_jwt()["exp"],
+        })
+    response.headers["Cache-Control"] = "no-store"
+    return response, 200
+
+
+@app.template_global()
+def asset_url(name):
+    """
+    Returns the URL of a static asset, fingerprinted if the assets were built.
+
+    Args:
+        name (str): Path of the asset relative to the static directory, e.g. "js/base.js".
+
+    Returns:
+        str: The URL of the built asset, or of the static file without a build.
+    """
+    built_name = static_assets.built_name(name)
+    if built_name is None:
+        return url_for("static", filename=name)
+    return url_for("asset_view", filename=built_name)
+
+
+# Built static assets, precompressed and cached for a year
+@app.route("/assets/<path:filename>", methods=["GET"])
+def asset_view(filename):
+    """
+    Serves a fingerprinted static asset, as its brotli or gzip variant when the client accepts it.
+
+    Args:
+        filename (str): Fingerprinted path of the asset.
+
+    Returns:
+        The asset with immutable cache headers, or 404 if it is not part of the build.
+    """
+    asset = static_assets.resolve(filename, request.accept_encodings)
+    if asset is None:
+        return jsonify({"error": "Asset not found"}), 404
+
+    path, mimetype, encoding = asset
+    response = send_file(path, mimetype=mimetype, etag=make_etag(filename, encoding), max_age=IMMUTABLE_MAX_AGE,
+                         conditional=True)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.immutable = True
+    return response
+
+
 # Home route
 @app.route('/')
 def index():
@@ -201,6 +543,9 @@ def login_view():
 
             # Invalid credentials
             return jsonify({"error": "Invalid credentials"}), 401
+        except HasherBusyError as e:
+            logger.warning(f"Login rejected: {e}")
+            return jsonify({"error": "The server is busy, please try again later"}), 503
         except Exception as e:
             logger.error(f"Error during login: {e}")
             return jsonify({"error": "An unexpected error occurred"}), 500
@@ -212,17 +557,24 @@ def login_view():
 @login_required
 def logout_view():
     """
-    Logs out the user by removing their session token.
+    Logs out the user by removing their session token and revoking it,
+    so it is rejected by every worker until it expires.
     """
-    session.pop("token", None)  # Remove token from session
+    token = session.pop("token", None)  # Remove token from session
+    try:
+        claims = decode_token(token, allow_expired=True)
+        blacklist.add(claims["jti"], claims["exp"])
+    except Exception as e:
+        logger.warning(f"Could not revoke the session token on logout: {e}")
     return jsonify({"message": "Logged out successfully"}), 200
 
 
 # Movie search route
 @app.route('/movies/search', methods=['GET'])
-def search_movies():
+async def search_movies():
     """
-    Endpoint to search for movies using the TMDb API.
+    Endpoint to search for movies, answered from the local search index
+    and falling back to the TMDb API when nothing matches locally.
 
     Query Parameters:
         query (str): Search term.
@@ -237,20 +589,78 @@ def search_movies():
     
 
     try:
-        movies = tmdb_service.search_movies(query)
-        return render_template("index.html", movies=movies, query=query)
+        movies = await run_blocking(search_index.search, query)
+        if not movies:
+            movies = await resolve(tmdb_client.search_movies(query))
+        return await run_blocking(render_template, "index.html", movies=movies, query=query)
     except Exception as e:
         logger.error(f"Error searching for movies: {e}")
         return render_template("index.html", error=str(e))
     
+def cache_headers(response, etag):
+    """
+    Marks a response as cacheable by the browser, which must revalidate it with its ETag.
+
+    Args:
+        response (Response): The response to update.
+        etag (str): Entity tag of the response body.
+
+    Returns:
+        Response: The updated response.
+    """
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Authorization")
+    return response
+
+
+def not_modified(etag):
+    """
+    Answers a conditional GET whose cached copy is still current, before any rendering.
+
+    Args:
+        etag (str): Entity tag of the current response body.
+
+    Returns:
+        Response or None: An empty 304 response, or None if the body must be sent.
+    """
+    # Compressed responses carry the ETag of their encoding, see `compress_response`
+    for candidate in (etag, *(f"{etag}-{encoding}" for encoding in CONTENT_ENCODINGS)):
+        if request.if_none_match.contains_weak(candidate):
+            return cache_headers(Response(status=304), candidate)
+    return None
+
+
+def render_movie_summary(movie):
+    """
+    Renders the user-independent part of the movie details page, reusing the
+    fragment rendered for the same TMDb content.
+
+    Args:
+        movie (dict): The movie details.
+
+    Returns:
+        Markup: The rendered fragment.
+    """
+    key = f"{movie.get('id')}:{content_hash(movie)}"
+    summary = fragment_cache.get(key)
+    if summary is None:
+        summary = Markup(render_template("movie_summary.html", movie=movie))
+        fragment_cache.set(key, summary)
+    return summary
+
+
 # Fetch movie details and user-specific list statuses
 @app.route('/movies/details/<int:movie_id>', methods=['GET'])
 @jwt_required(optional=True)
-def movie_details(movie_id):
+async def movie_details(movie_id):
     """
     Retrieves detailed information about a specific movie
     and checks the user's list statuses for that movie.
 
+    The page ETag is derived from the movie content and the version of the user's
+    lists, so a browser revalidating an unchanged page gets an empty 304 response.
+
     Args:
         movie_id (int): The ID of the movie to retrieve details for.
 
@@ -258,27 +668,83 @@ def movie_details(movie_id):
         Rendered HTML page with movie details and list statuses.
     """
     try:
-        # Fetch movie details from TMDb API
-        movie = tmdb_service.get_movie_details(movie_id)
-        lists_status = {"favorites": False, "watched": False, "to_watch": False}
+        lists_status = {list_name: False for list_name in DEFAULT_LISTS}
 
         # Check if the user is authenticated
-        if get_jwt():
-            identity = get_jwt_identity()
-            username = json.loads(identity).get("username")
-            user = user_service.get_user(username)
-            if user:
-                # Check if the movie is in the user's lists
-                user_lists = user.get("lists", {})
-                for list_name in lists_status.keys():
-                    lists_status[list_name] = movie_id in user_lists.get(list_name, [])
+        username = current_username() if get_jwt() else None
+
+        # Fetch movie details from TMDb API and the version of the user's lists concurrently
+        movie, list_version = await asyncio.gather(
+            call_client(tmdb_client.get_movie_details, movie_id),
+            call_client(user_client.get_list_version, username) if username else resolve(None),
+        )
+        etag = make_etag("details", TEMPLATES_VERSION, movie_id, content_hash(movie), username, list_version)
+        response = not_modified(etag)
+        if response:
+            return response
+
+        # Merge the movie's list membership into the cached movie summary
+        user_status = await resolve(user_client.get_list_status(username, movie_id)) if list_version is not None else None
+        if user_status:
+            lists_status.update(user_status)
 
         # Render the movie details page
-        return render_template("details.html", movie=movie, lists_status=lists_status)
+        summary = await run_blocking(render_movie_summary, movie)
+        page = await run_blocking(render_template, "details.html", movie=movie, summary=summary,
+                                  lists_status=lists_status)
+        return cache_headers(app.make_response(page), etag)
     except Exception as e:
         logger.error(f"Error in movie details: {e}")
         return jsonify({"error": "Unable to fetch movie details"}), 500
 
+# Images and built assets never change under the same URL, so browsers and proxies may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+@app.template_global()
+def poster_url(poster_path, size="w342"):
+    """
+    Returns the URL of a poster thumbnail served by the image proxy.
+
+    Args:
+        poster_path (str): TMDb image path, e.g. "/abc.jpg".
+        size (str): Thumbnail width, one of `THUMBNAIL_WIDTHS`.
+
+    Returns:
+        str: The proxy URL, or an empty string if the movie has no poster.
+    """
+    if not poster_path:
+        return ""
+    return url_for("image_view", size=size, path=poster_path.lstrip("/"))
+
+
+# Poster thumbnails, downloaded from TMDb once and resized on demand
+@app.route("/img/<size>/<path>", methods=["GET"])
+def image_view(size, path):
+    """
+    Serves a TMDb image at one of the fixed thumbnail widths from the disk cache.
+
+    Args:
+        size (str): Thumbnail width, e.g. "w342", or "original".
+        path (str): TMDb image path, without the leading slash.
+
+    Returns:
+        The image with immutable cache headers, 404 if it does not exist,
+        or 502 if TMDb cannot be reached.
+    """
+    try:
+        digest, file, mimetype = image_proxy.open_image(size, path)
+    except (ValueError, LookupError):
+        return jsonify({"error": "Image not found"}), 404
+    except requests.RequestException as e:
+        logger.error(f"Error fetching image {size}/{path}: {e}")
+        return jsonify({"error": "Unable to fetch image"}), 502
+
+    response = send_file(file, mimetype=mimetype, etag=digest, max_age=IMMUTABLE_MAX_AGE, conditional=True)
+    response.cache_control.immutable = True
+    return response
+
+
 # Add a movie to a user's list
 @app.route("/movies/add_to_list", methods=["POST"])
 @jwt_required()
@@ -304,17 +770,12 @@ def add_to_list():
             return jsonify({"error": "Missing 'movie_id' or 'list' in request body"}), 400
 
         # Get user identity from JWT
-        identity = get_jwt_identity()
-        identity_dict = json.loads(identity) if isinstance(identity, str) else identity
-        username = identity_dict.get("username")
+        username = current_username()
 
-        # Fetch the user
-        user = user_service.get_user(username)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-
-        # Add the movie to the specified list
+        # Add the movie to the specified list; the update also reports whether the user exists
         response = user_service.add_movie_to_list(username, int(movie_id), list_name)
+        if response.get("error") == USER_NOT_FOUND:
+            return jsonify(response), 404
         if "error" in response:
             return jsonify(response), 400
 
@@ -349,23 +810,14 @@ def remove_from_list():
             return jsonify({"error": "Missing 'movie_id' or 'list' in request body"}), 400
 
         # Get user identity from JWT
-        identity = get_jwt_identity()
-        if isinstance(identity, str):  # Deserializa si es una cadena
-            identity_dict = json.loads(identity)
-        else:
-            identity_dict = identity  # Ya es un diccionario
-
-        username = identity_dict.get("username")
+        username = current_username()
         logger.info(f"Username: {username}")
 
-        # Fetch the user
-        user = user_service.get_user(username)
-        if not user:
-            logger.error("User not found")
-            return jsonify({"error": "User not found"}), 404
-
-        # Remove the movie from the specified list
+        # Remove the movie from the specified list; the update also reports whether the user exists
         response = user_service.remove_movie_from_list(username, int(movie_id), list_name)
+        if response.get("error") == USER_NOT_FOUND:
+            logger.error("User not found")
+            return jsonify(response), 404
         if response.get("error"):
             logger.error(f"Error removing movie: {response['error']}")
             return jsonify(response), 400
@@ -377,39 +829,137 @@ def remove_from_list():
         logger.error(f"Unexpected error in remove_from_list: {e}")
         return jsonify({"error": str(e)}), 500
 
-# View movies in a specific user list
+# Maximum number of movies accepted by a bulk list request
+MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", "1000"))
+
+
+def bulk_list_update(update):
+    """
+    Validates a bulk list request and applies it with a single update.
+
+    Args:
+        update (callable): UserService bulk method taking the username and the lists.
+
+    Returns:
+        JSON response with the per-item results.
+    """
+    data = request.get_json(silent=True) or {}
+    lists = data.get("lists")
+    if not isinstance(lists, dict) or not all(isinstance(ids, list) for ids in lists.values()):
+        return jsonify({"error": "'lists' must map list names to lists of movie IDs"}), 400
+    if sum(len(ids) for ids in lists.values()) > MAX_BULK_ITEMS:
+        return jsonify({"error": f"At most {MAX_BULK_ITEMS} movies per request"}), 413
+
+    response = update(current_username(), lists)
+    if response.get("error") == USER_NOT_FOUND:
+        return jsonify(response), 404
+    if "error" in response:
+        return jsonify(response), 500
+    return jsonify(response), 200
+
+
+# Add many movies to several lists in one request
+@app.route("/movies/add_to_list/bulk", methods=["POST"])
+@jwt_required()
+def bulk_add_to_list():
+    """
+    Adds many movies to one or more user lists in a single update.
+
+    Request Body (JSON):
+        lists (dict): List name to IDs of the movies to add,
+            e.g. {"watched": [550, 680], "favorites": [550]}.
+
+    Returns:
+        JSON response with one result per movie and list ('added', 'unchanged' or 'error').
+    """
+    return bulk_list_update(user_service.add_movies_to_lists)
+
+
+# Remove many movies from several lists in one request
+@app.route("/movies/remove_from_list/bulk", methods=["POST"])
+@jwt_required()
+def bulk_remove_from_list():
+    """
+    Removes many movies from one or more user lists in a single update.
+
+    Request Body (JSON):
+        lists (dict): List name to IDs of the movies to remove.
+
+    Returns:
+        JSON response with one result per movie and list ('removed', 'unchanged' or 'error').
+    """
+    return bulk_list_update(user_service.remove_movies_from_lists)
+
+
+# View movies in a specific user list, one page at a time
 @app.route("/movies/list/<list_name>", methods=["GET"])
-@login_required
-def view_list(list_name):
+@jwt_required()
+async def view_list(list_name):
     """
-    Displays movies in a specific user list (e.g., favorites, watched, to_watch).
+    Returns a page of the movies in a specific user list (e.g., favorites, watched, to_watch,
+    or a custom list), in the order they were added.
 
     Args:
         list_name (str): The name of the list to display.
 
+    Query Parameters:
+        limit (int): Movies per page (default 20, at most 100).
+        cursor (str): Continuation token returned as `next` by the previous page.
+        fields (str): Comma-separated movie fields to return, e.g. "id,title,poster_path".
+
     Returns:
-        Rendered HTML page showing the list of movies.
+        JSON response with the movies of the page and the `next` token, null on the last page.
+        The first page also has the `count` of movies in the list.
     """
-    token = session.get("token")
-    if not token:
-        return redirect(url_for("login_view"))
-
-    # Get the user identity from the token
-    identity_json = get_jwt_identity()
-    identity = json.loads(identity_json)
-    username = identity["username"]
+    username = current_username()
 
-    # Validate the list name
-    if list_name not in ["favorites", "watched", "to_watch"]:
+    # Validate the list name; custom lists are only looked up when needed
+    if list_name not in DEFAULT_LISTS and list_name not in await resolve(user_client.get_list_names(username)):
         return jsonify({"error": f"Invalid list name '{list_name}'"}), 400
 
-    # Fetch the user and their list of movies
-    user = user_service.get_user(username)
-    if not user:
+    cursor = request.args.get("cursor")
+    try:
+        limit = page_limit(request.args.get("limit"))
+        fields = parse_fields(request.args.get("fields"))
+        page = await resolve(user_client.get_list_page(username, list_name, limit, cursor))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if page is None:
         return jsonify({"error": "User not found"}), 404
 
-    movies = user.get("lists", {}).get(list_name, [])
-    return render_template("list.html", movies=movies, list_name=list_name)
+    details, counts = await asyncio.gather(
+        call_client(tmdb_client.get_movie_details_many, page["movie_ids"]),
+        call_client(user_client.get_list_counts, username, [list_name]) if not cursor else resolve(None),
+    )
+    movies = select_fields([details[movie_id] for movie_id in page["movie_ids"] if details.get(movie_id)], fields)
+    response = {"list": list_name, "movies": movies, "next": page["next"]}
+    if counts is not None:
+        response["count"] = counts[list_name]
+    return jsonify(response), 200
+
+
+# Local catalog, one page at a time
+@app.route("/movies/catalog", methods=["GET"])
+def catalog_view():
+    """
+    Returns a page of the local movie catalog, ordered by movie ID.
+
+    Query Parameters:
+        limit (int): Movies per page (default 20, at most 100).
+        cursor (str): Continuation token returned as `next` by the previous page.
+        fields (str): Comma-separated movie fields to return, e.g. "id,title".
+
+    Returns:
+        JSON response with the movies of the page and the `next` token, null on the last page.
+    """
+    try:
+        limit = page_limit(request.args.get("limit"))
+        fields = parse_fields(request.args.get("fields"))
+        page = movie_service.get_movies_page(limit, request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    page["movies"] = select_fields(page["movies"], fields)
+    return jsonify(page), 200
 
 
 # Admin endpoint to create custom lists
@@ -417,7 +967,7 @@ def view_list(list_name):
 @role_required("admin")
 def create_custom_list():
     """
-    Admin-only endpoint to create a custom list.
+    Admin-only endpoint to create a custom list available to every user.
 
     Request Body (JSON):
         list_name (str): The name of the new custom list.
@@ -425,13 +975,31 @@ def create_custom_list():
     Returns:
         JSON response indicating success or failure.
     """
-    data = request.json
-    list_name = data.get("list_name")
-    if not list_name:
-        return jsonify({"error": "List name is required"}), 400
+    data = request.get_json(silent=True) or {}
+    try:
+        result, status = user_service.create_custom_list(data.get("list_name"))
+        return jsonify(result), status
+    except Exception as e:
+        logger.error(f"Error creating custom list: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# Create a custom list for the current user
+@app.route("/lists/custom", methods=["POST"])
+@jwt_required()
+def create_user_list():
+    """
+    Creates a custom list only visible to the current user.
+
+    Request Body (JSON):
+        list_name (str): The name of the new list.
+
+    Returns:
+        JSON response indicating success or failure.
+    """
+    data = request.get_json(silent=True) or {}
     try:
-        UserService.create_custom_list(list_name)
-        return jsonify({"message": f"Custom list {list_name} created"}), 201
+        result, status = user_service.create_custom_list(data.get("list_name"), owner=current_username())
+        return jsonify(result), status
     except Exception as e:
         logger.error(f"Error creating custom list: {e}")
         return jsonify({"error": str(e)}), 500
@@ -439,55 +1007,303 @@ def create_custom_list():
 # Display all user lists with detailed movie information
 @app.route("/lists", methods=["GET"])
 @jwt_required()
-def lists_view():
+async def lists_view():
     """
-    Displays all user lists (favorites, watched, to_watch) with detailed movie information.
+    Displays the first page of every user list (favorites, watched, to_watch
+    and the custom lists) with detailed movie information.
+
+    Query Parameters:
+        limit (int): Movies per list (default 20, at most 100).
+        format (str): "json" for a JSON response instead of the HTML page.
+        fields (str): Comma-separated movie fields of the JSON response, e.g. "id,title,poster_path".
 
     Returns:
-        Rendered HTML page with lists and movie details.
+        Rendered HTML page with lists and movie details, revalidated with an ETag
+        derived from the version of the user's lists.
     """
     try:
         app.logger.info(f"Authorization Header: {request.headers.get('Authorization')}")
 
         # Get user identity from JWT
-        identity = get_jwt_identity()
-        app.logger.info(f"Identity from token: {identity}")
+        username = current_username()
+        app.logger.info(f"Username: {username}")
 
-        if not identity:
+        if not username:
             return jsonify({"error": "Unauthorized"}), 401
 
-        identity_dict = identity if isinstance(identity, dict) else json.loads(identity)
-        username = identity_dict.get("username")
-        app.logger.info(f"Username: {username}")
+        try:
+            limit = page_limit(request.args.get("limit"))
+        except ValueError:
+            return jsonify({"error": "'limit' must be an integer"}), 400
+        try:
+            fields = parse_fields(request.args.get("fields"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # Fetch the user from the database
-        user = user_service.get_user(username)
-        if not user:
+        # Unchanged lists render the same page: answer a revalidation before fetching anything else
+        list_version = await resolve(user_client.get_list_version(username))
+        if list_version is None:
             return jsonify({"error": "User not found"}), 404
+        etag = make_etag("lists", TEMPLATES_VERSION, username, list_version, request.full_path)
+        response = not_modified(etag)
+        if response:
+            return response
+
+        # Fetch the first page of every list the user can use
+        list_names = await resolve(user_client.get_list_names(username))
+        pages = await resolve(user_client.get_first_list_pages(username, list_names, limit))
+        if pages is None:
+            return jsonify({"error": "User not found"}), 404
+
+        # Fetch detailed movie information for every page in one concurrent batch
+        movie_ids = [movie_id for page in pages.values() for movie_id in page["movie_ids"]]
+        details = await resolve(tmdb_client.get_movie_details_many(movie_ids))
 
-        user_lists = user.get("lists", {})
         all_lists = {}
+        next_pages = {}
+        for list_name, page in pages.items():
+            all_lists[list_name] = [details[movie_id] for movie_id in page["movie_ids"] if details.get(movie_id)]
+            if page["next"]:
+                next_pages[list_name] = url_for("view_list", list_name=list_name, limit=limit, cursor=page["next"])
 
-        # Fetch detailed movie information for each list
-        for list_name, movie_ids in user_lists.items():
-            all_lists[list_name] = []
-            for movie_id in movie_ids:
-                tmdb_response = tmdb_service.get_movie_details(movie_id)
-                if tmdb_response:
-                    all_lists[list_name].append(tmdb_response)
-                    
-        # Check for `format=json` query parameter
+        # Check for `format=json` query parameter; the following pages are linked from the headers
         if request.args.get("format") == "json":
-            return jsonify(all_lists), 200
-
-        # Render the lists page
-        return render_template("lists.html", title="My Lists", lists=all_lists)
+            links = ", ".join(f'<{url}>; rel="next"; title="{name}"' for name, url in next_pages.items())
+            response = jsonify({list_name: select_fields(movies, fields) for list_name, movies in all_lists.items()})
+            if links:
+                response.headers["Link"] = links
+            return cache_headers(response, etag)
+
+        # Render the lists page with the size of each list
+        counts = await resolve(user_client.get_list_counts(username, list_names))
+        page = await run_blocking(render_template, "lists.html", title="My Lists", lists=all_lists,
+                                  next_pages=next_pages, counts=counts)
+        return cache_headers(app.make_response(page), etag)
     except Exception as e:
         app.logger.error(f"Error in /lists: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
 
+# Recommendations based on the user's favorite and watched movies
+@app.route("/recommendations", methods=["GET"])
+@jwt_required()
+def recommendations_view():
+    """
+    Recommends movies similar to the user's favorites and watched movies,
+    leaving out the movies the user already has in those lists.
+
+    Query Parameters:
+        limit (int): Maximum number of recommendations (default 20, at most 100).
+        fields (str): Comma-separated movie fields to return, e.g. "id,title".
+
+    Returns:
+        JSON response with the recommended movies, best first.
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer"}), 400
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        user = current_user()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        # Computed for the largest limit once, then sliced for every request until the lists change
+        movies = recommendation_cache.get(user["username"])
+        if movies is None:
+            lists = user_service.get_lists(user["username"], list(PROFILE_WEIGHTS))
+            movies = recommendation_service.recommend(lists, limit=100)
+            recommendation_cache.set(user["username"], movies)
+        return jsonify({"recommendations": select_fields(movies[:limit], fields)}), 200
+    except Exception as e:
+        logger.error(f"Error in /recommendations: {e}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+
+# Movies that users who liked a movie also liked
+@app.route("/recommendations/because/<int:movie_id>", methods=["GET"])
+async def because_you_liked_view(movie_id):
+    """
+    Returns the movies most often found together with a movie in the users'
+    favorites and watched lists, read from the precomputed neighbors table.
+
+    Args:
+        movie_id (int): The ID of the liked movie.
+
+    Query Parameters:
+        limit (int): Maximum number of movies (default 10, at most 50).
+        fields (str): Comma-separated movie fields to return, e.g. "id,title,score".
+
+    Returns:
+        JSON response with the similar movies, most similar first.
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 50)
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer"}), 400
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        neighbors = await run_blocking(item_similarity.get_neighbors, movie_id, limit=limit)
+        details = await resolve(tmdb_client.get_movie_details_many([neighbor["id"] for neighbor in neighbors]))
+        movies = [dict(details[neighbor["id"]], score=neighbor["score"])
+                  for neighbor in neighbors if details.get(neighbor["id"])]
+        return jsonify({"movie_id": movie_id, "movies": select_fields(movies, fields)}), 200
+    except Exception as e:
+        logger.error(f"Error in /recommendations/because/{movie_id}: {e}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+
+# Streaming import and export of user lists
+LIST_ENTRY_FIELDS = ["list", "movie_id"]
+# The CSV dump has one column per default list, and the custom lists of a user as a JSON object in the last one
+USER_EXPORT_FIELDS = ["_id", "username", "role"] + [f"lists.{name}" for name in DEFAULT_LISTS] + ["lists.custom"]
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+
+def transfer_format():
+    """
+    Returns the streaming format requested with `?format=` (NDJSON by default), or None if unsupported.
+    """
+    format = request.args.get("format", "ndjson")
+    return format if format in FORMATS else None
+
+
+def streamed_records(records, fields, format, filename):
+    """
+    Builds a response that serializes the records while they are sent.
+    """
+    return Response(
+        stream_with_context(write_records(records, fields, format)),
+        mimetype=FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{format}"},
+    )
+
+
+@app.route("/lists/export", methods=["GET"])
+@jwt_required()
+def export_lists():
+    """
+    Streams the movies in every list of the user, one {"list", "movie_id"} record per movie.
+
+    Query Parameters:
+        format (str): 'ndjson' (default) or 'csv'.
+
+    Returns:
+        Streamed NDJSON or CSV response.
+    """
+    format = transfer_format()
+    if format is None:
+        return jsonify({"error": f"Supported formats: {', '.join(FORMATS)}"}), 400
+
+    entries = user_service.iter_list_entries(current_username())
+    if entries is None:
+        return jsonify({"error": "User not found"}), 404
+    return streamed_records(entries, LIST_ENTRY_FIELDS, format, "lists")
+
+
+@app.route("/lists/import", methods=["POST"])
+@jwt_required()
+def import_lists():
+    """
+    Adds the movies of an uploaded NDJSON or CSV file to the user's lists.
+    The body is parsed line by line while it is received and written in
+    batched bulk updates, so its size does not affect memory use.
+
+    Query Parameters:
+        format (str): 'ndjson' (default) or 'csv' with a `list,movie_id` header.
+
+    Returns:
+        JSON response with the counts of added, unchanged, rejected and invalid records.
+    """
+    format = transfer_format()
+    if format is None:
+        return jsonify({"error": f"Supported formats: {', '.join(FORMATS)}"}), 400
+
+    report = {"invalid": 0, "errors": []}
+    lines = codecs.iterdecode(request.stream, "utf-8-sig")
+    try:
+        entries = parse_list_entries(read_records(lines, format), report)
+        summary = user_service.import_list_entries(current_username(), entries, batch_size=IMPORT_BATCH_SIZE)
+    except UnicodeDecodeError:
+        return jsonify({"error": "The file must be UTF-8 encoded"}), 400
+
+    if summary.get("error") == USER_NOT_FOUND:
+        return jsonify(summary), 404
+    if "error" in summary:
+        return jsonify(summary), 500
+    return jsonify({**summary, **report}), 200
+
+
+def flatten_user_lists(user):
+    """
+    Flattens the lists of a user into the columns of the CSV users dump.
+
+    Args:
+        user (dict): User with their `lists`, list name to movie IDs.
+
+    Returns:
+        dict: The user with a `lists.<name>` field per default list and the `lists.custom` JSON object.
+    """
+    lists = user.get("lists") or {}
+    custom = {name: movie_ids for name, movie_ids in lists.items() if name not in DEFAULT_LISTS}
+    flat = {f"lists.{name}": lists.get(name, []) for name in DEFAULT_LISTS}
+    flat["lists.custom"] = json.dumps(custom) if custom else ""
+    return dict(user, **flat)
+
+
+@app.route("/admin/users/export", methods=["GET"])
+@role_required("admin")
+def export_users():
+    """
+    Admin-only endpoint streaming every user, without password hashes,
+    straight from a database cursor. In CSV, the custom lists of a user are
+    written to the `lists.custom` column as a JSON object of list name to movie IDs.
+
+    Query Parameters:
+        format (str): 'ndjson' (default) or 'csv'.
+
+    Returns:
+        Streamed NDJSON or CSV response.
+    """
+    format = transfer_format()
+    if format is None:
+        return jsonify({"error": f"Supported formats: {', '.join(FORMATS)}"}), 400
+
+    users = user_service.iter_users()
+    if format == "csv":
+        # Flatten the default lists into one column each, and the custom ones into a single column
+        users = (flatten_user_lists(user) for user in users)
+    return streamed_records(users, USER_EXPORT_FIELDS, format, "users")
+
+
+# Admin endpoint with cache and connection pool metrics
+@app.route("/admin/stats", methods=["GET"])
+@role_required("admin")
+def stats_view():
+    """
+    Admin-only endpoint reporting TMDb cache hit ratios and HTTP connection reuse.
+
+    Returns:
+        JSON response with the cache and HTTP client counters.
+    """
+    return jsonify({
+        "tmdb_cache": tmdb_cache.get_stats(),
+        "search_cache": search_cache.get_stats(),
+        "tmdb_http": tmdb_service.get_stats(),
+        "images": image_proxy.get_stats(),
+    }), 200
+
 
 if __name__ == '__main__':
+    # Development server only; production runs through gunicorn (see gunicorn.conf.py)
     app.run(host='0.0.0.0', port=5000, debug=True)
     
@@ -0,0 +1,129 @@
+import gzip
+import os
+import re
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Without orjson the default provider is kept
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Without brotli responses are only compressed with gzip
+    brotli = None
+
+# Responses smaller than this are sent uncompressed: the saving does not pay for the CPU
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html"}
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # Fast levels suit responses compressed per request
+
+# Content encodings offered to clients, in order of preference
+CONTENT_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+MAX_FIELDS = 50
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider encoding with orjson while keeping the output of the default
+    provider: sorted keys, and dates and other types converted by its `default`.
+    Calls with extra arguments, and pretty-printed debug responses, are left to
+    the default provider.
+    """
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return options | orjson.OPT_SORT_KEYS if self.sort_keys else options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        data = orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+def parse_fields(value):
+    """
+    Parse a sparse fieldset, e.g. the `fields` query parameter "id,title,poster_path".
+
+    Args:
+        value (str): Comma-separated field names, or None for every field.
+
+    Returns:
+        set or None: The fields to keep, always including "id", or None to keep every field.
+
+    Raises:
+        ValueError: If the fieldset is empty or has invalid names.
+    """
+    if value is None:
+        return None
+    fields = {name.strip() for name in value.split(",") if name.strip()}
+    if not fields or len(fields) > MAX_FIELDS or not all(FIELD_NAME.match(name) for name in fields):
+        raise ValueError("'fields' must be a comma-separated list of field names")
+    return fields | {"id"}
+
+
+def select_fields(records, fields):
+    """
+    Trim records to a sparse fieldset.
+
+    Args:
+        records (list): Records, e.g. movie details from TMDb.
+        fields (set): Fields to keep, or None to keep every field.
+
+    Returns:
+        list: The trimmed records.
+    """
+    if fields is None:
+        return records
+    return [{key: value for key, value in record.items() if key in fields} for record in records]
+
+
+def compress_response(response, accept_encodings, min_bytes=COMPRESSION_MIN_BYTES):
+    """
+    Compress a response body with the preferred encoding the client accepts.
+    An entity tag gets the encoding as suffix, since the compressed body is a
+    different representation.
+
+    Args:
+        response (Response): The response to compress.
+        accept_encodings: Encodings accepted by the client, e.g. `request.accept_encodings`.
+        min_bytes (int): Smallest body worth compressing.
+
+    Returns:
+        Response: The response, compressed if eligible.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = next((encoding for encoding in CONTENT_ENCODINGS if accept_encodings.quality(encoding) > 0), None)
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
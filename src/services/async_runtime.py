@@ -0,0 +1,113 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import threading
+
+
+class AsyncRuntime:
+    """
+    Event loop running in a background thread, shared by every request of a worker.
+
+    Async clients (HTTP connection pools, MongoDB clients) are bound to the loop
+    that created them, so they have to live on a single long-lived loop instead of
+    one loop per request. The loop is started lazily, after the server has forked
+    its workers.
+    """
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the event loop thread if it is not running yet.
+
+        Returns:
+            AbstractEventLoop: The running event loop.
+        """
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self.loop.run_forever, name="async-runtime", daemon=True)
+                self._thread.start()
+        return self.loop
+
+    def run(self, coroutine, timeout=None):
+        """
+        Run a coroutine on the shared loop and wait for its result.
+
+        The coroutine runs in a copy of the caller's context, so context-local
+        state such as Flask's request and application contexts stays available.
+
+        Args:
+            coroutine (Coroutine): Coroutine to run.
+            timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+            The result of the coroutine.
+        """
+        loop = self.start()
+        result = concurrent.futures.Future()
+
+        def create_task():
+            # Tasks copy the context they are created in, which is the caller's one here
+            task = loop.create_task(coroutine)
+            task.add_done_callback(lambda done: _copy_outcome(done, result))
+
+        loop.call_soon_threadsafe(create_task, context=contextvars.copy_context())
+        return result.result(timeout)
+
+    def async_to_sync(self, func):
+        """
+        Wrap a coroutine function so it can be called synchronously.
+        Compatible with `Flask.async_to_sync`, so async views run on the shared loop.
+
+        Args:
+            func (callable): Coroutine function.
+
+        Returns:
+            callable: Blocking function returning the coroutine's result.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(func(*args, **kwargs))
+        return wrapper
+
+    def stop(self):
+        """
+        Stop the event loop thread.
+        """
+        with self._lock:
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self._thread.join()
+                self.loop.close()
+                self.loop = None
+
+
+def _copy_outcome(task, future):
+    """
+    Copy the outcome of an asyncio task to a concurrent future.
+    """
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+async def resolve(value):
+    """
+    Await a value if it is awaitable, so views can use blocking and async clients alike.
+
+    Args:
+        value: Result of a blocking call or an awaitable from an async client.
+
+    Returns:
+        The resolved value.
+    """
+    if asyncio.isfuture(value) or asyncio.iscoroutine(value):
+        return await value
+    return value
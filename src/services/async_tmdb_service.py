@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import httpx
+from services.tmdb_service import (
+    TMDB_ACCESS_TOKEN, TMDB_BACKOFF_FACTOR, TMDB_BASE_URL, TMDB_BATCH_TIMEOUT, TMDB_CONNECT_TIMEOUT,
+    TMDB_MAX_RETRIES, TMDB_POOL_SIZE, TMDB_READ_TIMEOUT, TMDB_RETRY_STATUS_CODES,
+)
+
+
+class AsyncTMDbService:
+    """
+    Async counterpart of TMDbService, for the async serving mode.
+    Uses a pooled httpx client and shares the caches and search index of the
+    blocking service, so both modes warm the same entries.
+    """
+    def __init__(self, pool_size=TMDB_POOL_SIZE, timeout=(TMDB_CONNECT_TIMEOUT, TMDB_READ_TIMEOUT),
+                 max_retries=TMDB_MAX_RETRIES, backoff_factor=TMDB_BACKOFF_FACTOR, cache=None,
+                 search_cache=None, search_index=None, recommendations=None, mirror=None):
+        if not TMDB_ACCESS_TOKEN:
+            raise ValueError("Access token for TMDb is missing")
+
+        self.logger = logging.getLogger("AsyncTMDbService")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache
+        self.search_cache = search_cache
+        self.search_index = search_index
+        self.recommendations = recommendations
+        self.mirror = mirror
+        self.retries = 0
+        self._client = None
+
+    @property
+    def client(self):
+        """
+        HTTP client, created on first use so it binds to the running event loop.
+        """
+        if self._client is None:
+            connect_timeout, read_timeout = self.timeout
+            self._client = httpx.AsyncClient(
+                base_url=TMDB_BASE_URL,
+                headers={
+                    "accept": "application/json",
+                    "Authorization": f"Bearer {TMDB_ACCESS_TOKEN}",
+                },
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+        return self._client
+
+    async def search_movies(self, query):
+        """
+        Search for movies using the TMDb API.
+
+        Args:
+            query (str): Search term.
+
+        Returns:
+            list: List of movies from the TMDB API.
+        """
+        if self.search_cache is not None:
+            results = self.search_cache.get(query)
+            if results is not None:
+                return results
+
+        data = await self._get("/search/movie", params={"query": query})
+        results = data.get("results", [])
+
+        if self.search_cache is not None:
+            self.search_cache.set(query, results, complete=data.get("total_pages", 1) <= 1)
+        return results
+
+    async def get_movie_details(self, movie_id):
+        """
+        Get detailed information about a movie by its ID.
+
+        Args:
+            movie_id (int): ID of the movie.
+
+        Returns:
+            dict: Movie details from the TMDb API.
+        """
+        if self.cache is None:
+            return await self._fetch_movie_details(movie_id)
+        return await self.cache.get_or_load_async(f"movie:{movie_id}", lambda: self._fetch_movie_details(movie_id))
+
+    async def get_movie_details_many(self, movie_ids, timeout=TMDB_BATCH_TIMEOUT):
+        """
+        Get detailed information about several movies concurrently.
+
+        Duplicated IDs are fetched only once. Movies that fail or do not answer
+        before the timeout are logged and left out of the result.
+
+        Args:
+            movie_ids (iterable): IDs of the movies.
+            timeout (float): Maximum number of seconds to wait for the whole batch.
+
+        Returns:
+            dict: Movie details from the TMDb API keyed by movie ID.
+        """
+        unique_ids = list(dict.fromkeys(movie_ids))
+        tasks = {movie_id: asyncio.ensure_future(self.get_movie_details(movie_id)) for movie_id in unique_ids}
+        if not tasks:
+            return {}
+
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+        details = {}
+        for movie_id, task in tasks.items():
+            if task not in done:
+                self.logger.warning(f"Timed out fetching details for movie {movie_id}")
+            elif task.exception() is not None:
+                self.logger.warning(f"Error fetching details for movie {movie_id}: {task.exception()}")
+            else:
+                details[movie_id] = task.result()
+        return details
+
+    async def aclose(self):
+        """
+        Close the pooled HTTP connections.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get(self, path, params=None):
+        """
+        Send a GET request to the TMDb API, retrying throttled and failed responses
+        with exponential backoff and honoring `Retry-After`.
+
+        Raises:
+            Exception: If TMDb does not answer with a 200 status code.
+        """
+        for attempt in range(self.max_retries + 1):
+            response = await self.client.get(path, params=params)
+            if response.status_code not in TMDB_RETRY_STATUS_CODES or attempt == self.max_retries:
+                break
+            self.retries += 1
+            delay = self.backoff_factor * (2 ** attempt)
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            await asyncio.sleep(delay)
+
+        if response.status_code != 200:
+            raise Exception(f"Error: {response.status_code} - {response.text}")
+        return response.json()
+
+    async def _fetch_movie_details(self, movie_id):
+        """
+        Get movie details from the local mirror, or from the TMDb API if the
+        mirror does not hold them, bypassing the cache.
+        """
+        movie = None
+        if self.mirror is not None:
+            # The mirror is read with the blocking driver, so off the event loop
+            movie = await asyncio.to_thread(self.mirror.get, movie_id)
+        if movie is None:
+            movie = await self._get(f"/movie/{movie_id}")
+        if self.search_index is not None:
+            self.search_index.add(movie)
+        if self.recommendations is not None:
+            self.recommendations.add(movie)
+        return movie
@@ -0,0 +1,192 @@
+import asyncio
+import copy
+from pymongo import ASCENDING
+from services.pagination import DEFAULT_PAGE_SIZE
+from services.user_service import (
+    DEFAULT_LISTS, SHARED_LISTS_COUNTER, combined_list_version, custom_lists_query, list_counts_pipeline,
+    list_entries_query, list_page,
+)
+
+
+class AsyncUserService:
+    """
+    Async counterpart of the read operations of UserService, for the async serving mode.
+    Works with a collection from PyMongo's `AsyncMongoClient`.
+    """
+    def __init__(self, users_collection, user_cache=None, entries_collection=None, custom_lists_collection=None,
+                 counters_collection=None):
+        """
+        Initialize the AsyncUserService with an async MongoDB collection.
+
+        Args:
+            users_collection (AsyncCollection): MongoDB collection for storing user data.
+            user_cache (TTLCache): Optional per-process user cache, shared with the
+                UserService that invalidates it when users change.
+            entries_collection (AsyncCollection): Collection with one document per movie in a list,
+                `list_entries` of the same database by default.
+            custom_lists_collection (AsyncCollection): Collection with the custom list names,
+                `custom_lists` of the same database by default.
+            counters_collection (AsyncCollection): Collection with the version of the shared lists,
+                `counters` of the same database by default.
+        """
+        database = users_collection.database
+        self.users_collection = users_collection
+        self.entries_collection = entries_collection if entries_collection is not None else database["list_entries"]
+        self.custom_lists_collection = (
+            custom_lists_collection if custom_lists_collection is not None else database["custom_lists"]
+        )
+        self.counters_collection = counters_collection if counters_collection is not None else database["counters"]
+        self.user_cache = user_cache
+
+    async def get_user(self, username):
+        """
+        Retrieve user information from the database.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            dict: The user object with sensitive data removed, or None if the user is not found.
+        """
+        if self.user_cache is not None:
+            user = self.user_cache.get(username)
+            if user is not None:
+                return copy.deepcopy(user)
+
+        user = await self.users_collection.find_one({"username": username}, {"password_hash": 0})
+
+        # Convert ObjectId to string for JSON serialization
+        if user and "_id" in user:
+            user["_id"] = str(user["_id"])
+
+        if user and self.user_cache is not None:
+            self.user_cache.set(username, copy.deepcopy(user))
+        return user
+
+    async def user_exists(self, username):
+        """
+        Check whether a user exists, with an index-only lookup.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            bool: True if the user exists.
+        """
+        return await self.users_collection.count_documents({"username": username}, limit=1) > 0
+
+    async def get_list_version(self, username):
+        """
+        Get the version of a user's lists, see `UserService.get_list_version`.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            int or None: The version, or None if the user is not found.
+        """
+        user, shared_lists = await asyncio.gather(
+            self.users_collection.find_one({"username": username}, {"_id": 0, "list_version": 1}),
+            self.counters_collection.find_one({"_id": SHARED_LISTS_COUNTER}),
+        )
+        return combined_list_version(user, shared_lists) if user is not None else None
+
+    async def get_list_names(self, username):
+        """
+        Get the names of the lists a user can use, see `UserService.get_list_names`.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            list: List names.
+        """
+        custom = self.custom_lists_collection.find(custom_lists_query(username), {"_id": 0, "name": 1})
+        return DEFAULT_LISTS + [document["name"] async for document in custom.sort("created_at", ASCENDING)]
+
+    async def get_list_status(self, username, movie_id, list_names=None):
+        """
+        Check whether a movie is in each of the given lists of a user.
+
+        Args:
+            username (str): The username of the user.
+            movie_id (int): The ID of the movie.
+            list_names (list): Names of the lists to check, every list of the user by default.
+
+        Returns:
+            dict: List name to membership flag.
+        """
+        if list_names is None:
+            list_names = await self.get_list_names(username)
+        entries = self.entries_collection.find(
+            {"username": username, "list": {"$in": list(list_names)}, "movie_id": movie_id},
+            {"_id": 0, "list": 1},
+        )
+        found = {entry["list"] async for entry in entries}
+        return {name: name in found for name in list_names}
+
+    async def get_list_page(self, username, list_name, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Get a page of the movie IDs in a user's list, see `UserService.get_list_page`.
+
+        Args:
+            username (str): The username of the user.
+            list_name (str): The name of the list.
+            limit (int): Maximum number of movie IDs in the page.
+            cursor (str): Continuation token from the previous page, None for the first one.
+
+        Returns:
+            dict or None: The `movie_ids` of the page and the `next` token, or None if the user is not found.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        query = list_entries_query(username, list_name, cursor)
+        exists, entries = await asyncio.gather(self.user_exists(username), self._read_entries(query, limit + 1))
+        if not exists:
+            return None
+        return list_page(entries, limit)
+
+    async def get_first_list_pages(self, username, list_names=DEFAULT_LISTS, limit=DEFAULT_PAGE_SIZE):
+        """
+        Get the first page of several lists of a user, reading the lists concurrently.
+
+        Args:
+            username (str): The username of the user.
+            list_names (list): Names of the lists.
+            limit (int): Maximum number of movie IDs per list.
+
+        Returns:
+            dict or None: List name to page, or None if the user is not found.
+        """
+        exists, *entries = await asyncio.gather(
+            self.user_exists(username),
+            *(self._read_entries(list_entries_query(username, name), limit + 1) for name in list_names),
+        )
+        if not exists:
+            return None
+        return {name: list_page(list_entries, limit) for name, list_entries in zip(list_names, entries)}
+
+    async def get_list_counts(self, username, list_names):
+        """
+        Count the movies in several lists of a user.
+
+        Args:
+            username (str): The username of the user.
+            list_names (list): Names of the lists.
+
+        Returns:
+            dict: List name to number of movies.
+        """
+        counts = {name: 0 for name in list_names}
+        cursor = await self.entries_collection.aggregate(list_counts_pipeline(username, list_names))
+        async for group in cursor:
+            counts[group["_id"]] = group["count"]
+        return counts
+
+    async def _read_entries(self, query, limit):
+        """
+        Read list entries in the order they were added.
+        """
+        cursor = self.entries_collection.find(query, {"_id": 1, "movie_id": 1})
+        return await cursor.sort("_id", ASCENDING).limit(limit).to_list(None)
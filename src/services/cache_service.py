@@ -0,0 +1,470 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a TTL.
+    Expired entries are kept for an extra `stale_ttl` seconds so callers
+    can serve them while a fresh value is being loaded.
+    """
+    def __init__(self, max_size=1024, ttl=300, stale_ttl=0, clock=time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size (int): Maximum number of entries before the least recently used one is evicted.
+            ttl (float): Seconds an entry stays fresh.
+            stale_ttl (float): Extra seconds an expired entry can still be served as stale.
+            clock (callable): Time source, injectable for tests.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """
+        Look up an entry, including stale ones.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            tuple or None: (value, is_fresh), or None if the key is missing or fully expired.
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, fresh_until, stale_until = entry
+            if now >= stale_until:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value, now < fresh_until
+
+    def get(self, key, default=None):
+        """
+        Get a fresh value from the cache.
+
+        Args:
+            key (str): Cache key.
+            default: Value returned when the key is missing or expired.
+
+        Returns:
+            The cached value or `default`.
+        """
+        entry = self.lookup(key)
+        if entry is None or not entry[1]:
+            return default
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value in the cache, evicting the least recently used entries if full.
+
+        Args:
+            key (str): Cache key.
+            value: Value to store.
+            ttl (float): Seconds the value stays fresh (defaults to the cache TTL).
+        """
+        now = self.clock()
+        fresh_until = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, fresh_until, fresh_until + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove a key from the cache if present.
+
+        Args:
+            key (str): Cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MongoCache:
+    """
+    Cache stored in a MongoDB collection, shared by every worker and replica.
+    A TTL index removes documents once they are no longer servable.
+    """
+    def __init__(self, collection, ttl=3600, stale_ttl=0):
+        """
+        Initialize the cache with a MongoDB collection.
+
+        Args:
+            collection (Collection): MongoDB collection for the cache entries.
+            ttl (float): Seconds an entry stays fresh.
+            stale_ttl (float): Extra seconds an expired entry can still be served as stale.
+        """
+        self.collection = collection
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.logger = logging.getLogger("MongoCache")
+
+    def ensure_indexes(self):
+        """
+        Create the TTL index that lets MongoDB drop expired entries.
+        """
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def lookup(self, key):
+        """
+        Look up an entry, including stale ones.
+
+        Errors are logged and reported as a miss, so an unavailable database
+        only costs the shared cache, not the request.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            tuple or None: (value, is_fresh, remaining fresh seconds), or None on a miss.
+        """
+        try:
+            document = self.collection.find_one({"_id": key})
+        except Exception as e:
+            self.logger.warning(f"Error reading cache entry {key}: {e}")
+            return None
+
+        now = datetime.now(timezone.utc)
+        if document is None or _as_utc(document["expires_at"]) <= now:
+            return None
+        remaining = (_as_utc(document["fresh_until"]) - now).total_seconds()
+        return document["value"], remaining > 0, remaining
+
+    def set(self, key, value):
+        """
+        Store a value in the cache.
+
+        Args:
+            key (str): Cache key.
+            value (dict): BSON-serializable value to store.
+        """
+        now = datetime.now(timezone.utc)
+        fresh_until = now + timedelta(seconds=self.ttl)
+        try:
+            self.collection.replace_one(
+                {"_id": key},
+                {
+                    "value": value,
+                    "fresh_until": fresh_until,
+                    "expires_at": fresh_until + timedelta(seconds=self.stale_ttl),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            self.logger.warning(f"Error writing cache entry {key}: {e}")
+
+    def iter_values(self, limit=0, batch_size=1000):
+        """
+        Iterate over the values still stored in the cache, fresh or stale, most recently
+        written first. The order follows the TTL index, every entry sharing the same TTL.
+
+        Args:
+            limit (int): Maximum number of values, 0 for all of them.
+            batch_size (int): Entries fetched from MongoDB per round trip.
+
+        Yields:
+            dict: Cached values.
+        """
+        cursor = self.collection.find({}, {"_id": 0, "value": 1}).sort("expires_at", -1)
+        for document in cursor.limit(limit).batch_size(batch_size):
+            yield document["value"]
+
+    def delete(self, key):
+        """
+        Remove a key from the cache if present.
+
+        Args:
+            key (str): Cache key.
+        """
+        try:
+            self.collection.delete_one({"_id": key})
+        except Exception as e:
+            self.logger.warning(f"Error deleting cache entry {key}: {e}")
+
+    def delete_many(self, keys):
+        """
+        Remove several keys from the cache in one request.
+
+        Args:
+            keys (list): Cache keys.
+        """
+        try:
+            self.collection.delete_many({"_id": {"$in": list(keys)}})
+        except Exception as e:
+            self.logger.warning(f"Error deleting {len(keys)} cache entries: {e}")
+
+
+class TieredCache:
+    """
+    Two-level cache: an in-process TTLCache (L1) in front of an optional
+    shared MongoCache (L2).
+
+    Concurrent misses for the same key are coalesced into a single load
+    (single-flight), and stale entries are served while a background
+    refresh loads a fresh value (stale-while-revalidate).
+    """
+    def __init__(self, l1, l2=None, refresh_workers=4):
+        """
+        Initialize the cache levels.
+
+        Args:
+            l1 (TTLCache): In-process cache.
+            l2 (MongoCache): Shared cache, or None to use only the in-process level.
+            refresh_workers (int): Threads used for background refreshes.
+        """
+        self.l1 = l1
+        self.l2 = l2
+        self.logger = logging.getLogger("TieredCache")
+        self.executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+        self._in_flight = {}
+        self._async_in_flight = {}  # Only touched from the event loop thread
+        self._refresh_tasks = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "coalesced": 0,
+            "load_errors": 0,
+        }
+
+    def get_or_load(self, key, loader):
+        """
+        Get a value from the cache, loading it with `loader` on a miss.
+
+        Args:
+            key (str): Cache key.
+            loader (callable): Function without arguments that returns the value.
+
+        Returns:
+            The cached or freshly loaded value.
+
+        Raises:
+            Exception: Whatever `loader` raises when there is no stale value to fall back to.
+        """
+        entry = self.l1.lookup(key)
+        if entry is not None:
+            value, is_fresh = entry
+            if is_fresh:
+                self._count("l1_hits")
+            else:
+                self._count("stale_hits")
+                self._refresh(key, loader)
+            return value
+
+        if self.l2 is not None:
+            entry = self.l2.lookup(key)
+            if entry is not None:
+                value, is_fresh, remaining = entry
+                if is_fresh:
+                    self._count("l2_hits")
+                    self.l1.set(key, value, ttl=min(self.l1.ttl, remaining))
+                else:
+                    self._count("stale_hits")
+                    self.l1.set(key, value, ttl=0)
+                    self._refresh(key, loader)
+                return value
+
+        self._count("misses")
+        return self._load(key, loader).result()
+
+    async def get_or_load_async(self, key, loader):
+        """
+        Async counterpart of `get_or_load` for code running on an event loop.
+
+        Shared cache reads run in a worker thread and writes are done in the
+        background, so the event loop is never blocked by MongoDB.
+
+        Args:
+            key (str): Cache key.
+            loader (callable): Coroutine function without arguments that returns the value.
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        entry = self.l1.lookup(key)
+        if entry is not None:
+            value, is_fresh = entry
+            if is_fresh:
+                self._count("l1_hits")
+            else:
+                self._count("stale_hits")
+                self._refresh_async(key, loader)
+            return value
+
+        if self.l2 is not None:
+            entry = await asyncio.to_thread(self.l2.lookup, key)
+            if entry is not None:
+                value, is_fresh, remaining = entry
+                if is_fresh:
+                    self._count("l2_hits")
+                    self.l1.set(key, value, ttl=min(self.l1.ttl, remaining))
+                else:
+                    self._count("stale_hits")
+                    self.l1.set(key, value, ttl=0)
+                    self._refresh_async(key, loader)
+                return value
+
+        self._count("misses")
+        return await self._load_async(key, loader)
+
+    def invalidate(self, key):
+        """
+        Remove a key from every cache level.
+
+        Args:
+            key (str): Cache key.
+        """
+        self.l1.delete(key)
+        if self.l2 is not None:
+            self.l2.delete(key)
+
+    def get_stats(self):
+        """
+        Get hit and miss counters for the cache.
+
+        Returns:
+            dict: Counters per level plus the overall hit ratio.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats["l1_hits"] + stats["l2_hits"] + stats["stale_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        stats["l1_size"] = len(self.l1)
+        return stats
+
+    def _load(self, key, loader):
+        """
+        Load a value, sharing the result with every concurrent caller of the same key.
+
+        Returns:
+            Future: Resolves to the loaded value.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future
+            future = Future()
+            self._in_flight[key] = future
+            self._stats["loads"] += 1
+
+        try:
+            value = loader()
+            self.l1.set(key, value)
+            if self.l2 is not None:
+                self.l2.set(key, value)
+            future.set_result(value)
+        except Exception as e:
+            self._count("load_errors")
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return future
+
+    async def _load_async(self, key, loader):
+        """
+        Async counterpart of `_load`, coalescing concurrent loads on the event loop.
+        If the caller running the load is cancelled, the waiters load the value themselves.
+        """
+        future = self._async_in_flight.get(key)
+        if future is not None:
+            self._count("coalesced")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            return await self._load_async(key, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_in_flight[key] = future
+        self._count("loads")
+        try:
+            value = await loader()
+            self.l1.set(key, value)
+            if self.l2 is not None:
+                self.executor.submit(self.l2.set, key, value)
+            future.set_result(value)
+        except Exception as e:
+            self._count("load_errors")
+            future.set_exception(e)
+        finally:
+            self._async_in_flight.pop(key, None)
+            # Cancelled before the value was loaded: release the waiters
+            if not future.done():
+                future.cancel()
+        return await future
+
+    def _refresh_async(self, key, loader):
+        """
+        Reload a stale key in a background task unless a load is already running.
+        """
+        if key in self._async_in_flight:
+            return
+
+        async def refresh():
+            try:
+                await self._load_async(key, loader)
+            except Exception as e:
+                self.logger.warning(f"Error refreshing cache entry {key}: {e}")
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    def _refresh(self, key, loader):
+        """
+        Reload a stale key in the background unless a load is already running.
+        """
+        with self._lock:
+            if key in self._in_flight:
+                return
+
+        def refresh():
+            error = self._load(key, loader).exception()
+            if error is not None:
+                self.logger.warning(f"Error refreshing cache entry {key}: {error}")
+
+        self.executor.submit(refresh)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def _as_utc(value):
+    """
+    MongoDB returns naive UTC datetimes unless the client is timezone aware.
+    """
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
@@ -0,0 +1,321 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from pymongo import ASCENDING, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from services.id_allocator import IdAllocator
+from services.search_cache import normalize_query
+
+# Ingestion settings
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+INGEST_WRITERS = int(os.getenv("INGEST_WRITERS", "4"))
+
+# Fields every catalog movie needs; TMDb records only need an ID and a title
+CATALOG_REQUIRED_FIELDS = ["title", "genre", "rating"]
+
+
+def iter_records(path, chunk_size=1 << 16):
+    """
+    Stream the movies of a JSON array or NDJSON file, optionally gzip-compressed,
+    without loading the whole file.
+
+    Args:
+        path (str): Path to a `.json`, `.ndjson` or `.gz` file.
+        chunk_size (int): Characters read at a time.
+
+    Yields:
+        dict: Parsed records.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as file:
+        yield from iter_json_values(file, chunk_size)
+
+
+def iter_json_values(file, chunk_size=1 << 16):
+    """
+    Decode consecutive JSON values from a text stream. A top-level array is
+    unwrapped, so a JSON array and one object per line are read the same way.
+
+    Args:
+        file (TextIO): Text stream.
+        chunk_size (int): Characters read at a time.
+
+    Yields:
+        Decoded values.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    while True:
+        # Skip separators between values, and the brackets of a top-level array
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            position += 1
+
+        if position < len(buffer):
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+                value = end = None
+            # A value ending at the buffer's edge may be a truncated number; read more first
+            if value is not None and (end < len(buffer) or eof):
+                yield value
+                position = end
+                continue
+
+        if eof:
+            return
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def dedup_key(movie):
+    """
+    Get the key identifying a catalog movie regardless of its ID: normalized title and year.
+
+    Args:
+        movie (dict): Movie with a `title` and optionally a `year` or `release_date`.
+
+    Returns:
+        str: Deduplication key.
+    """
+    year = movie.get("year") or str(movie.get("release_date") or "")[:4]
+    return f"{normalize_query(movie['title'])}|{year}"
+
+
+def validate_batch(movies, required_fields, rating_field="rating"):
+    """
+    Check a batch of movies at once: required fields and a rating between 0 and 10.
+
+    Args:
+        movies (list): Movies to check.
+        required_fields (list): Fields that must be present and not empty.
+        rating_field (str): Field holding the rating; missing ratings pass if not required.
+
+    Returns:
+        ndarray: Boolean mask of the valid movies.
+    """
+    valid = np.ones(len(movies), dtype=bool)
+    for field in required_fields:
+        valid &= np.fromiter((movie.get(field) not in (None, "") for movie in movies), dtype=bool, count=len(movies))
+
+    ratings = np.fromiter(
+        (movie.get(rating_field) if isinstance(movie.get(rating_field), (int, float)) else np.nan for movie in movies),
+        dtype=float,
+        count=len(movies),
+    )
+    has_rating = ~np.isnan(ratings)
+    valid &= ~has_rating | ((ratings >= 0) & (ratings <= 10))
+    if rating_field in required_fields:
+        valid &= has_rating
+    return valid
+
+
+class CatalogIngestor:
+    """
+    Bulk loader for the movies collection.
+
+    Records are streamed, validated a batch at a time, deduplicated and written
+    with unordered bulk upserts by a pool of writer threads. Catalog records are
+    deduplicated by normalized title and year and get IDs from the shared
+    allocator; TMDb records (e.g. the daily export) are deduplicated by their
+    TMDb ID, updated in place when loaded again and never get a catalog ID.
+    """
+    def __init__(self, collection, id_allocator=None, batch_size=INGEST_BATCH_SIZE, writers=INGEST_WRITERS,
+                 source="catalog"):
+        """
+        Initialize the ingestor.
+
+        Args:
+            collection (Collection): MongoDB collection for the movies.
+            id_allocator (IdAllocator): Allocator for new catalog IDs.
+            batch_size (int): Records validated and written per bulk request.
+            writers (int): Bulk requests sent in parallel.
+            source (str): 'catalog' for WatchIT movies or 'tmdb' for TMDb records.
+        """
+        if source not in ("catalog", "tmdb"):
+            raise ValueError(f"Unknown source '{source}'")
+
+        self.logger = logging.getLogger("CatalogIngestor")
+        self.collection = collection
+        # IDs are reserved a batch at a time
+        self.id_allocator = id_allocator or IdAllocator(collection.database["counters"], "movies", block_size=batch_size)
+        self.batch_size = batch_size
+        self.writers = writers
+        self.source = source
+        self._stats_lock = threading.Lock()
+
+    def ensure_indexes(self):
+        """
+        Create the unique indexes used to deduplicate the records.
+        """
+        # Sparse: movies added one by one have neither key
+        self.collection.create_index([("title_key", ASCENDING)], unique=True, sparse=True)
+        self.collection.create_index([("tmdb_id", ASCENDING)], unique=True, sparse=True)
+
+    def ingest_file(self, path):
+        """
+        Load a JSON array or NDJSON file, optionally gzip-compressed.
+
+        Args:
+            path (str): Path to the file.
+
+        Returns:
+            dict: Ingestion report, see `ingest`.
+        """
+        return self.ingest(iter_records(path))
+
+    def ingest(self, records):
+        """
+        Load a stream of records.
+
+        Args:
+            records (iterable): Movie dicts.
+
+        Returns:
+            dict: Counts of records read, invalid, duplicated (in the input or already stored),
+                inserted, updated and failed, with the elapsed seconds and the rows per second.
+        """
+        self.ensure_indexes()
+        stats = {"read": 0, "invalid": 0, "duplicates": 0, "inserted": 0, "updated": 0, "failed": 0}
+        start = time.perf_counter()
+
+        # At most two batches per writer are in flight, so memory stays bounded; leaving
+        # the executor waits for the last ones
+        slots = threading.BoundedSemaphore(self.writers * 2)
+        with ThreadPoolExecutor(max_workers=self.writers, thread_name_prefix="ingest") as executor:
+            batch = []
+            for record in records:
+                stats["read"] += 1
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    self._submit(executor, slots, self._prepare(batch, stats), stats)
+                    batch = []
+            if batch:
+                self._submit(executor, slots, self._prepare(batch, stats), stats)
+
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        stats["rows_per_second"] = round(stats["read"] / stats["seconds"]) if stats["seconds"] else stats["read"]
+        self.logger.info(f"Ingested {self.source} records: {stats}")
+        return stats
+
+    def _prepare(self, batch, stats):
+        """
+        Validate and deduplicate a batch, returning its upserts. Duplicates across batches
+        are caught by the stored keys, or by the unique indexes when written concurrently.
+        """
+        if self.source == "tmdb":
+            # Export records only have the original title; it must not replace a localized one already stored
+            defaulted = ["title" not in movie for movie in batch]
+            for movie in batch:
+                movie.setdefault("title", movie.get("original_title"))
+            valid = validate_batch(batch, ["id", "title"], rating_field="vote_average")
+        else:
+            valid = validate_batch(batch, CATALOG_REQUIRED_FIELDS)
+            defaulted = [False] * len(batch)
+        stats["invalid"] += int(len(batch) - valid.sum())
+
+        records = []
+        seen = set()
+        for movie, is_valid, title_defaulted in zip(batch, valid, defaulted):
+            if not is_valid:
+                continue
+            key = movie["id"] if self.source == "tmdb" else dedup_key(movie)
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            records.append((key, movie, title_defaulted))
+
+        # IDs are only allocated for catalog movies not stored yet, so a reload does not burn the counter
+        field = "tmdb_id" if self.source == "tmdb" else "title_key"
+        existing = set()
+        if records:
+            cursor = self.collection.find({field: {"$in": [key for key, _, _ in records]}}, {"_id": 0, field: 1})
+            existing = {document[field] for document in cursor}
+
+        requests = []
+        for key, movie, title_defaulted in records:
+            # TMDb records are refreshed, stored catalog movies left as they are
+            movie.pop("_id", None)
+            movie.pop("id", None)
+            if self.source == "tmdb":
+                on_insert = {}
+                if title_defaulted:
+                    on_insert["title"] = movie.pop("title")
+                update = {"$set": dict(movie, tmdb_id=key)}
+                if key in existing:
+                    requests.append(UpdateOne({"tmdb_id": key}, update))
+                    continue
+                # TMDb records are served by their TMDb ID and take no catalog ID
+                if on_insert:
+                    update["$setOnInsert"] = on_insert
+                requests.append(UpdateOne({"tmdb_id": key}, update, upsert=True))
+            elif key in existing:
+                stats["duplicates"] += 1
+            else:
+                update = {"$setOnInsert": dict(movie, title_key=key, id=self.id_allocator.allocate())}
+                requests.append(UpdateOne({"title_key": key}, update, upsert=True))
+        return requests
+
+    def _submit(self, executor, slots, requests, stats):
+        """
+        Send a bulk request from a writer thread once a slot is free.
+        """
+        slots.acquire()
+
+        def write():
+            try:
+                if not requests:
+                    return
+                try:
+                    details = self.collection.bulk_write(requests, ordered=False).bulk_api_result
+                except BulkWriteError as e:
+                    # Unordered: the other writes of the batch were still applied
+                    details = e.details
+                # A key inserted by a concurrent batch is a duplicate, not a failure
+                errors = details.get("writeErrors", [])
+                failed = [error for error in errors if error.get("code") != 11000]
+                if failed:
+                    self.logger.warning(f"{len(failed)} records failed: {failed[0]}")
+                with self._stats_lock:
+                    stats["inserted"] += details["nUpserted"]
+                    stats["failed"] += len(failed)
+                    stats["duplicates"] += len(errors) - len(failed)
+                    stats["updated" if self.source == "tmdb" else "duplicates"] += details["nMatched"]
+            except Exception as e:
+                self.logger.error(f"Error writing a batch of {len(requests)} records: {e}")
+                with self._stats_lock:
+                    stats["failed"] += len(requests)
+            finally:
+                slots.release()
+
+        executor.submit(write)
+
+
+if __name__ == "__main__":
+    # Command line loader, from `src`, logging its report: python -m services.catalog_ingest data/movies.json
+    from services.movie_service import MovieService
+
+    parser = argparse.ArgumentParser(description="Load movies into the WatchIT catalog")
+    parser.add_argument("path", help="JSON array or NDJSON file, optionally .gz")
+    parser.add_argument("--source", choices=["catalog", "tmdb"], default="catalog")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--writers", type=int, default=INGEST_WRITERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    db = MongoClient(os.getenv("DATABASE_URL", "mongodb://localhost:27017"))["watchit_db"]
+    MovieService(db["movies"]).ingest_file(
+        args.path, source=args.source, batch_size=args.batch_size, writers=args.writers
+    )
@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+
+
+def content_hash(value):
+    """
+    Hash a JSON-serializable value, independently of the order of its keys.
+
+    Args:
+        value: Value to hash, e.g. movie details from TMDb.
+
+    Returns:
+        str: Hex digest identifying the content.
+    """
+    data = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def directory_hash(path):
+    """
+    Hash the names and contents of the files in a directory tree, e.g. the templates,
+    so every worker of a deployment gets the same value and a new deployment a new one.
+
+    Args:
+        path (str): Directory to hash.
+
+    Returns:
+        str: Hex digest of the directory contents.
+    """
+    digest = hashlib.sha1()
+    for root, directories, files in os.walk(path):
+        directories.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+            with open(file_path, "rb") as file:
+                digest.update(file.read())
+    return digest.hexdigest()
+
+
+def make_etag(*parts):
+    """
+    Build a strong entity tag from everything a response depends on.
+
+    Args:
+        *parts: Values determining the response body, e.g. a username and a version.
+
+    Returns:
+        str: Entity tag value, without quotes.
+    """
+    data = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:32]
@@ -0,0 +1,65 @@
+import logging
+import threading
+from pymongo import ReturnDocument
+
+
+class IdAllocator:
+    """
+    Hands out increasing integer IDs from a counter document shared by every worker.
+
+    Each process reserves a block of IDs with a single atomic `$inc` and then
+    allocates from it locally, so concurrent inserts never get the same ID and
+    only one in `block_size` allocations touches the database. IDs left in a
+    block when the process stops are skipped, so IDs are unique but may have gaps.
+    """
+    def __init__(self, counters_collection, name, block_size=100):
+        """
+        Initialize the allocator.
+
+        Args:
+            counters_collection (Collection): MongoDB collection holding the counters.
+            name (str): Name of the counter, used as its `_id`.
+            block_size (int): Number of IDs reserved per round-trip.
+        """
+        self.counters_collection = counters_collection
+        self.name = name
+        self.block_size = block_size
+        self.logger = logging.getLogger("IdAllocator")
+        self._next = 0
+        self._end = 0  # First ID past the reserved block
+        self._lock = threading.Lock()
+
+    def ensure_at_least(self, value):
+        """
+        Make sure the counter never hands out IDs up to `value`, e.g. the highest existing ID.
+
+        Args:
+            value (int): Highest ID already in use.
+        """
+        self.counters_collection.update_one({"_id": self.name}, {"$max": {"value": value}}, upsert=True)
+        with self._lock:
+            if self._next <= value:
+                # Drop the local block, it may overlap IDs inserted elsewhere
+                self._next = self._end = 0
+
+    def allocate(self):
+        """
+        Get the next ID.
+
+        Returns:
+            int: A new unique ID.
+        """
+        with self._lock:
+            if self._next >= self._end:
+                counter = self.counters_collection.find_one_and_update(
+                    {"_id": self.name},
+                    {"$inc": {"value": self.block_size}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+                self._end = counter["value"] + 1
+                self._next = self._end - self.block_size
+                self.logger.info(f"Reserved {self.name} IDs {self._next} to {self._end - 1}")
+            allocated = self._next
+            self._next += 1
+            return allocated
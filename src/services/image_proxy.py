@@ -0,0 +1,276 @@
+import hashlib
+import io
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow the origin's own renditions are served
+    Image = None
+
+IMAGE_ORIGIN = os.getenv("TMDB_IMAGE_URL", "https://image.tmdb.org/t/p")
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join("data", "images"))
+IMAGE_CACHE_BYTES = int(os.getenv("IMAGE_CACHE_BYTES", str(512 * 1024 * 1024)))
+IMAGE_SOURCE_SIZE = os.getenv("IMAGE_SOURCE_SIZE", "w780")  # Rendition resized locally into the thumbnails
+IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", "5"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+
+# Thumbnail widths served by the proxy, named like the TMDb poster renditions
+THUMBNAIL_WIDTHS = {"w92": 92, "w154": 154, "w185": 185, "w342": 342, "w500": 500, "w780": 780, "original": None}
+
+# TMDb image paths are flat file names, e.g. "/kqjL17yufvn9OVLyXYpvtyrFfak.jpg"
+IMAGE_PATH = re.compile(r"^[A-Za-z0-9_-]+\.(jpg|jpeg|png|webp)$")
+
+
+class ImageStore:
+    """
+    Content-addressed image cache on disk.
+
+    Images are stored once per content digest under `blobs/`, and every cached
+    rendition key points to its blob from a small file under `keys/`, so workers
+    sharing the directory share the cache. The least recently used blobs are
+    deleted once their total size exceeds `max_bytes`; a key whose blob was
+    deleted is a miss. Each process accounts for the blobs found at startup
+    and the ones it writes.
+    """
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_BYTES):
+        """
+        Initialize the store, indexing the blobs left by earlier runs from the least recently used.
+
+        Args:
+            directory (str): Cache directory, created on the first write.
+            max_bytes (int): Disk budget for the cached images.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._blobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"evictions": 0}
+
+        blobs = []
+        for root, _, files in os.walk(os.path.join(directory, "blobs")):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                blobs.append((stat.st_mtime, name, stat.st_size))
+        for _, digest, size in sorted(blobs):
+            self._blobs[digest] = size
+            self.size += size
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def _key_path(self, key):
+        return os.path.join(self.directory, "keys", hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def get(self, key):
+        """
+        Look up a cached image, marking it as recently used.
+
+        Args:
+            key (str): Rendition key, e.g. "w342/abc.jpg".
+
+        Returns:
+            str or None: The digest of the image, or None if it is not cached.
+        """
+        try:
+            with open(self._key_path(key), encoding="utf-8") as file:
+                digest = file.read()
+            os.utime(self.blob_path(digest))
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            if digest in self._blobs:
+                self._blobs.move_to_end(digest)
+        return digest
+
+    def put(self, key, data):
+        """
+        Store an image, deleting the least recently used ones if the store is full.
+
+        Args:
+            key (str): Rendition key.
+            data (bytes): Image content.
+
+        Returns:
+            str: The digest of the image.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            self._write(path, data)
+        self._write(self._key_path(key), digest.encode("utf-8"))
+
+        with self._lock:
+            if digest not in self._blobs:
+                self.size += len(data)
+            self._blobs[digest] = len(data)
+            self._blobs.move_to_end(digest)
+            evicted = []
+            while self.size > self.max_bytes and len(self._blobs) > 1:
+                old_digest, old_size = self._blobs.popitem(last=False)
+                self.size -= old_size
+                evicted.append(old_digest)
+            self._stats["evictions"] += len(evicted)
+
+        for old_digest in evicted:
+            try:
+                os.remove(self.blob_path(old_digest))
+            except FileNotFoundError:
+                pass  # Already evicted by another worker
+        return digest
+
+    def _write(self, path, data):
+        # Written to a temporary file first, so readers never see a partial image
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    def get_stats(self):
+        with self._lock:
+            return {**self._stats, "images": len(self._blobs), "bytes": self.size}
+
+
+class ImageProxy:
+    """
+    Serves TMDb images at a fixed set of thumbnail widths from an `ImageStore`.
+
+    With Pillow installed, one source rendition per image is downloaded and
+    resized locally into every width; otherwise each width is downloaded from
+    the origin, which serves the same renditions.
+    """
+    def __init__(self, store, origin=IMAGE_ORIGIN, source_size=IMAGE_SOURCE_SIZE, timeout=IMAGE_TIMEOUT,
+                 resize=None):
+        """
+        Initialize the proxy.
+
+        Args:
+            store (ImageStore): Cache of the served images.
+            origin (str): Base URL of the image server, followed by "/<size>/<path>".
+            source_size (str): Origin rendition resized into the smaller widths.
+            timeout (float): Seconds to wait for the origin.
+            resize (bool): Whether to resize locally (defaults to whether Pillow is installed).
+        """
+        self.store = store
+        self.origin = origin.rstrip("/")
+        self.source_size = source_size
+        self.timeout = timeout
+        self.resize = Image is not None if resize is None else resize
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=16))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=16))
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "fetches": 0, "resizes": 0}
+
+    def open_image(self, size, path):
+        """
+        Open an image, downloading and resizing it on the first request.
+
+        Args:
+            size (str): One of `THUMBNAIL_WIDTHS`.
+            path (str): TMDb image path, without the leading slash.
+
+        Returns:
+            tuple: (digest, open binary file, mimetype) of the cached image.
+
+        Raises:
+            ValueError: If the size or the path is not valid.
+            LookupError: If the origin does not have the image.
+            requests.RequestException: If the origin cannot be reached.
+        """
+        if size not in THUMBNAIL_WIDTHS or not IMAGE_PATH.match(path):
+            raise ValueError(f"Invalid image '{size}/{path}'")
+
+        key = f"{size}/{path}"
+        mimetype = mimetypes.guess_type(path)[0]
+        try:
+            digest = self._get(key, size, path)
+            return digest, open(self.store.blob_path(digest), "rb"), mimetype
+        except FileNotFoundError:
+            # Evicted by another worker since the lookup: the key now misses
+            digest = self._get(key, size, path)
+            return digest, open(self.store.blob_path(digest), "rb"), mimetype
+
+    def _get(self, key, size, path):
+        digest = self.store.get(key)
+        if digest is not None:
+            self._count("hits")
+            return digest
+
+        # Concurrent requests for the same image wait for a single download
+        with self._lock:
+            lock = self._loading.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                digest = self.store.get(key)
+                if digest is None:
+                    self._count("misses")
+                    digest = self.store.put(key, self._load(size, path))
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+        return digest
+
+    def _load(self, size, path):
+        width = THUMBNAIL_WIDTHS[size]
+        if not self.resize or width is None or size == self.source_size:
+            return self._fetch(size, path)
+
+        # The source rendition is cached too, so each width costs a resize and no download
+        source_key = f"{self.source_size}/{path}"
+        digest = self.store.get(source_key)
+        if digest is not None:
+            with open(self.store.blob_path(digest), "rb") as file:
+                source = file.read()
+        else:
+            source = self._fetch(self.source_size, path)
+            self.store.put(source_key, source)
+        return self._resize(source, width)
+
+    def _fetch(self, size, path):
+        self._count("fetches")
+        response = self.session.get(f"{self.origin}/{size}/{path}", timeout=self.timeout)
+        if response.status_code == 404:
+            raise LookupError(f"Image '{size}/{path}' not found")
+        response.raise_for_status()
+        return response.content
+
+    def _resize(self, data, width):
+        self._count("resizes")
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= width:
+                return data
+            image_format = image.format
+            height = round(image.height * width / image.width)
+            thumbnail = image.resize((width, height), Image.LANCZOS)
+        output = io.BytesIO()
+        if image_format == "JPEG":
+            thumbnail.save(output, image_format, quality=IMAGE_QUALITY, optimize=True, progressive=True)
+        else:
+            thumbnail.save(output, image_format)
+        return output.getvalue()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self):
+        """
+        Get the proxy counters.
+
+        Returns:
+            dict: Hits, misses, origin fetches and resizes, and the disk usage of the store.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        return {**stats, **self.store.get_stats()}
@@ -0,0 +1,460 @@
+import logging
+import math
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import groupby
+from pymongo import ASCENDING, DESCENDING, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Lists treated as implicit positive feedback
+FEEDBACK_LISTS = ["favorites", "watched"]
+
+DUPLICATE_KEY = 11000
+
+
+def feedback_items(lists):
+    """
+    Get the movies a user gave positive feedback on.
+
+    Args:
+        lists (dict): The user's lists, list name to movie IDs.
+
+    Returns:
+        set: IDs of the movies in the feedback lists.
+    """
+    lists = lists or {}
+    return {movie_id for list_name in FEEDBACK_LISTS for movie_id in lists.get(list_name) or []}
+
+
+class ItemSimilarityService:
+    """
+    Item-item collaborative filtering over the users' lists.
+
+    The batch job streams the list entries one user at a time, counting how often
+    each pair of movies appears together in a user's favorites or watched lists.
+    Pair counts are flushed to a staging collection in bounded chunks, so the
+    memory used by the job does not grow with the number of pairs, and only the
+    per-movie counts are kept until the end.
+
+    The co-occurrence collection holds one document per movie and other movie,
+    stored both ways so the pairs of a movie are read with one index range; the
+    pair of a movie with itself holds the number of users with the movie. The
+    counts are kept up to date by `apply_change`, which only touches the movies
+    of the user whose list changed. Each movie's top-K neighbors by cosine
+    similarity are stored in a precomputed collection keyed by movie ID: changes
+    only bump a version on the affected entries and mark them stale. Stale
+    entries keep being served while they are recomputed in the background from
+    the movie's most shared pairs, and only stored if no change landed meanwhile.
+
+    Documents changed while a build runs are left as `apply_change` updated
+    them rather than overwritten by counts read before the change; the next
+    build reconciles them.
+    """
+    def __init__(self, entries_collection, neighbors_collection, cooccurrence_collection, top_k=20,
+                 min_cooccurrence=2, max_user_items=500, batch_size=1000, max_pending_pairs=500000,
+                 max_candidates=200, executor=None):
+        """
+        Initialize the service.
+
+        Args:
+            entries_collection (Collection): MongoDB collection with the users' list entries.
+            neighbors_collection (Collection): MongoDB collection for the precomputed neighbors.
+            cooccurrence_collection (Collection): MongoDB collection for the per-pair counts.
+            top_k (int): Number of neighbors kept per movie.
+            min_cooccurrence (int): Minimum number of users two movies must share to be neighbors.
+            max_user_items (int): Movies considered per user; pairs grow quadratically with it.
+            batch_size (int): Documents fetched per cursor batch and written per bulk request.
+            max_pending_pairs (int): Pair counts held in memory by the batch job before they are flushed.
+            max_candidates (int): Most shared pairs read to recompute the neighbors of one movie.
+            executor (Executor): Runs the recomputation of stale neighbors. Without one, stale
+                neighbors are only recomputed by `refresh_stale`, e.g. from a batch job.
+        """
+        self.logger = logging.getLogger("ItemSimilarityService")
+        self.entries_collection = entries_collection
+        self.neighbors_collection = neighbors_collection
+        self.cooccurrence_collection = cooccurrence_collection
+        self.staging_collection = cooccurrence_collection.database[f"{cooccurrence_collection.name}_build"]
+        self.top_k = top_k
+        self.min_cooccurrence = min_cooccurrence
+        self.max_user_items = max_user_items
+        self.batch_size = batch_size
+        self.max_pending_pairs = max_pending_pairs
+        self.max_candidates = max_candidates
+        self.executor = executor
+        self._pending = set()
+        self._skipped = set()  # (username, list, movie ID) of changes reverted before being applied
+        self._pending_lock = threading.Lock()
+
+    def ensure_indexes(self):
+        """
+        Create the indexes the pair counts are updated and read by.
+        """
+        self.cooccurrence_collection.create_index([("movie_id", ASCENDING), ("other_id", ASCENDING)], unique=True)
+        # Stale neighbors are recomputed from the most shared pairs of the movie
+        self.cooccurrence_collection.create_index([("movie_id", ASCENDING), ("count", DESCENDING)])
+
+    def get_hot_queries(self):
+        """
+        Get the frequent co-occurrence queries, to verify they are served by an index.
+
+        Returns:
+            list: (name, collection, filter) tuples.
+        """
+        return [("pairs of a movie", self.cooccurrence_collection, {"movie_id": 0})]
+
+    def build(self):
+        """
+        Recompute the counts and neighbors of every movie from the current user lists.
+        Entries from a previous build are replaced, and pairs and movies that no
+        longer appear in any list are removed once the new tables are written.
+        Each write is conditioned on the document not having changed since the
+        build started, so concurrent list changes are not lost.
+
+        Returns:
+            dict: Number of users read and of movies with neighbors written.
+        """
+        built_at = datetime.now(timezone.utc)
+        self.staging_collection.drop()
+        item_counts, users = self._count()
+
+        self._bulk_write(self.cooccurrence_collection, self._count_writes(item_counts, built_at))
+        self.cooccurrence_collection.delete_many(
+            {"built_at": {"$not": {"$gte": built_at}}, "updated_at": {"$not": {"$gte": built_at}}}
+        )
+        self.staging_collection.drop()
+
+        # Rank one movie at a time, reading its pairs in index order
+        movies = 0
+        requests = []
+        for movie_id, pairs in self._iter_pairs():
+            movie_neighbors = self._rank(item_counts.get(movie_id, 0), pairs, item_counts)
+            if movie_neighbors:
+                movies += 1
+                requests.append(UpdateOne(
+                    {"_id": movie_id, "changed_at": {"$not": {"$gte": built_at}}},
+                    {"$set": {"neighbors": movie_neighbors, "stale": False, "built_at": built_at},
+                     "$setOnInsert": {"version": 0}},
+                    upsert=True,
+                ))
+            if len(requests) >= self.batch_size:
+                self._bulk_write(self.neighbors_collection, requests)
+                requests = []
+        self._bulk_write(self.neighbors_collection, requests)
+        self.neighbors_collection.delete_many(
+            {"built_at": {"$not": {"$gte": built_at}}, "changed_at": {"$not": {"$gte": built_at}}}
+        )
+
+        self.logger.info(f"Built neighbors for {movies} movies from {users} users")
+        return {"users": users, "movies": movies}
+
+    def apply_change(self, event):
+        """
+        Update the counts after a list change and invalidate the affected neighbors.
+        Meant to run off the request thread: the user's feedback lists are read
+        here, as they are after the change, and the lists before it are worked
+        out by undoing the change. An event no longer matching the stored lists,
+        e.g. an addition already removed again, is skipped, and so is the opposite
+        event that follows it. Changes reverted by another worker may leave the
+        counts slightly off until the next build. The cost is proportional to the
+        size of the user's lists, not to the catalog.
+
+        Args:
+            event (dict): List change emitted by UserService, with the `username`,
+                the `movie_id`, the `list` and the `action` ('add' or 'remove').
+        """
+        if event["list"] not in FEEDBACK_LISTS:
+            return
+
+        movie_id = event["movie_id"]
+        key = (event["username"], event["list"], movie_id)
+        with self._pending_lock:
+            if key in self._skipped:
+                self._skipped.discard(key)
+                return
+        try:
+            lists = self._read_feedback_lists(event["username"])
+        except Exception as e:
+            self.logger.error(f"Error reading the lists of {event['username']}: {e}")
+            return
+        after = feedback_items(lists)
+        in_list = movie_id in lists[event["list"]]
+        if in_list != (event["action"] == "add"):
+            # Reverted meanwhile: the reverting event is still to come and must be skipped too
+            with self._pending_lock:
+                self._skipped.add(key)
+            return
+        if in_list:
+            lists[event["list"]].remove(movie_id)
+        else:
+            lists[event["list"]].append(movie_id)
+        before = feedback_items(lists)
+
+        # Moving a movie between feedback lists does not change the counts
+        if (movie_id in before) == (movie_id in after):
+            return
+        delta = 1 if movie_id in after else -1
+        others = sorted(before & after)[:self.max_user_items]
+
+        try:
+            changed_at = datetime.now(timezone.utc)
+            pairs = [(movie_id, movie_id)] + [(movie_id, other) for other in others] + [
+                (other, movie_id) for other in others
+            ]
+            self._bulk_write(self.cooccurrence_collection, (
+                UpdateOne(
+                    {"movie_id": first, "other_id": second},
+                    {"$inc": {"count": delta}, "$set": {"updated_at": changed_at}},
+                    upsert=True,
+                )
+                for first, second in pairs
+            ))
+
+            # Lazy invalidation: the entries are recomputed after their next read
+            self._bulk_write(self.neighbors_collection, (
+                UpdateOne(
+                    {"_id": other}, {"$inc": {"version": 1}, "$set": {"stale": True, "changed_at": changed_at}},
+                    upsert=True,
+                )
+                for other in [movie_id] + others
+            ))
+        except Exception as e:
+            self.logger.error(f"Error applying list change for movie {movie_id}: {e}")
+
+    def _read_feedback_lists(self, username):
+        """
+        Read the movies in the feedback lists of a user.
+        """
+        lists = {list_name: [] for list_name in FEEDBACK_LISTS}
+        entries = self.entries_collection.find(
+            {"username": username, "list": {"$in": FEEDBACK_LISTS}}, {"_id": 0, "list": 1, "movie_id": 1}
+        )
+        for entry in entries:
+            lists[entry["list"]].append(entry["movie_id"])
+        return lists
+
+    def get_neighbors(self, movie_id, limit=None):
+        """
+        Get the stored neighbors of a movie. Stale neighbors are served as they
+        are while their recomputation is scheduled.
+
+        Args:
+            movie_id (int): ID of the movie.
+            limit (int): Maximum number of neighbors, all of them if None.
+
+        Returns:
+            list: Neighbors as {"id", "score"} dicts, most similar first.
+        """
+        document = self.neighbors_collection.find_one({"_id": movie_id}, {"neighbors": 1, "stale": 1})
+        if document is None:
+            return []
+        if document.get("stale"):
+            self._schedule_refresh(movie_id)
+        neighbors = document.get("neighbors") or []
+        return neighbors[:limit] if limit is not None else neighbors
+
+    def refresh(self, movie_id):
+        """
+        Recompute the neighbors of one movie from its most shared pairs and store them.
+        Only stored if no change was applied meanwhile, so a concurrent invalidation is not lost.
+
+        Args:
+            movie_id (int): ID of the movie.
+
+        Returns:
+            bool: Whether the neighbors were stored.
+        """
+        document = self.neighbors_collection.find_one({"_id": movie_id}, {"version": 1})
+        if document is None:
+            return False
+
+        pairs = {
+            pair["other_id"]: pair["count"]
+            for pair in self.cooccurrence_collection.find(
+                {"movie_id": movie_id, "other_id": {"$ne": movie_id}, "count": {"$gte": self.min_cooccurrence}},
+                {"other_id": 1, "count": 1},
+            ).sort("count", DESCENDING).limit(self.max_candidates)
+        }
+        item_counts = self._item_counts([movie_id] + list(pairs))
+        neighbors = self._rank(item_counts.get(movie_id, 0), pairs, item_counts)
+
+        result = self.neighbors_collection.update_one(
+            {"_id": movie_id, "version": document.get("version", 0)},
+            {"$set": {"neighbors": neighbors, "stale": False, "built_at": datetime.now(timezone.utc)}},
+        )
+        return result.modified_count > 0
+
+    def refresh_stale(self):
+        """
+        Recompute every stale entry.
+
+        Returns:
+            int: Number of entries stored.
+        """
+        stale = [document["_id"] for document in self.neighbors_collection.find({"stale": True}, {"_id": 1})]
+        return sum(self.refresh(movie_id) for movie_id in stale)
+
+    def _schedule_refresh(self, movie_id):
+        """
+        Recompute the neighbors of a movie in the background, once however often it is read meanwhile.
+        """
+        if self.executor is None:
+            return
+        with self._pending_lock:
+            if movie_id in self._pending:
+                return
+            self._pending.add(movie_id)
+        self.executor.submit(self._run_refresh, movie_id)
+
+    def _run_refresh(self, movie_id):
+        try:
+            self.refresh(movie_id)
+        except Exception as e:
+            self.logger.error(f"Error refreshing the neighbors of movie {movie_id}: {e}")
+        finally:
+            with self._pending_lock:
+                self._pending.discard(movie_id)
+
+    def _item_counts(self, movie_ids):
+        """
+        Read the number of users with each movie, stored as the pair of the movie with itself.
+        """
+        if not movie_ids:
+            return {}
+        return {
+            document["movie_id"]: document["count"]
+            for document in self.cooccurrence_collection.find(
+                {"$or": [{"movie_id": movie_id, "other_id": movie_id} for movie_id in movie_ids]},
+                {"movie_id": 1, "count": 1},
+            )
+        }
+
+    def _rank(self, count, pairs, item_counts):
+        """
+        Rank the neighbors of a movie by cosine similarity and keep the top K.
+
+        Args:
+            count (int): Number of users with the movie.
+            pairs (dict): Other movie ID to number of users with both movies.
+            item_counts (dict): Movie ID to number of users with the movie.
+        """
+        candidates = []
+        for other, shared in pairs.items():
+            other_count = item_counts.get(other, 0)
+            if shared < self.min_cooccurrence or count <= 0 or other_count <= 0:
+                continue
+            candidates.append((shared / math.sqrt(count * other_count), shared, other))
+        return [
+            {"id": neighbor, "score": round(score, 4)}
+            for score, shared, neighbor in sorted(candidates, reverse=True)[:self.top_k]
+        ]
+
+    def _count(self):
+        """
+        Stream the feedback entries grouped by user, count the movies in their lists,
+        and flush the counts of the pairs of movies to the staging collection in chunks.
+        """
+        item_counts = Counter()
+        pair_counts = Counter()
+        users = 0
+
+        # Read in (username, list) index order, so each user's entries arrive together
+        cursor = self.entries_collection.find(
+            {"list": {"$in": FEEDBACK_LISTS}}, {"_id": 0, "username": 1, "movie_id": 1}, batch_size=self.batch_size
+        ).sort([("username", ASCENDING), ("list", ASCENDING)])
+        for _, entries in groupby(cursor, key=lambda entry: entry["username"]):
+            items = sorted({entry["movie_id"] for entry in entries})
+            users += 1
+            items = items[:self.max_user_items]
+
+            item_counts.update(items)
+            for position, first in enumerate(items):
+                for second in items[position + 1:]:
+                    pair_counts[first, second] += 1
+            if len(pair_counts) >= self.max_pending_pairs:
+                self._flush_pairs(pair_counts)
+                pair_counts.clear()
+        self._flush_pairs(pair_counts)
+        return item_counts, users
+
+    def _flush_pairs(self, pair_counts):
+        """
+        Add a chunk of pair counts to the staging collection.
+        """
+        self._bulk_write(self.staging_collection, (
+            UpdateOne({"_id": {"first": first, "second": second}}, {"$inc": {"count": count}}, upsert=True)
+            for (first, second), count in pair_counts.items()
+        ))
+
+    def _count_writes(self, item_counts, built_at):
+        """
+        Generate the writes of the counts of a build: every staged pair both ways,
+        and the count of every movie as its pair with itself. A document updated
+        since the build started does not match, so its upsert fails on the unique
+        index and the document is kept.
+        """
+        cursor = self.staging_collection.find({}, batch_size=self.batch_size)
+        for pair in cursor:
+            first, second = pair["_id"]["first"], pair["_id"]["second"]
+            for movie_id, other in ((first, second), (second, first)):
+                yield UpdateOne(
+                    {"movie_id": movie_id, "other_id": other, "updated_at": {"$not": {"$gte": built_at}}},
+                    {"$set": {"count": pair["count"], "built_at": built_at}},
+                    upsert=True,
+                )
+        for movie_id, count in item_counts.items():
+            yield UpdateOne(
+                {"movie_id": movie_id, "other_id": movie_id, "updated_at": {"$not": {"$gte": built_at}}},
+                {"$set": {"count": count, "built_at": built_at}},
+                upsert=True,
+            )
+
+    def _iter_pairs(self):
+        """
+        Stream the pair counts one movie at a time.
+
+        Yields:
+            tuple: (movie ID, dict of other movie ID to number of users with both movies).
+        """
+        cursor = self.cooccurrence_collection.find(
+            {}, {"_id": 0, "movie_id": 1, "other_id": 1, "count": 1}, batch_size=self.batch_size
+        ).sort([("movie_id", ASCENDING), ("other_id", ASCENDING)])
+        for movie_id, pairs in groupby(cursor, key=lambda pair: pair["movie_id"]):
+            yield movie_id, {pair["other_id"]: pair["count"] for pair in pairs if pair["other_id"] != movie_id}
+
+    def _bulk_write(self, collection, requests):
+        """
+        Send write requests in unordered batches of `batch_size`. Duplicate key
+        errors are expected from the conditional upserts of a build and ignored.
+        """
+        batch = []
+        for request in requests:
+            batch.append(request)
+            if len(batch) >= self.batch_size:
+                self._send(collection, batch)
+                batch = []
+        if batch:
+            self._send(collection, batch)
+
+    def _send(self, collection, batch):
+        try:
+            collection.bulk_write(batch, ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+
+
+if __name__ == "__main__":
+    # Batch entry point, e.g. from a cron job: `python -m services.item_similarity` from `src`
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    db = MongoClient(os.getenv("DATABASE_URL", "mongodb://localhost:27017"))["watchit_db"]
+    service = ItemSimilarityService(
+        db["list_entries"],
+        db["item_neighbors"],
+        db["item_cooccurrence"],
+        top_k=int(os.getenv("ITEM_NEIGHBORS_TOP_K", "20")),
+        min_cooccurrence=int(os.getenv("ITEM_NEIGHBORS_MIN_COOCCURRENCE", "2")),
+    )
+    service.ensure_indexes()
+    service.build()
@@ -1,13 +1,41 @@
 import logging
-from pymongo import MongoClient
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from services.catalog_ingest import INGEST_BATCH_SIZE, INGEST_WRITERS, CatalogIngestor, iter_records
+from services.id_allocator import IdAllocator
+from services.pagination import DEFAULT_PAGE_SIZE, InvalidCursorError, decode_cursor, encode_cursor
+
+# Catalog movies, leaving out the TMDb records mirrored into the same collection: ingested
+# catalog movies have a `title_key`, mirrored ones only a `tmdb_id`
+CATALOG_QUERY = {"$or": [{"title_key": {"$exists": True}}, {"tmdb_id": {"$exists": False}}]}
+
+
+def tmdb_keyed(movies):
+    """
+    Key catalog movies by their TMDb ID, the ID used by the lists and the details pages.
+    Catalog IDs come from a separate counter, so movies without a `tmdb_id` are left out.
+
+    Args:
+        movies (iterable): Catalog movies.
+
+    Yields:
+        dict: Copies of the movies with a TMDb ID, with it as their `id`.
+    """
+    for movie in movies:
+        if movie.get("tmdb_id") is not None:
+            yield dict(movie, id=movie["tmdb_id"])
+
 
 class MovieService:
     """
     Class that manages the business logic for movies.
     """
-    def __init__(self, collection=None):
+    def __init__(self, collection=None, search_index=None, id_allocator=None):
 
         self.logger = logging.getLogger("MovieService")
+        self.search_index = search_index  # Optional SearchIndex fed with inserted movies that have a TMDb ID
         
         if collection is None:
             # Connect to the MongoDB database
@@ -17,16 +45,123 @@ class MovieService:
         else:
             self.collection = collection
 
+        # Movie IDs come from a shared counter, reserved in blocks by each worker
+        self.id_allocator = id_allocator or IdAllocator(self.collection.database["counters"], "movies")
+
+    def ensure_indexes(self):
+        """
+        Create the indexes used by the movie queries.
+        """
+        # Compound keys so the keyset pages are read in index order; they replace the single-field ones
+        self.collection.create_index([("id", ASCENDING), ("_id", ASCENDING)])
+        self.collection.create_index([("list", ASCENDING), ("id", ASCENDING), ("_id", ASCENDING)])
+        existing = self.collection.index_information()
+        for name in ("id_1", "list_1"):
+            if name in existing:
+                self.collection.drop_index(name)
+
+        # A movie ID is unique in the catalog (no `list`, indexed as null) and within each list.
+        # Sparse, so the mirrored TMDb records, which have neither field, are not all keyed as null
+        index = existing.get("list_1_id_1")
+        if index is not None and not index.get("sparse"):
+            self.collection.drop_index("list_1_id_1")
+        try:
+            self.collection.create_index([("list", ASCENDING), ("id", ASCENDING)], unique=True, sparse=True)
+        except OperationFailure as e:
+            self.logger.error(f"Duplicated movie IDs, the unique index on id was not created: {e}")
+
+        # Never hand out an ID that is already taken
+        self.id_allocator.ensure_at_least(self._highest_id())
+
+    def _highest_id(self):
+        """
+        Get the highest catalog movie ID in use, 0 if there are none.
+        """
+        highest = self.collection.find_one(
+            {"list": None, "id": {"$type": "number"}}, {"id": 1}, sort=[("id", DESCENDING)]
+        )
+        return highest["id"] if highest else 0
+
+    def get_hot_queries(self):
+        """
+        Get the frequent movie queries, to verify they are served by an index.
+
+        Returns:
+            list: (name, collection, filter) tuples.
+        """
+        return [
+            ("movie by id", self.collection, {"id": 0}),
+            ("movies by list", self.collection, {"list": ""}),
+        ]
+
     def get_all_movies(self):
         """
-        Get all movies from MongoDB.
+        Get all movies from MongoDB, without the mirrored TMDb records.
         
         Returns:
             list: List of all movies.
         """
         self.logger.info("Fetching all movies from MongoDB")
-        return list(self.collection.find({}, {"_id": 0}))
+        return list(self.collection.find(CATALOG_QUERY, {"_id": 0}))
+
+
+    def get_movies_page(self, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Get a page of the catalog, ordered by movie ID, without the mirrored TMDb records.
+
+        Args:
+            limit (int): Maximum number of movies in the page.
+            cursor (str): Continuation token from the previous page, None for the first one.
+
+        Returns:
+            dict: The `movies` of the page and the `next` token, None on the last page.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        return self._get_page(CATALOG_QUERY, limit, cursor)
+
+    def get_movies_from_list_page(self, list_name, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Get a page of the movies in a list, ordered by movie ID.
 
+        Args:
+            list_name (str): Name of the list.
+            limit (int): Maximum number of movies in the page.
+            cursor (str): Continuation token from the previous page, None for the first one.
+
+        Returns:
+            dict: The `movies` of the page and the `next` token, None on the last page.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        return self._get_page({"list": list_name}, limit, cursor)
+
+    def _get_page(self, query, limit, cursor):
+        """
+        Keyset pagination on (id, _id): each page starts right after the last key
+        of the previous one, so it is an index seek instead of a skip.
+        """
+        position = decode_cursor(cursor)
+        if position is not None:
+            try:
+                last_id, last_oid = position["id"], ObjectId(position["_id"])
+            except (KeyError, TypeError, InvalidId) as e:
+                raise InvalidCursorError("Invalid cursor") from e
+            after = {"$or": [{"id": {"$gt": last_id}}, {"id": last_id, "_id": {"$gt": last_oid}}]}
+            query = {"$and": [query, after]} if query else after
+
+        movies = list(
+            self.collection.find(query).sort([("id", ASCENDING), ("_id", ASCENDING)]).limit(limit + 1)
+        )
+        next_cursor = None
+        if len(movies) > limit:
+            movies = movies[:limit]
+            next_cursor = encode_cursor({"id": movies[-1].get("id"), "_id": str(movies[-1]["_id"])})
+        for movie in movies:
+            movie.pop("_id")
+        return {"movies": movies, "next": next_cursor}
 
     def get_movie_by_id(self, movie_id):
         """
@@ -64,17 +199,64 @@ class MovieService:
         if not (0 <= new_movie["rating"] <= 10):
             raise ValueError("Rating must be between 0 and 10")
         
-        # Assign a new ID to the movie
-        new_movie["id"] = self.collection.count_documents({}) + 1
-        
-        # Add the movie to the database
-        result = self.collection.insert_one(new_movie)
+        # Assign a new ID to the movie and add it to the database; a taken ID (inserted
+        # without the allocator) moves the counter past the highest ID and retries
+        for _ in range(3):
+            new_movie["id"] = self.id_allocator.allocate()
+            try:
+                result = self.collection.insert_one(new_movie)
+                break
+            except DuplicateKeyError:
+                new_movie.pop("_id", None)
+                self.logger.warning(f"Movie ID {new_movie['id']} already taken, skipping ahead")
+                self.id_allocator.ensure_at_least(self._highest_id())
+        else:
+            raise RuntimeError("Could not allocate a free movie ID")
+        new_movie.pop("_id", None)
+        if self.search_index is not None:
+            self.search_index.add_many(tmdb_keyed([new_movie]))
         new_movie["_id"] = str(result.inserted_id)  # Convert _id to string
         return new_movie
     
+    def ingest(self, records, source="catalog", batch_size=INGEST_BATCH_SIZE, writers=INGEST_WRITERS):
+        """
+        Bulk load movies, see CatalogIngestor. Search indexes are not updated;
+        they pick the new movies up when the app starts.
+
+        Args:
+            records (iterable): Movie dicts.
+            source (str): 'catalog' for WatchIT movies or 'tmdb' for TMDb records.
+            batch_size (int): Records validated and written per bulk request.
+            writers (int): Bulk requests sent in parallel.
+
+        Returns:
+            dict: Ingestion report.
+        """
+        # Creates the indexes and moves the ID counter past the stored movies
+        self.ensure_indexes()
+        ingestor = CatalogIngestor(self.collection, batch_size=batch_size, writers=writers, source=source)
+        return ingestor.ingest(records)
+
+    def ingest_file(self, path, **kwargs):
+        """
+        Bulk load a JSON array or NDJSON file, optionally gzip-compressed.
+
+        Args:
+            path (str): Path to the file.
+            **kwargs: Options of `ingest`.
+
+        Returns:
+            dict: Ingestion report.
+        """
+        self.logger.info(f"Ingesting movies from {path}")
+        return self.ingest(iter_records(path), **kwargs)
+
     def add_movie_to_list(self, movie, list_name):
         movie["list"] = list_name
-        self.collection.insert_one(movie)
+        try:
+            self.collection.insert_one(movie)
+        except DuplicateKeyError:
+            pass  # Already in the list
 
     def get_movies_from_list(self, list_name):
         return list(self.collection.find({"list": list_name}, {"_id": 0}))
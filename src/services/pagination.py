@@ -0,0 +1,73 @@
+import base64
+import json
+
+# Page sizes enforced on every paginated query
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a continuation token cannot be decoded.
+    """
+
+
+def encode_cursor(position):
+    """
+    Encode the position after the last item of a page as an opaque continuation token.
+
+    Args:
+        position (dict): JSON-serializable sort key values of the last item.
+
+    Returns:
+        str: URL-safe token.
+    """
+    data = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decode a continuation token produced by `encode_cursor`.
+
+    Args:
+        token (str): Token from a previous page, or None for the first page.
+
+    Returns:
+        dict or None: The position after the last item, or None for the first page.
+
+    Raises:
+        InvalidCursorError: If the token is malformed.
+    """
+    if not token:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+    if not isinstance(position, dict):
+        raise InvalidCursorError("Invalid cursor")
+    return position
+
+
+def page_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Parse a requested page size, clamped to the allowed range.
+
+    Args:
+        value (str or int): Requested page size, or None for the default.
+        default (int): Page size used when none is requested.
+        maximum (int): Largest page size allowed.
+
+    Returns:
+        int: The page size.
+
+    Raises:
+        ValueError: If the value is not an integer.
+    """
+    if value is None or value == "":
+        return default
+    try:
+        return min(max(int(value), 1), maximum)
+    except (TypeError, ValueError) as e:
+        raise ValueError("'limit' must be an integer") from e
@@ -0,0 +1,194 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+
+# Work factor used when none is configured
+DEFAULT_ROUNDS = 12
+
+
+class HasherBusyError(Exception):
+    """
+    Raised when too many hashing jobs are already queued.
+    """
+
+
+def hash_password(password, rounds):
+    """
+    Hash a password with bcrypt. Module-level so it can run in a worker process.
+
+    Args:
+        password (bytes): Password to hash.
+        rounds (int): bcrypt cost factor.
+
+    Returns:
+        bytes: The bcrypt hash.
+    """
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def check_password(password, password_hash):
+    """
+    Check a password against a bcrypt hash. Module-level so it can run in a worker process.
+
+    Args:
+        password (bytes): Password to check.
+        password_hash (bytes): Stored bcrypt hash.
+
+    Returns:
+        bool: True if the password matches.
+    """
+    return bcrypt.checkpw(password, password_hash)
+
+
+def get_rounds(password_hash):
+    """
+    Read the cost factor of a bcrypt hash (e.g. 12 for `$2b$12$...`).
+
+    Args:
+        password_hash (bytes): Stored bcrypt hash.
+
+    Returns:
+        int: The cost factor.
+    """
+    return int(password_hash.split(b"$")[2])
+
+
+def calibrate_rounds(target_ms=250, min_rounds=10, max_rounds=16):
+    """
+    Pick the highest cost factor whose hashing time stays within a target on this machine.
+    Each extra round doubles the work, so one measurement is enough to extrapolate.
+
+    Args:
+        target_ms (float): Target hashing time in milliseconds.
+        min_rounds (int): Lowest cost factor accepted.
+        max_rounds (int): Highest cost factor accepted.
+
+    Returns:
+        int: The calibrated cost factor.
+    """
+    start = time.perf_counter()
+    hash_password(b"calibration", min_rounds)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed_ms * 2 <= target_ms:
+        rounds += 1
+        elapsed_ms *= 2
+    return rounds
+
+
+def default_pool_size(server_workers=1, cpu_count=None):
+    """
+    Size the hashing pool of one server worker so that the pools of all the workers
+    of a host add up to about one process per CPU.
+
+    Args:
+        server_workers (int): Server worker processes on the host, each with its own pool.
+        cpu_count (int): CPUs of the host, detected by default.
+
+    Returns:
+        int: Worker processes for one pool, at least 1.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count // max(1, server_workers))
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool so login bursts do not hold the GIL
+    or the request threads that serve the rest of the app.
+
+    The request thread still waits for its result; the pool only keeps the hashing
+    itself off the server processes. Every server worker has its own pool, so size
+    it with `default_pool_size` to keep the host from being oversubscribed.
+
+    The number of pending jobs is bounded: when the queue is full, callers wait
+    at most `queue_timeout` seconds and then get a HasherBusyError (backpressure)
+    instead of piling up behind the pool.
+    """
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=0, max_pending=64, queue_timeout=1.0):
+        """
+        Initialize the hasher.
+
+        Args:
+            rounds (int): bcrypt cost factor for new hashes.
+            workers (int): Worker processes; 0 hashes inline on the calling thread.
+            max_pending (int): Maximum number of jobs queued or running at once.
+            queue_timeout (float): Seconds to wait for a free slot before giving up.
+        """
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.logger = logging.getLogger("PasswordHasher")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def hash(self, password):
+        """
+        Hash a password with the configured cost factor.
+
+        Args:
+            password (str): Password to hash.
+
+        Returns:
+            bytes: The bcrypt hash.
+        """
+        return self._run(hash_password, password.encode("utf-8"), self.rounds)
+
+    def verify(self, password, password_hash):
+        """
+        Check a password against a stored hash.
+
+        Args:
+            password (str): Password to check.
+            password_hash (bytes): Stored bcrypt hash.
+
+        Returns:
+            bool: True if the password matches.
+        """
+        return self._run(check_password, password.encode("utf-8"), password_hash)
+
+    def needs_rehash(self, password_hash):
+        """
+        Check whether a stored hash uses a lower cost factor than the configured one.
+
+        Args:
+            password_hash (bytes): Stored bcrypt hash.
+
+        Returns:
+            bool: True if the hash should be upgraded.
+        """
+        return get_rounds(password_hash) < self.rounds
+
+    def _run(self, func, *args):
+        """
+        Run a hashing function in the pool, honoring the pending jobs limit.
+
+        Raises:
+            HasherBusyError: If no slot frees up within the queue timeout.
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusyError("Too many password hashing requests, try again later")
+        try:
+            if self.workers <= 0:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def _get_executor(self):
+        """
+        Create the process pool on first use, after the server has forked its workers.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+        return self._executor
@@ -0,0 +1,49 @@
+import logging
+
+logger = logging.getLogger("QueryPlans")
+
+
+class QueryPlanError(Exception):
+    """
+    Raised when a hot query is not served by an index.
+    """
+
+
+def plan_stages(plan):
+    """
+    Collect every stage name of a query plan, including nested input stages.
+
+    Args:
+        plan (dict): Query plan (or any part of an `explain()` output).
+
+    Returns:
+        list: Stage names, e.g. ['FETCH', 'IXSCAN'].
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(plan_stages(value))
+    return stages
+
+
+def verify_query_plans(queries):
+    """
+    Check with `explain()` that every hot query is served by an index.
+
+    Args:
+        queries (list): (name, collection, filter) tuples describing the hot queries.
+
+    Raises:
+        QueryPlanError: If any query would run a collection scan.
+    """
+    for name, collection, query in queries:
+        explain = collection.find(query).explain()
+        stages = plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in stages or "IXSCAN" not in stages:
+            raise QueryPlanError(f"Query '{name}' on '{collection.name}' does not use an index: {stages}")
+        logger.info(f"Query '{name}' on '{collection.name}' uses plan {stages}")
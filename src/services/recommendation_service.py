@@ -0,0 +1,238 @@
+import json
+import logging
+import math
+import threading
+import zlib
+import numpy as np
+from services.search_index import tokenize
+
+# Hashed feature sizes: fixed, so new movies can be added without rebuilding a vocabulary
+TEXT_FEATURES = 256
+GENRE_FEATURES = 32
+
+# Block weights applied before normalizing each movie vector
+TEXT_WEIGHT = 1.0
+GENRE_WEIGHT = 1.0
+RATING_WEIGHT = 0.5
+
+# Weight of each list in the user profile
+PROFILE_WEIGHTS = {"favorites": 2.0, "watched": 1.0}
+
+
+def load_catalog(path):
+    """
+    Load the bundled movie catalog.
+
+    Args:
+        path (str): Path to a JSON file with a list of movies.
+
+    Returns:
+        list: Movies of the catalog, or an empty list if the file cannot be read.
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        logging.getLogger("RecommendationService").warning(f"Could not load catalog {path}: {e}")
+        return []
+
+
+def _bucket(token, size):
+    # Stable across processes, unlike hash()
+    return zlib.crc32(token.encode("utf-8")) % size
+
+
+class RecommendationService:
+    """
+    Content-based recommendations scored with NumPy.
+
+    Each movie becomes a fixed-size vector made of hashed TF-IDF features of its
+    title and overview, hashed genres and its rating, normalized to unit length.
+    A user's profile is the weighted mean of the vectors of their favorite and
+    watched movies, and candidates are ranked by cosine similarity with a single
+    matrix-vector product over the whole catalog.
+
+    Movies are keyed by `id`, which must be their TMDb ID like in the user lists;
+    catalog movies are added with `movie_service.tmdb_keyed`.
+    """
+    def __init__(self, text_features=TEXT_FEATURES, genre_features=GENRE_FEATURES):
+        """
+        Initialize an empty recommender.
+
+        Args:
+            text_features (int): Hashed dimensions for the title and overview terms.
+            genre_features (int): Hashed dimensions for the genres.
+        """
+        self.logger = logging.getLogger("RecommendationService")
+        self.text_features = text_features
+        self.genre_features = genre_features
+        self.dimensions = text_features + genre_features + 1
+        self.movies = []
+        self.rows = {}  # TMDb movie_id -> row of the feature matrix
+        self._matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._idf = np.ones(text_features, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.movies)
+
+    def build(self, movies):
+        """
+        Replace the catalog and recompute the term weights from it.
+        Later movies with the same ID replace earlier ones.
+
+        Args:
+            movies (iterable): Movies keyed by TMDb ID, e.g. mirrored and cached TMDb records.
+        """
+        unique = {}
+        for movie in movies:
+            if movie.get("id") is not None:
+                unique[movie["id"]] = movie
+        movies = list(unique.values())
+
+        term_counts = np.zeros((len(movies), self.text_features), dtype=np.float32)
+        for row, movie in enumerate(movies):
+            term_counts[row] = self._term_counts(movie)
+
+        # Smoothed inverse document frequency of each hashed term
+        document_frequency = np.count_nonzero(term_counts, axis=0)
+        idf = (np.log((1 + len(movies)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        matrix = np.zeros((max(len(movies), 16), self.dimensions), dtype=np.float32)
+        for row, movie in enumerate(movies):
+            matrix[row] = self._vector(movie, term_counts[row], idf)
+
+        with self._lock:
+            self.movies = movies
+            self.rows = {movie["id"]: row for row, movie in enumerate(movies)}
+            self._matrix = matrix
+            self._idf = idf
+        self.logger.info(f"Built recommendation features for {len(movies)} movies")
+
+    def add(self, movie):
+        """
+        Add or replace a single movie, reusing the current term weights.
+
+        Args:
+            movie (dict): Movie to add.
+        """
+        movie_id = movie.get("id")
+        if movie_id is None:
+            return
+
+        with self._lock:
+            vector = self._vector(movie, self._term_counts(movie), self._idf)
+            row = self.rows.get(movie_id)
+            if row is None:
+                row = len(self.movies)
+                if row == len(self._matrix):
+                    # Grow by doubling; readers keep the old matrix they already hold
+                    grown = np.zeros((max(16, 2 * row), self.dimensions), dtype=np.float32)
+                    grown[:row] = self._matrix[:row]
+                    self._matrix = grown
+                self.movies.append(movie)
+                self.rows[movie_id] = row
+            else:
+                self.movies[row] = movie
+            self._matrix[row] = vector
+
+    def recommend(self, lists, limit=20):
+        """
+        Recommend movies for a user.
+
+        Args:
+            lists (dict): The user's lists, list name to movie IDs.
+            limit (int): Maximum number of recommendations.
+
+        Returns:
+            list: Recommended movies, best first, each with a `score` between -1 and 1.
+        """
+        return self.recommend_many([lists], limit)[0]
+
+    def recommend_many(self, users_lists, limit=20):
+        """
+        Recommend movies for several users, scoring all of them in a single matrix product.
+
+        Args:
+            users_lists (list): Lists of each user, list name to movie IDs.
+            limit (int): Maximum number of recommendations per user.
+
+        Returns:
+            list: Recommendations of each user, in the same order.
+        """
+        with self._lock:
+            count = len(self.movies)
+            matrix = self._matrix[:count]
+            movies = self.movies[:count]
+            rows = self.rows
+
+        profiles = np.zeros((len(users_lists), self.dimensions), dtype=np.float32)
+        excluded = []
+        for user, lists in enumerate(users_lists):
+            seen = set()
+            for list_name, weight in PROFILE_WEIGHTS.items():
+                seeds = [rows[movie_id] for movie_id in lists.get(list_name, []) if rows.get(movie_id, count) < count]
+                if seeds:
+                    profiles[user] += weight * matrix[seeds].sum(axis=0)
+                seen.update(seeds)
+            excluded.append(seen)
+
+        norms = np.linalg.norm(profiles, axis=1, keepdims=True)
+        profiles /= np.where(norms > 0, norms, 1)
+
+        # Cosine similarity of every movie with every profile; movie rows are unit length
+        scores = matrix @ profiles.T
+
+        recommendations = []
+        for user, seen in enumerate(excluded):
+            if not seen or limit <= 0:
+                recommendations.append([])
+                continue
+            user_scores = scores[:, user].copy()
+            user_scores[list(seen)] = -np.inf
+            top = min(limit, count - len(seen))
+            if top <= 0:
+                recommendations.append([])
+                continue
+            best = np.argpartition(-user_scores, top - 1)[:top]
+            best = best[np.argsort(-user_scores[best])]
+            recommendations.append([
+                dict(movies[row], score=round(float(user_scores[row]), 4)) for row in best
+            ])
+        return recommendations
+
+    def _term_counts(self, movie):
+        """
+        Count the hashed title and overview terms of a movie, with sublinear scaling.
+        """
+        counts = np.zeros(self.text_features, dtype=np.float32)
+        text = " ".join(filter(None, [movie.get("title"), movie.get("original_title"), movie.get("overview")]))
+        for token in tokenize(text):
+            counts[_bucket(token, self.text_features)] += 1
+        nonzero = counts > 0
+        counts[nonzero] = 1 + np.log(counts[nonzero])
+        return counts
+
+    def _vector(self, movie, term_counts, idf):
+        """
+        Build the unit-length feature vector of a movie.
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+
+        text = term_counts * idf
+        text_norm = np.linalg.norm(text)
+        if text_norm > 0:
+            vector[:self.text_features] = TEXT_WEIGHT * text / text_norm
+
+        genres = [genre.get("name") for genre in movie.get("genres") or []] + [movie.get("genre")]
+        genres = {genre.casefold() for genre in genres if genre}
+        for genre in genres:
+            vector[self.text_features + _bucket(genre, self.genre_features)] = GENRE_WEIGHT / math.sqrt(len(genres))
+
+        # Catalog movies have a 0-10 `rating`, TMDb records a 0-10 `vote_average`
+        rating = movie.get("rating", movie.get("vote_average"))
+        if isinstance(rating, (int, float)):
+            vector[-1] = RATING_WEIGHT * min(max(rating, 0), 10) / 10
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
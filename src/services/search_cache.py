@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_query(query):
+    """
+    Normalize a search query so equivalent spellings share a cache entry.
+
+    Args:
+        query (str): Raw search term.
+
+    Returns:
+        str: Unicode-normalized, case-folded query with collapsed whitespace.
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(query.split())
+
+
+class SearchCache:
+    """
+    In-process cache of TMDb search results keyed by normalized query.
+
+    Entries expire after a TTL and the least recently used ones are evicted
+    once the estimated size of the cached results exceeds `max_bytes`.
+    Optionally, a query can be answered by filtering the results of a shorter
+    cached prefix, as long as that prefix returned every match (a single page).
+    """
+    def __init__(self, max_bytes=8 * 1024 * 1024, ttl=600, prefix_reuse=False, min_prefix_length=3,
+                 clock=time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes (int): Approximate memory budget for the cached results.
+            ttl (float): Seconds an entry stays valid.
+            prefix_reuse (bool): Whether refined queries may be served from a cached prefix.
+            min_prefix_length (int): Shortest prefix considered for reuse.
+            clock (callable): Time source, injectable for tests.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.prefix_reuse = prefix_reuse
+        self.min_prefix_length = min_prefix_length
+        self.clock = clock
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "prefix_hits": 0, "misses": 0}
+
+    def get(self, query):
+        """
+        Get cached results for a query.
+
+        Args:
+            query (str): Raw search term.
+
+        Returns:
+            list or None: Cached results, or None on a miss.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is not None:
+                self._stats["hits"] += 1
+                return entry[0]
+
+            if self.prefix_reuse:
+                for end in range(len(key) - 1, self.min_prefix_length - 1, -1):
+                    prefix_entry = self._get_entry(key[:end])
+                    if prefix_entry is not None and prefix_entry[1]:
+                        results = [movie for movie in prefix_entry[0] if _matches(movie, key)]
+                        self._store(key, results, True)
+                        self._stats["prefix_hits"] += 1
+                        return results
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, query, results, complete=False):
+        """
+        Store the results of a query.
+
+        Args:
+            query (str): Raw search term.
+            results (list): Search results returned by TMDb.
+            complete (bool): Whether `results` holds every match for the query.
+        """
+        with self._lock:
+            self._store(normalize_query(query), results, complete)
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def get_stats(self):
+        """
+        Get hit and miss counters for the cache.
+
+        Returns:
+            dict: Counters, hit ratio and memory usage.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self.size
+        hits = stats["hits"] + stats["prefix_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def _get_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        results, complete, expires_at, size = entry
+        if self.clock() >= expires_at:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return results, complete
+
+    def _store(self, key, results, complete):
+        size = len(key) + len(json.dumps(results, default=str))
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (results, complete, self.clock() + self.ttl, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[3]
+
+
+def _matches(movie, query):
+    """
+    Check whether a search result still matches a refined query.
+    """
+    titles = (movie.get("title") or "", movie.get("original_title") or "")
+    return any(query in normalize_query(title) for title in titles)
@@ -0,0 +1,214 @@
+import bisect
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from services.search_cache import normalize_query
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Field weights applied to term frequencies
+TITLE_WEIGHT = 2.0
+GENRE_WEIGHT = 1.0
+
+
+def tokenize(text):
+    """
+    Split a text into normalized search tokens.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list: Case-folded word tokens.
+    """
+    return TOKEN_PATTERN.findall(normalize_query(text or ""))
+
+
+def trigrams(term):
+    """
+    Get the character trigrams of a term, padded so short terms still have some.
+
+    Args:
+        term (str): Normalized token.
+
+    Returns:
+        set: Trigrams of the term.
+    """
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    In-process inverted index over movie titles and genres with BM25 ranking.
+
+    Query terms match indexed terms exactly, by prefix (for the last term,
+    so type-ahead queries work) or fuzzily through shared character trigrams.
+    A movie is only returned when every query term matches it.
+
+    Movies are keyed by `id`, which must be their TMDb ID since results link to
+    the details pages; catalog movies are added with `movie_service.tmdb_keyed`.
+    """
+    def __init__(self, k1=1.2, b=0.75, fuzzy_threshold=0.4):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 document length normalization.
+            fuzzy_threshold (float): Minimum trigram similarity for a fuzzy match.
+        """
+        self.k1 = k1
+        self.b = b
+        self.fuzzy_threshold = fuzzy_threshold
+        self.documents = {}
+        self._postings = defaultdict(dict)  # term -> {movie_id: weighted term frequency}
+        self._doc_terms = {}  # movie_id -> indexed terms, for removals
+        self._lengths = {}
+        self._total_length = 0.0
+        self._trigrams = defaultdict(set)  # trigram -> terms
+        self._terms = []  # Sorted vocabulary for prefix lookups
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, movie):
+        """
+        Add or replace a movie in the index.
+
+        Args:
+            movie (dict): Movie with an `id`, a `title` and optionally `original_title`,
+                a `genre` string or a TMDb `genres` list.
+        """
+        movie_id = movie.get("id")
+        if movie_id is None:
+            return
+
+        frequencies = Counter()
+        for token in tokenize(movie.get("title")) + tokenize(movie.get("original_title")):
+            frequencies[token] += TITLE_WEIGHT
+        genres = [genre.get("name") for genre in movie.get("genres") or []] + [movie.get("genre")]
+        for token in tokenize(" ".join(genre for genre in genres if genre)):
+            frequencies[token] += GENRE_WEIGHT
+
+        with self._lock:
+            self.remove(movie_id)
+            self.documents[movie_id] = movie
+            self._lengths[movie_id] = sum(frequencies.values())
+            self._total_length += self._lengths[movie_id]
+            for term, frequency in frequencies.items():
+                if term not in self._postings:
+                    bisect.insort(self._terms, term)
+                    for trigram in trigrams(term):
+                        self._trigrams[trigram].add(term)
+                self._postings[term][movie_id] = frequency
+            self._doc_terms[movie_id] = list(frequencies)
+
+    def add_many(self, movies):
+        """
+        Add several movies to the index.
+
+        Args:
+            movies (iterable): Movies to add.
+        """
+        for movie in movies:
+            self.add(movie)
+
+    def remove(self, movie_id):
+        """
+        Remove a movie from the index if present. Terms no other movie has are
+        dropped from the vocabulary, so replaced titles do not accumulate.
+
+        Args:
+            movie_id (int): ID of the movie to remove.
+        """
+        with self._lock:
+            if self.documents.pop(movie_id, None) is None:
+                return
+            self._total_length -= self._lengths.pop(movie_id)
+            for term in self._doc_terms.pop(movie_id):
+                postings = self._postings[term]
+                del postings[movie_id]
+                if postings:
+                    continue
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+                for trigram in trigrams(term):
+                    bucket = self._trigrams[trigram]
+                    bucket.discard(term)
+                    if not bucket:
+                        del self._trigrams[trigram]
+
+    def search(self, query, limit=20):
+        """
+        Search the index.
+
+        Args:
+            query (str): Search term.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: Matching movies, best ranked first.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            if not self.documents:
+                return []
+            average_length = self._total_length / len(self.documents) or 1.0
+
+            scores = None
+            for position, token in enumerate(tokens):
+                token_scores = defaultdict(float)
+                expansions = self._expand(token, prefix=position == len(tokens) - 1)
+                for term, similarity in expansions.items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + (len(self.documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for movie_id, frequency in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self._lengths[movie_id] / average_length)
+                        score = similarity * idf * frequency * (self.k1 + 1) / (frequency + norm)
+                        token_scores[movie_id] = max(token_scores[movie_id], score)
+
+                # Every query term has to match
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {movie_id: score + token_scores[movie_id]
+                              for movie_id, score in scores.items() if movie_id in token_scores}
+                if not scores:
+                    return []
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [self.documents[movie_id] for movie_id, _ in ranked]
+
+    def _expand(self, token, prefix=False):
+        """
+        Find the indexed terms matching a query token, with a similarity weight.
+        """
+        expansions = {}
+        if self._postings.get(token):
+            expansions[token] = 1.0
+
+        if prefix:
+            position = bisect.bisect_left(self._terms, token)
+            while position < len(self._terms) and self._terms[position].startswith(token):
+                term = self._terms[position]
+                if self._postings[term]:
+                    expansions.setdefault(term, len(token) / len(term))
+                position += 1
+
+        token_trigrams = trigrams(token)
+        candidates = Counter()
+        for trigram in token_trigrams:
+            candidates.update(self._trigrams.get(trigram, ()))
+        for term, shared in candidates.items():
+            if term in expansions or not self._postings[term]:
+                continue
+            similarity = shared / (len(token_trigrams) + len(trigrams(term)) - shared)
+            if similarity >= self.fuzzy_threshold:
+                expansions[term] = similarity
+        return expansions
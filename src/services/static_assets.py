@@ -0,0 +1,165 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:  # Without brotli only the gzip variants are built
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+ASSETS_DIR = os.getenv("ASSETS_DIR", os.path.join(STATIC_DIR, "dist"))
+
+# Files fingerprinted by the build, and the ones worth compressing
+ASSET_EXTENSIONS = {".css", ".js", ".svg", ".png", ".jpg", ".ico", ".woff2"}
+COMPRESSED_EXTENSIONS = {".css", ".js", ".svg"}
+
+# Content-Encoding of each precompressed variant, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def fingerprint(name, data):
+    """
+    Name a file after its content, so its URL changes whenever the content does.
+
+    Args:
+        name (str): Path of the file relative to the static directory, e.g. "js/base.js".
+        data (bytes): Content of the file.
+
+    Returns:
+        str: The fingerprinted path, e.g. "js/base.3f2a9c1d8e4b.js".
+    """
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+
+
+def compress(data):
+    """
+    Build the precompressed variants of a file that are smaller than the original.
+
+    Args:
+        data (bytes): Content of the file.
+
+    Returns:
+        dict: Compressed content by encoding.
+    """
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {encoding: content for encoding, content in variants.items() if len(content) < len(data)}
+
+
+def build_assets(source_dir=STATIC_DIR, output_dir=ASSETS_DIR):
+    """
+    Copy the static assets under fingerprinted names, with their precompressed
+    variants, and write the manifest mapping every asset to its build.
+
+    Args:
+        source_dir (str): Directory of the static assets.
+        output_dir (str): Build directory, replaced entirely.
+
+    Returns:
+        dict: The manifest written to `manifest.json`.
+    """
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+
+    manifest = {"files": {}, "encodings": {}}
+    for root, directories, files in os.walk(source_dir):
+        # Never fingerprint an earlier build
+        directories[:] = sorted(
+            d for d in directories if os.path.abspath(os.path.join(root, d)) != os.path.abspath(output_dir)
+        )
+        for file_name in sorted(files):
+            extension = os.path.splitext(file_name)[1]
+            if extension not in ASSET_EXTENSIONS:
+                continue
+            name = os.path.relpath(os.path.join(root, file_name), source_dir).replace(os.sep, "/")
+            with open(os.path.join(root, file_name), "rb") as file:
+                data = file.read()
+
+            built = fingerprint(name, data)
+            variants = compress(data) if extension in COMPRESSED_EXTENSIONS else {}
+            _write(os.path.join(output_dir, built), data)
+            for encoding, content in variants.items():
+                _write(os.path.join(output_dir, built + ENCODINGS[encoding]), content)
+            manifest["files"][name] = built
+            manifest["encodings"][built] = sorted(variants)
+
+    _write(os.path.join(output_dir, "manifest.json"), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+class StaticAssets:
+    """
+    Resolves static assets to their fingerprinted builds from the manifest
+    written by `build_assets`. Without a build, assets are served unchanged
+    from the static directory, e.g. during development.
+    """
+    def __init__(self, directory=ASSETS_DIR):
+        """
+        Load the manifest of a build.
+
+        Args:
+            directory (str): Build directory.
+        """
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as file:
+                self.manifest = json.load(file)
+        except FileNotFoundError:
+            self.manifest = {"files": {}, "encodings": {}}
+
+        # Identifies the build, e.g. for the ETags of the pages linking the assets
+        self.version = hashlib.sha1(json.dumps(self.manifest, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def built_name(self, name):
+        """
+        Get the fingerprinted name of an asset.
+
+        Args:
+            name (str): Path of the asset relative to the static directory.
+
+        Returns:
+            str or None: The fingerprinted path, or None if the asset was not built.
+        """
+        return self.manifest["files"].get(name)
+
+    def resolve(self, built_name, accept_encodings):
+        """
+        Pick the file to send for a fingerprinted asset, preferring the smallest
+        precompressed variant the client accepts.
+
+        Args:
+            built_name (str): Fingerprinted path of the asset.
+            accept_encodings: Encodings accepted by the client, e.g. `request.accept_encodings`.
+
+        Returns:
+            tuple or None: (file path, mimetype, content encoding or None), or None if
+            the asset is not part of the build.
+        """
+        encodings = self.manifest["encodings"].get(built_name)
+        if encodings is None:
+            return None
+
+        path = os.path.join(self.directory, built_name)
+        mimetype = mimetypes.guess_type(built_name)[0]
+        for encoding, suffix in ENCODINGS.items():
+            if encoding in encodings and accept_encodings.quality(encoding) > 0:
+                return path + suffix, mimetype, encoding
+        return path, mimetype, None
+
+
+if __name__ == "__main__":
+    # Build step, run once per deployment: python src/services/static_assets.py
+    manifest = build_assets()
+    print(json.dumps({"assets": len(manifest["files"]), "brotli": brotli is not None}))
@@ -0,0 +1,426 @@
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+import requests
+from pymongo import ASCENDING, DESCENDING, MongoClient, UpdateOne
+from pymongo.errors import PyMongoError
+from services.catalog_ingest import iter_records
+from services.movie_service import MovieService
+from services.tmdb_service import TMDB_CHANGES_MAX_DAYS
+
+# TMDb publishes the IDs of every movie once a day as a gzipped NDJSON file
+TMDB_EXPORT_URL = "https://files.tmdb.org/p/exports/movie_ids_{date}.json.gz"
+
+# Sync settings
+MIRROR_BATCH_SIZE = int(os.getenv("TMDB_MIRROR_BATCH_SIZE", "100"))
+MIRROR_WORKERS = int(os.getenv("TMDB_MIRROR_WORKERS", "4"))
+
+# Mirrored movies each worker loads at startup into its search index and recommendations
+MIRROR_STARTUP_MOVIES = int(os.getenv("TMDB_MIRROR_STARTUP_MOVIES", "20000"))
+MIRROR_READ_BATCH_SIZE = int(os.getenv("TMDB_MIRROR_READ_BATCH_SIZE", "1000"))
+
+# Bookkeeping fields of a mirrored movie, never served as TMDb details
+MIRROR_FIELDS = ["_id", "id", "list", "title_key", "export_date", "details_synced_at"]
+
+
+def changed_ids(records):
+    """
+    Get the movie IDs of a replayed changes feed.
+
+    Args:
+        records (iterable): Pages of the `/movie/changes` endpoint, or their
+            `{"id": ...}` results one per record.
+
+    Yields:
+        int: IDs of the changed movies.
+    """
+    for record in records:
+        for result in record["results"] if "results" in record else [record]:
+            yield result["id"]
+
+
+def download_export(day, directory):
+    """
+    Download TMDb's daily movie ID export.
+
+    Args:
+        day (date): Day of the export.
+        directory (str): Directory the file is written to.
+
+    Returns:
+        str: Path to the downloaded `.json.gz` file.
+    """
+    path = os.path.join(directory, f"movie_ids_{day:%m_%d_%Y}.json.gz")
+    with requests.get(TMDB_EXPORT_URL.format(date=f"{day:%m_%d_%Y}"), stream=True, timeout=30) as response:
+        response.raise_for_status()
+        with open(path, "wb") as file:
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                file.write(chunk)
+    return path
+
+
+def _batches(items, size):
+    """
+    Split an iterable into lists of at most `size` items.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class TMDbMirror:
+    """
+    Local copy of the TMDb catalog, kept in the movies collection.
+
+    Every movie of the daily ID export is stored once, keyed by its `tmdb_id`.
+    Its details are filled in by TMDbMirrorSync and marked stale (no
+    `details_synced_at`) when the changes feed reports an edit, so a movie is
+    only downloaded again when it actually changed.
+    """
+    def __init__(self, collection, state_collection=None):
+        """
+        Initialize the mirror.
+
+        Args:
+            collection (Collection): MongoDB collection for the movies.
+            state_collection (Collection): Collection holding the sync progress,
+                `sync_state` of the same database by default.
+        """
+        self.logger = logging.getLogger("TMDbMirror")
+        self.collection = collection
+        self.state_collection = state_collection if state_collection is not None else collection.database["sync_state"]
+
+    def ensure_indexes(self):
+        """
+        Create the indexes used to serve and refresh the mirrored movies.
+        """
+        # Same definition as the ingestion one, so whichever runs first creates it
+        self.collection.create_index([("tmdb_id", ASCENDING)], unique=True, sparse=True)
+        # Stale movies are refreshed most popular first
+        self.collection.create_index([("details_synced_at", ASCENDING), ("popularity", DESCENDING)])
+        # The most popular movies are loaded at startup
+        self.collection.create_index([("popularity", DESCENDING)])
+
+    def get_hot_queries(self):
+        """
+        Get the frequent mirror queries, to verify they are served by an index.
+
+        Returns:
+            list: (name, collection, filter) tuples.
+        """
+        return [("mirrored movie by TMDb id", self.collection, {"tmdb_id": 0})]
+
+    def get(self, movie_id):
+        """
+        Get the mirrored details of a movie.
+
+        Errors are logged and reported as a miss, so an unavailable database
+        falls back to the TMDb API.
+
+        Args:
+            movie_id (int): TMDb ID of the movie.
+
+        Returns:
+            dict or None: Movie details in the TMDb API format, or None if they
+            are not mirrored or are stale.
+        """
+        try:
+            movie = self.collection.find_one(
+                {"tmdb_id": movie_id, "details_synced_at": {"$ne": None}},
+                {field: 0 for field in MIRROR_FIELDS},
+            )
+        except PyMongoError as e:
+            self.logger.warning(f"Error reading mirrored movie {movie_id}: {e}")
+            return None
+
+        if movie is not None:
+            movie["id"] = movie.pop("tmdb_id")
+        return movie
+
+    def iter_movies(self, limit=MIRROR_STARTUP_MOVIES, batch_size=MIRROR_READ_BATCH_SIZE):
+        """
+        Stream the mirrored movies with details, most popular first, keyed by TMDb ID.
+        The whole export is far too large to load, so only the first `limit` are read.
+
+        Args:
+            limit (int): Maximum number of movies.
+            batch_size (int): Movies fetched from MongoDB per round trip.
+
+        Yields:
+            dict: Movie details in the TMDb API format.
+        """
+        cursor = self.collection.find(
+            {"tmdb_id": {"$exists": True}, "details_synced_at": {"$ne": None}},
+            {field: 0 for field in MIRROR_FIELDS},
+        ).sort("popularity", DESCENDING).limit(limit).batch_size(batch_size)
+        for movie in cursor:
+            movie["id"] = movie.pop("tmdb_id")
+            yield movie
+
+    def mark_changed(self, movie_ids):
+        """
+        Mark mirrored movies as stale so their details are downloaded again.
+
+        Args:
+            movie_ids (list): TMDb IDs of the changed movies; unknown IDs are ignored.
+
+        Returns:
+            int: Number of mirrored movies marked.
+        """
+        result = self.collection.update_many(
+            {"tmdb_id": {"$in": list(movie_ids)}, "details_synced_at": {"$ne": None}},
+            {"$set": {"details_synced_at": None}},
+        )
+        return result.modified_count
+
+    def get_stale_ids(self, limit, exclude=()):
+        """
+        Get mirrored movies whose details are missing or stale, most popular first.
+
+        Args:
+            limit (int): Maximum number of IDs.
+            exclude (iterable): TMDb IDs to leave out, e.g. those that just failed.
+
+        Returns:
+            list: TMDb IDs.
+        """
+        query = {"details_synced_at": None, "tmdb_id": {"$exists": True}}
+        if exclude:
+            query["tmdb_id"]["$nin"] = list(exclude)
+        cursor = self.collection.find(query, {"tmdb_id": 1}).sort(
+            [("details_synced_at", ASCENDING), ("popularity", DESCENDING)]
+        ).limit(limit)
+        return [movie["tmdb_id"] for movie in cursor]
+
+    def store_details(self, movies):
+        """
+        Store freshly downloaded details over the mirrored movies.
+
+        Args:
+            movies (list): Movie details from the TMDb API.
+        """
+        if not movies:
+            return
+        synced_at = datetime.now(timezone.utc)
+        self.collection.bulk_write([
+            UpdateOne(
+                {"tmdb_id": movie["id"]},
+                {"$set": dict({key: value for key, value in movie.items() if key not in MIRROR_FIELDS},
+                              details_synced_at=synced_at)},
+            )
+            for movie in movies
+        ], ordered=False)
+
+    def prune(self, export_date):
+        """
+        Remove the mirrored movies missing from an export, i.e. deleted from TMDb.
+
+        Args:
+            export_date (str): ISO date of the export every current movie was seen in.
+
+        Returns:
+            int: Number of movies removed.
+        """
+        result = self.collection.delete_many({"tmdb_id": {"$exists": True}, "export_date": {"$lt": export_date}})
+        return result.deleted_count
+
+    def get_state(self):
+        """
+        Get the sync progress: the `export_date` of the last export loaded and the
+        last day of the changes feed applied, `changes_until`.
+
+        Returns:
+            dict: Sync progress, empty before the first sync.
+        """
+        return self.state_collection.find_one({"_id": "tmdb_movies"}, {"_id": 0}) or {}
+
+    def update_state(self, **fields):
+        """
+        Record sync progress.
+
+        Args:
+            **fields: Progress fields to set.
+        """
+        self.state_collection.update_one({"_id": "tmdb_movies"}, {"$set": fields}, upsert=True)
+
+
+class TMDbMirrorSync:
+    """
+    Keeps a TMDbMirror up to date: loads the daily ID export, applies the
+    changes feed and downloads the details of new and changed movies only.
+
+    The export and the changes can be replayed from local files instead of
+    the network, e.g. to backfill or in tests.
+    """
+    def __init__(self, mirror, tmdb_service=None, cache=None, batch_size=MIRROR_BATCH_SIZE, workers=MIRROR_WORKERS):
+        """
+        Initialize the sync.
+
+        Args:
+            mirror (TMDbMirror): Mirror to update.
+            tmdb_service (TMDbService): Client used for the changes feed and the details.
+            cache (MongoCache): Shared detail cache whose entries are dropped for changed movies.
+            batch_size (int): Movies refreshed and written per batch.
+            workers (int): Detail requests sent in parallel.
+        """
+        self.logger = logging.getLogger("TMDbMirrorSync")
+        self.mirror = mirror
+        self.tmdb_service = tmdb_service
+        self.cache = cache
+        self.batch_size = batch_size
+        self.workers = workers
+
+    def sync_export(self, path, export_date):
+        """
+        Load a daily ID export: new movies are added without details, known ones
+        get their popularity updated, and movies missing from it are removed.
+
+        Args:
+            path (str): Export file, NDJSON optionally gzip-compressed.
+            export_date (date): Day of the export.
+
+        Returns:
+            dict: Ingestion report with the number of `removed` movies.
+        """
+        day = export_date.isoformat()
+
+        def records():
+            for record in iter_records(path):
+                record["export_date"] = day
+                yield record
+
+        report = MovieService(self.mirror.collection).ingest(
+            records(), source="tmdb", batch_size=max(self.batch_size, 1000), writers=self.workers
+        )
+        # A partially loaded export would remove every movie it did not reach
+        report["removed"] = self.mirror.prune(day) if report["read"] and not report["failed"] else 0
+        self.mirror.update_state(export_date=day)
+        return report
+
+    def sync_changes(self, movie_ids=None, until=None):
+        """
+        Mark the movies changed on TMDb as stale.
+
+        Args:
+            movie_ids (iterable): Changed TMDb IDs, e.g. from a replayed feed. By default
+                the changes feed is read from the last day applied up to `until`.
+            until (date): Last day covered; recorded so the next sync resumes from it.
+                Defaults to today when reading the feed.
+
+        Returns:
+            int: Number of mirrored movies marked as changed.
+        """
+        if movie_ids is None:
+            until = until or datetime.now(timezone.utc).date()
+            state = self.mirror.get_state()
+            start = state.get("changes_until") or state.get("export_date")
+            # The last day is read again: it may have had more changes after the previous sync
+            start = date.fromisoformat(start) if start else until - timedelta(days=1)
+            movie_ids = self._changed_ids_between(start, until)
+
+        changed = 0
+        for batch in _batches(movie_ids, self.batch_size * 10):
+            changed += self.mirror.mark_changed(batch)
+            if self.cache is not None:
+                self.cache.delete_many([f"movie:{movie_id}" for movie_id in batch])
+
+        if until is not None:
+            self.mirror.update_state(changes_until=until.isoformat())
+        self.logger.info(f"{changed} mirrored movies changed")
+        return changed
+
+    def refresh(self, limit=None):
+        """
+        Download the details of the movies that are new or changed, most popular first.
+
+        Movies that fail are left stale and retried on the next sync.
+
+        Args:
+            limit (int): Maximum number of movies downloaded, None for all of them.
+
+        Returns:
+            dict: Counts of movies `refreshed` and `failed`.
+        """
+        stats = {"refreshed": 0, "failed": 0}
+        failed_ids = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mirror") as executor:
+            while True:
+                size = self.batch_size
+                if limit is not None:
+                    size = min(size, limit - stats["refreshed"] - stats["failed"])
+                movie_ids = self.mirror.get_stale_ids(size, exclude=failed_ids) if size > 0 else []
+                if not movie_ids:
+                    break
+
+                futures = [(movie_id, executor.submit(self.tmdb_service.fetch_movie_details, movie_id))
+                           for movie_id in movie_ids]
+                movies = []
+                for movie_id, future in futures:
+                    try:
+                        movies.append(future.result())
+                    except Exception as e:
+                        self.logger.warning(f"Error refreshing movie {movie_id}: {e}")
+                        failed_ids.add(movie_id)
+                self.mirror.store_details(movies)
+                stats["refreshed"] += len(movies)
+                stats["failed"] += len(movie_ids) - len(movies)
+
+        self.logger.info(f"Refreshed mirrored movies: {stats}")
+        return stats
+
+    def _changed_ids_between(self, start, end):
+        """
+        Read the changes feed over a period, in windows TMDb accepts.
+        """
+        while start <= end:
+            window_end = min(start + timedelta(days=TMDB_CHANGES_MAX_DAYS - 1), end)
+            yield from self.tmdb_service.get_changed_movie_ids(start, window_end)
+            start = window_end + timedelta(days=1)
+
+
+if __name__ == "__main__":
+    # Daily sync, from `src`: python -m services.tmdb_mirror --download-export
+    import tempfile
+    from services.cache_service import MongoCache
+    from services.tmdb_service import TMDbService
+
+    parser = argparse.ArgumentParser(description="Sync the local TMDb mirror")
+    parser.add_argument("--export", help="Replay a local ID export (.json.gz or NDJSON)")
+    parser.add_argument("--download-export", action="store_true", help="Download and load the latest ID export")
+    parser.add_argument("--export-date", type=date.fromisoformat, help="Day of the export, yesterday by default")
+    parser.add_argument("--changes", help="Replay a local changes feed instead of querying TMDb")
+    parser.add_argument("--changes-until", type=date.fromisoformat, help="Last day covered by --changes")
+    parser.add_argument("--refresh-limit", type=int, help="Maximum number of details downloaded")
+    parser.add_argument("--batch-size", type=int, default=MIRROR_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=MIRROR_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    db = MongoClient(os.getenv("DATABASE_URL", "mongodb://localhost:27017"))["watchit_db"]
+    mirror = TMDbMirror(db["movies"])
+    mirror.ensure_indexes()
+    sync = TMDbMirrorSync(mirror, TMDbService(max_workers=args.workers), cache=MongoCache(db["tmdb_cache"]),
+                          batch_size=args.batch_size, workers=args.workers)
+
+    report = {}
+    export_date = args.export_date or datetime.now(timezone.utc).date() - timedelta(days=1)
+    if args.download_export:
+        with tempfile.TemporaryDirectory() as directory:
+            report["export"] = sync.sync_export(download_export(export_date, directory), export_date)
+    elif args.export:
+        report["export"] = sync.sync_export(args.export, export_date)
+
+    if args.changes:
+        report["changed"] = sync.sync_changes(changed_ids(iter_records(args.changes)), until=args.changes_until)
+    else:
+        report["changed"] = sync.sync_changes()
+    report["details"] = sync.refresh(limit=args.refresh_limit)
+    print(json.dumps(report))
@@ -1,6 +1,12 @@
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import threading
+import time
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load environment variables from .env file
 load_dotenv()
@@ -9,15 +15,90 @@ load_dotenv()
 TMDB_ACCESS_TOKEN = os.getenv("TMDB_ACCESS_TOKEN")
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
 
+# Longest period the changes feed accepts in one query
+TMDB_CHANGES_MAX_DAYS = 14
+
+# Concurrency settings for bulk detail fetching
+TMDB_MAX_WORKERS = int(os.getenv("TMDB_MAX_WORKERS", "16"))
+TMDB_BATCH_TIMEOUT = float(os.getenv("TMDB_BATCH_TIMEOUT", "10"))
+
+# Connection pool, timeout and retry settings for the shared HTTP session
+TMDB_POOL_SIZE = int(os.getenv("TMDB_POOL_SIZE", str(TMDB_MAX_WORKERS)))
+TMDB_CONNECT_TIMEOUT = float(os.getenv("TMDB_CONNECT_TIMEOUT", "3"))
+TMDB_READ_TIMEOUT = float(os.getenv("TMDB_READ_TIMEOUT", "5"))
+TMDB_MAX_RETRIES = int(os.getenv("TMDB_MAX_RETRIES", "3"))
+TMDB_BACKOFF_FACTOR = float(os.getenv("TMDB_BACKOFF_FACTOR", "0.5"))
+TMDB_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class CountingRetry(Retry):
+    """
+    Retry policy that reports every retry attempt to a callback.
+    urllib3 creates a new Retry object for each attempt, so the callback
+    is carried over in `new`.
+    """
+    def __init__(self, *args, on_retry=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_retry = on_retry
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.on_retry = self.on_retry
+        return retry
+
+    def increment(self, *args, **kwargs):
+        if self.on_retry:
+            self.on_retry()
+        return super().increment(*args, **kwargs)
+
+
 class TMDbService:
     """
     A service class for interacting with The Movie Database (TMDb) API.
     Provides methods for searching movies and retrieving detailed movie information.
     """
-    def __init__(self):
+    def __init__(self, max_workers=TMDB_MAX_WORKERS, pool_size=TMDB_POOL_SIZE,
+                 timeout=(TMDB_CONNECT_TIMEOUT, TMDB_READ_TIMEOUT), max_retries=TMDB_MAX_RETRIES,
+                 backoff_factor=TMDB_BACKOFF_FACTOR, cache=None, search_cache=None,
+                 search_index=None, recommendations=None, mirror=None):
         if not TMDB_ACCESS_TOKEN:
             raise ValueError("Access token for TMDb is missing")
 
+        self.logger = logging.getLogger("TMDbService")
+        self.timeout = timeout
+        self.cache = cache  # Optional TieredCache for movie details
+        self.search_cache = search_cache  # Optional SearchCache for search results
+        self.search_index = search_index  # Optional SearchIndex fed with every fetched movie
+        self.recommendations = recommendations  # Optional RecommendationService fed the same way
+        self.mirror = mirror  # Optional TMDbMirror read before the API
+
+        self._stats_lock = threading.Lock()
+        self._retries = 0
+
+        # Long-lived session: headers are built once and connections are kept
+        # alive in a thread-safe urllib3 pool shared by every request
+        retry = CountingRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=TMDB_RETRY_STATUS_CODES,
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            on_retry=self._count_retry,
+        )
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({
+            "accept": "application/json",
+            "Authorization": f"Bearer {TMDB_ACCESS_TOKEN}",
+        })
+
+        # Bounded pool shared by every bulk request, so concurrent page loads
+        # cannot open an unlimited number of upstream connections
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tmdb")
+
     def search_movies(self, query):
         """
         Search for movies using the TMDb API.
@@ -28,18 +109,21 @@ class TMDbService:
         Returns:
             list: List of movies from the TMDB API.
         """
-        url = f"{TMDB_BASE_URL}/search/movie"
-        headers = {
-            "accept": "application/json",
-            "Authorization": f"Bearer {TMDB_ACCESS_TOKEN}"
-        }
+        if self.search_cache is not None:
+            results = self.search_cache.get(query)
+            if results is not None:
+                return results
+
         params = {
             "query": query
         }
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code != 200:
-            raise Exception(f"Error: {response.status_code} - {response.text}")
-        return response.json().get("results", [])
+        data = self._get("/search/movie", params=params)
+        results = data.get("results", [])
+
+        if self.search_cache is not None:
+            # Only a single page holds every match, so only then can it answer refined queries
+            self.search_cache.set(query, results, complete=data.get("total_pages", 1) <= 1)
+        return results
 
     def get_movie_details(self, movie_id):
         """
@@ -51,12 +135,135 @@ class TMDbService:
         Returns:
             dict: Movie details from the TMDb API.
         """
-        url = f"{TMDB_BASE_URL}/movie/{movie_id}"
-        headers = {
-            "accept": "application/json",
-            "Authorization": f"Bearer {TMDB_ACCESS_TOKEN}"
+        if self.cache is None:
+            return self._fetch_movie_details(movie_id)
+        return self.cache.get_or_load(f"movie:{movie_id}", lambda: self._fetch_movie_details(movie_id))
+
+    def get_movie_details_many(self, movie_ids, timeout=TMDB_BATCH_TIMEOUT):
+        """
+        Get detailed information about several movies concurrently.
+
+        Duplicated IDs are fetched only once. Movies that fail or do not answer
+        before the timeout are logged and left out of the result, so one slow or
+        missing title does not break the whole batch.
+
+        Args:
+            movie_ids (iterable): IDs of the movies.
+            timeout (float): Maximum number of seconds to wait for the whole batch.
+
+        Returns:
+            dict: Movie details from the TMDb API keyed by movie ID.
+        """
+        unique_ids = list(dict.fromkeys(movie_ids))
+        futures = {movie_id: self.executor.submit(self.get_movie_details, movie_id) for movie_id in unique_ids}
+
+        deadline = time.monotonic() + timeout
+        details = {}
+        for movie_id, future in futures.items():
+            try:
+                details[movie_id] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                self.logger.warning(f"Timed out fetching details for movie {movie_id}")
+            except Exception as e:
+                self.logger.warning(f"Error fetching details for movie {movie_id}: {e}")
+        return details
+
+    def fetch_movie_details(self, movie_id):
+        """
+        Fetch movie details straight from the TMDb API, bypassing the cache and the mirror.
+
+        Args:
+            movie_id (int): ID of the movie.
+
+        Returns:
+            dict: Movie details from the TMDb API.
+        """
+        return self._get(f"/movie/{movie_id}")
+
+    def get_changed_movie_ids(self, start_date, end_date):
+        """
+        Get the IDs of the movies changed on TMDb in a period, from the changes feed.
+
+        Args:
+            start_date (date): First day of the period.
+            end_date (date): Last day of the period, at most 14 days after `start_date`.
+
+        Yields:
+            int: IDs of the changed movies.
+        """
+        page = total_pages = 1
+        while page <= total_pages:
+            data = self._get("/movie/changes", params={
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "page": page,
+            })
+            for result in data.get("results", []):
+                yield result["id"]
+            total_pages = data.get("total_pages", 1)
+            page += 1
+
+    def get_stats(self):
+        """
+        Get connection reuse and retry counters for the shared HTTP session.
+
+        Returns:
+            dict: Requests sent, connections reused (pool hits), connections
+            opened (pool misses) and retries performed.
+        """
+        requests_sent = 0
+        connections_opened = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+
+        with self._stats_lock:
+            retries = self._retries
+
+        return {
+            "requests": requests_sent,
+            "pool_hits": max(0, requests_sent - connections_opened),
+            "pool_misses": connections_opened,
+            "retries": retries,
         }
-        response = requests.get(url, headers=headers)
+
+    def _get(self, path, params=None):
+        """
+        Send a GET request to the TMDb API through the shared session.
+
+        Args:
+            path (str): API path relative to the base URL.
+            params (dict): Query string parameters.
+
+        Returns:
+            dict: Decoded JSON response.
+
+        Raises:
+            Exception: If TMDb does not answer with a 200 status code.
+        """
+        response = self.session.get(f"{TMDB_BASE_URL}{path}", params=params, timeout=self.timeout)
         if response.status_code != 200:
             raise Exception(f"Error: {response.status_code} - {response.text}")
         return response.json()
+
+    def _fetch_movie_details(self, movie_id):
+        """
+        Get movie details from the local mirror, or from the TMDb API if the
+        mirror does not hold them, bypassing the cache.
+        """
+        movie = self.mirror.get(movie_id) if self.mirror is not None else None
+        if movie is None:
+            movie = self.fetch_movie_details(movie_id)
+        if self.search_index is not None:
+            self.search_index.add(movie)
+        if self.recommendations is not None:
+            self.recommendations.add(movie)
+        return movie
+
+    def _count_retry(self):
+        with self._stats_lock:
+            self._retries += 1
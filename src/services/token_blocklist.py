@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from services.cache_service import TTLCache
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter: membership tests can give false positives but never false negatives.
+    """
+    def __init__(self, capacity=100000, error_rate=0.001):
+        """
+        Size the filter for an expected number of items and false positive rate.
+
+        Args:
+            capacity (int): Expected number of items.
+            error_rate (float): Target false positive rate at full capacity.
+        """
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions derived from two 64-bit hashes
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        """
+        Add a key to the filter.
+
+        Args:
+            key (str): Key to add.
+        """
+        for position in self._positions(key):
+            self.bits[position // 8] |= 1 << (position % 8)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(key))
+
+
+class TokenBlocklist:
+    """
+    Revoked JWT store shared by every worker and replica.
+
+    Revocations live in a MongoDB collection whose TTL index drops them once the
+    token has expired anyway. Each process keeps a Bloom filter of the revoked
+    IDs, refreshed incrementally with the revocations made since the last refresh,
+    so checking a token that was never revoked costs no database round-trip.
+    """
+    def __init__(self, collection, capacity=100000, refresh_interval=5, default_ttl=3600, max_clock_skew=5,
+                 clock=time.monotonic):
+        """
+        Initialize the blocklist with a MongoDB collection.
+
+        Args:
+            collection (Collection): MongoDB collection for the revoked tokens.
+            capacity (int): Expected number of live revocations, used to size the Bloom filter.
+            refresh_interval (float): Seconds between incremental refreshes of the Bloom filter.
+            default_ttl (float): Seconds a revocation is kept when the token expiry is unknown.
+            max_clock_skew (float): Overlap, in seconds, re-read on each refresh so revocations
+                stamped by replicas with a slightly late clock are not missed.
+            clock (callable): Time source for the refresh interval, injectable for tests.
+        """
+        self.collection = collection
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        self.default_ttl = default_ttl
+        self.max_clock_skew = timedelta(seconds=max_clock_skew)
+        self.clock = clock
+        self.logger = logging.getLogger("TokenBlocklist")
+        self.filter = BloomFilter(capacity)
+        # Revocations confirmed for Bloom filter hits. Only positive answers are cached: a token
+        # found unrevoked may be revoked by another process at any time, so it is looked up again.
+        self.confirmed = TTLCache(max_size=10000, ttl=60)
+        self._watermark = EPOCH
+        self._recent = {}  # jti -> revoked_at for revocations inside the overlap window
+        self._next_refresh = 0
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        """
+        Create the TTL index expiring revocations with their token, and the index
+        used by the incremental refresh.
+        """
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self.collection.create_index("revoked_at")
+
+    def add(self, jti, expires_at=None):
+        """
+        Revoke a token.
+
+        Args:
+            jti (str): Unique identifier of the token.
+            expires_at (datetime or int): Token expiry, as a datetime or a Unix timestamp (`exp` claim).
+        """
+        now = datetime.now(timezone.utc)
+        if expires_at is None:
+            expires_at = now + timedelta(seconds=self.default_ttl)
+        elif not isinstance(expires_at, datetime):
+            expires_at = datetime.fromtimestamp(expires_at, timezone.utc)
+
+        self.collection.update_one(
+            {"_id": jti},
+            {"$set": {"revoked_at": now, "expires_at": expires_at}},
+            upsert=True,
+        )
+        with self._lock:
+            self.filter.add(jti)
+        self.confirmed.set(jti, True)
+
+    def is_revoked(self, jti):
+        """
+        Check whether a token has been revoked.
+
+        Args:
+            jti (str): Unique identifier of the token.
+
+        Returns:
+            bool: True if the token is revoked.
+        """
+        self._refresh_if_due()
+        with self._lock:
+            if jti not in self.filter:
+                return False
+
+        # Possible false positive: confirm against the shared store
+        if self.confirmed.get(jti):
+            return True
+        try:
+            revoked = self.collection.find_one({"_id": jti}, {"_id": 1}) is not None
+        except Exception as e:
+            # Fail closed: a token that might be revoked is not accepted
+            self.logger.error(f"Error checking revoked token {jti}: {e}")
+            return True
+        if revoked:
+            self.confirmed.set(jti, True)
+        return revoked
+
+    def __contains__(self, jti):
+        return self.is_revoked(jti)
+
+    def _refresh_if_due(self):
+        """
+        Add the revocations made by other processes since the last refresh.
+        The filter is only rebuilt, from the live revocations, once it is over capacity.
+        """
+        now = self.clock()
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            self._next_refresh = now + self.refresh_interval
+            watermark = self._watermark
+
+        try:
+            rebuild = self.filter.count > self.capacity
+            since = EPOCH if rebuild else max(EPOCH, watermark - self.max_clock_skew)
+            documents = list(self.collection.find({"revoked_at": {"$gte": since}}, {"revoked_at": 1}))
+        except Exception as e:
+            self.logger.warning(f"Error refreshing revoked tokens: {e}")
+            return
+
+        with self._lock:
+            if rebuild:
+                self.filter = BloomFilter(self.capacity)
+                self._recent = {}
+            for document in documents:
+                if document["_id"] in self._recent:
+                    continue
+                revoked_at = document["revoked_at"]
+                revoked_at = revoked_at if revoked_at.tzinfo else revoked_at.replace(tzinfo=timezone.utc)
+                self.filter.add(document["_id"])
+                self._recent[document["_id"]] = revoked_at
+                self._watermark = max(self._watermark, revoked_at)
+
+            # Forget revocations that fell out of the overlap window
+            window_start = self._watermark - self.max_clock_skew
+            self._recent = {jti: revoked_at for jti, revoked_at in self._recent.items() if revoked_at >= window_start}
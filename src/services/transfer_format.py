@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+
+# Supported streaming formats and their content types
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def read_records(lines, format="ndjson"):
+    """
+    Parse records one line at a time, so the input never has to fit in memory.
+
+    Args:
+        lines (iterable): Lines of text, e.g. a decoded request stream.
+        format (str): 'ndjson' (one JSON object per line) or 'csv' (with a header row).
+
+    Yields:
+        tuple: (line number, record dict or None, error message or None).
+    """
+    if format == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield line_number, record, None
+        else:
+            yield line_number, None, "Each line must be a JSON object"
+
+
+def write_records(records, fields, format="ndjson"):
+    """
+    Serialize records one at a time for a streamed response.
+
+    Args:
+        records (iterable): Dicts to serialize.
+        fields (list): Fields written to CSV, in order; lists are joined with spaces.
+        format (str): 'ndjson' or 'csv'.
+
+    Yields:
+        str: Chunks of the serialized output.
+    """
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for record in records:
+            writer.writerow([
+                " ".join(str(item) for item in value) if isinstance(value, list) else value
+                for value in (record.get(field) for field in fields)
+            ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    for record in records:
+        yield json.dumps(record, default=str) + "\n"
+
+
+def parse_list_entries(records, report, max_errors=100):
+    """
+    Turn import records into (list name, movie ID) pairs, reporting the invalid ones.
+
+    Args:
+        records (iterable): Output of `read_records` with `list` and `movie_id` fields.
+        report (dict): Receives the `invalid` count and the first `max_errors`
+            {"line", "error"} dicts in `errors`.
+        max_errors (int): Maximum number of errors kept.
+
+    Yields:
+        tuple: (list name, movie ID).
+    """
+    for line_number, record, error in records:
+        if error is None:
+            try:
+                entry = record["list"], int(record["movie_id"])
+            except (KeyError, TypeError, ValueError):
+                error = "Each record needs a 'list' and an integer 'movie_id'"
+            else:
+                yield entry
+                continue
+        report["invalid"] = report.get("invalid", 0) + 1
+        errors = report.setdefault("errors", [])
+        if len(errors) < max_errors:
+            errors.append({"line": line_number, "error": error})
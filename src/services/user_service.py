@@ -1,19 +1,194 @@
-from venv import logger
-import bcrypt
+import copy
+import logging
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from services.pagination import DEFAULT_PAGE_SIZE, InvalidCursorError, decode_cursor, encode_cursor
+from services.password_hasher import PasswordHasher
+
+# Default lists every user has
+DEFAULT_LISTS = ["favorites", "watched", "to_watch"]
+
+# Longest name accepted for a custom list
+MAX_LIST_NAME_LENGTH = 50
+
+# Error returned when a list operation does not match any user
+USER_NOT_FOUND = "User not found"
+
+# Counter increased whenever a custom list shared with every user is created
+SHARED_LISTS_COUNTER = "shared_lists"
+
+
+def custom_lists_query(username):
+    """
+    Build the query for the custom lists a user can use: the ones shared with
+    every user and the user's own.
+
+    Args:
+        username (str): The username of the user.
+
+    Returns:
+        dict: Query on the custom lists collection.
+    """
+    return {"owner": {"$in": [None, username]}}
+
+
+def combined_list_version(user, shared_lists):
+    """
+    Combine the version of a user's own lists with the version of the shared lists.
+    Both only increase, so their sum changes, and never repeats, when either does.
+
+    Args:
+        user (dict): User document with its `list_version`.
+        shared_lists (dict): Counter document of the shared lists, or None if none was created.
+
+    Returns:
+        int: The version of the lists the user can see.
+    """
+    return user.get("list_version", 0) + (shared_lists or {}).get("value", 0)
+
+
+def list_entries_query(username, list_name, cursor=None):
+    """
+    Build the query for a page of a user's list: the entries added after the
+    last one of the previous page. Entries are ordered by `_id`, i.e. in the
+    order they were added, so removals never shift the following pages.
+
+    Args:
+        username (str): The username of the user.
+        list_name (str): The name of the list.
+        cursor (str): Continuation token from the previous page, None for the first one.
+
+    Returns:
+        dict: Query on the list entries collection.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed.
+    """
+    query = {"username": username, "list": list_name}
+    position = decode_cursor(cursor)
+    if position is not None:
+        try:
+            query["_id"] = {"$gt": ObjectId(position["after"])}
+        except (KeyError, TypeError, InvalidId) as e:
+            raise InvalidCursorError("Invalid cursor") from e
+    return query
+
+
+def list_page(entries, limit):
+    """
+    Build a list page from the entries read, one more than `limit` if there are more.
+    """
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor({"after": str(entries[-1]["_id"])})
+    return {"movie_ids": [entry["movie_id"] for entry in entries], "next": next_cursor}
+
+
+def list_counts_pipeline(username, list_names):
+    """
+    Build the aggregation counting the movies in several lists of a user,
+    answered from the list entries index.
+
+    Args:
+        username (str): The username of the user.
+        list_names (list): Names of the lists.
+
+    Returns:
+        list: Aggregation pipeline.
+    """
+    return [
+        {"$match": {"username": username, "list": {"$in": list(list_names)}}},
+        {"$group": {"_id": "$list", "count": {"$sum": 1}}},
+    ]
+
+
+def check_list_name(list_name):
+    """
+    Validate the name of a new custom list.
+
+    Args:
+        list_name (str): Requested name.
+
+    Returns:
+        str or None: Error message, or None if the name is valid.
+    """
+    if not isinstance(list_name, str) or not list_name.strip():
+        return "List name is required"
+    if len(list_name) > MAX_LIST_NAME_LENGTH:
+        return f"List names have at most {MAX_LIST_NAME_LENGTH} characters"
+    return None
 
 class UserService:
     """
     Service class for managing user operations such as authentication,
     user creation, and updating user movie lists.
+
+    The lists are not embedded in the user document: every movie in a list is
+    a separate entry in the list entries collection, so reading a user stays
+    cheap whatever the size of their library, and membership checks, pages and
+    counts are index lookups on (username, list, movie).
     """
-    def __init__(self, users_collection):
+    def __init__(self, users_collection, user_cache=None, password_hasher=None, entries_collection=None,
+                 custom_lists_collection=None, counters_collection=None):
         """
         Initialize the UserService with a MongoDB collection.
 
         Args:
             users_collection (Collection): MongoDB collection for storing user data.
+            user_cache (TTLCache): Optional short-lived per-process cache for `get_user`.
+            password_hasher (PasswordHasher): Hasher for passwords; hashes inline when not given.
+            entries_collection (Collection): Collection with one document per movie in a list,
+                `list_entries` of the same database by default.
+            custom_lists_collection (Collection): Collection with the custom list names,
+                `custom_lists` of the same database by default.
+            counters_collection (Collection): Collection with the version of the shared lists,
+                `counters` of the same database by default.
         """
+        database = users_collection.database
         self.users_collection = users_collection
+        self.entries_collection = entries_collection if entries_collection is not None else database["list_entries"]
+        self.custom_lists_collection = (
+            custom_lists_collection if custom_lists_collection is not None else database["custom_lists"]
+        )
+        self.counters_collection = counters_collection if counters_collection is not None else database["counters"]
+        self.user_cache = user_cache
+        self.logger = logging.getLogger("UserService")
+        self.password_hasher = password_hasher or PasswordHasher()
+        self.listeners = []  # (callable, lists) tuples notified of list changes
+
+    def ensure_indexes(self):
+        """
+        Create the indexes used by the user queries.
+        The unique index on `username` also rejects duplicated registrations atomically.
+        """
+        self.users_collection.create_index("username", unique=True)
+        # Membership checks, and a movie is in a list at most once
+        self.entries_collection.create_index(
+            [("username", ASCENDING), ("list", ASCENDING), ("movie_id", ASCENDING)], unique=True
+        )
+        # Pages and counts of a list, in the order the movies were added
+        self.entries_collection.create_index([("username", ASCENDING), ("list", ASCENDING), ("_id", ASCENDING)])
+        self.custom_lists_collection.create_index([("owner", ASCENDING), ("name", ASCENDING)], unique=True)
+        # A shared list cannot take the name of any user's own list
+        self.custom_lists_collection.create_index([("name", ASCENDING)])
+
+    def get_hot_queries(self):
+        """
+        Get the queries run on every request, to verify they are served by an index.
+
+        Returns:
+            list: (name, collection, filter) tuples.
+        """
+        return [
+            ("user by username", self.users_collection, {"username": ""}),
+            ("list membership", self.entries_collection, {"username": "", "list": "", "movie_id": 0}),
+            ("list page", self.entries_collection, {"username": "", "list": ""}),
+            ("custom lists", self.custom_lists_collection, custom_lists_query("")),
+        ]
 
     def create_user(self, username, password, role="user"):
         """
@@ -27,26 +202,23 @@ class UserService:
         Returns:
             dict: A success message or error details.
             int: The HTTP status code for the operation.
+
+        Raises:
+            HasherBusyError: If the password hashing queue is full.
         """
         
-        # Check if the username already exists
-        if self.users_collection.find_one({"username": username}):
-            return {"error": "Username already exists"}, 400
-        
         # Hash the password before storing it
-        password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+        password_hash = self.password_hasher.hash(password)
         
-        # Insert the new user into the database
-        self.users_collection.insert_one({
-            "username": username,
-            "password_hash": password_hash,
-            "role": role,
-            "lists": {
-                "favorites": [],
-                "watched": [],
-                "to_watch": []
-            }
-        })
+        # Insert the new user into the database; the unique index on username rejects duplicates
+        try:
+            self.users_collection.insert_one({
+                "username": username,
+                "password_hash": password_hash,
+                "role": role,
+            })
+        except DuplicateKeyError:
+            return {"error": "Username already exists"}, 400
         return {"message": "User created successfully"}, 201
 
     def authenticate_user(self, username, password):
@@ -59,13 +231,22 @@ class UserService:
 
         Returns:
             dict or None: The user object if authentication is successful, or None otherwise.
+
+        Raises:
+            HasherBusyError: If the password hashing queue is full.
         """
         
         # Find the user in the database by username
         user = self.users_collection.find_one({"username": username})
         
         # Verify the password using bcrypt
-        if user and bcrypt.checkpw(password.encode("utf-8"), user["password_hash"]):
+        if user and self.password_hasher.verify(password, user["password_hash"]):
+            # Transparently upgrade hashes made with an outdated cost factor
+            if self.password_hasher.needs_rehash(user["password_hash"]):
+                self.users_collection.update_one(
+                    {"_id": user["_id"], "password_hash": user["password_hash"]},
+                    {"$set": {"password_hash": self.password_hasher.hash(password)}}
+                )
             return user
         
         return None
@@ -80,14 +261,252 @@ class UserService:
         Returns:
             dict: The user object with sensitive data removed, or None if the user is not found.
         """
+        if self.user_cache is not None:
+            user = self.user_cache.get(username)
+            if user is not None:
+                return copy.deepcopy(user)
+
         # Find the user in the database by username
         user = self.users_collection.find_one({"username": username}, {"password_hash": 0})
         
         # Convert ObjectId to string for JSON serialization
         if user and "_id" in user:
             user["_id"] = str(user["_id"])  # Convertir ObjectId a string
+
+        if user and self.user_cache is not None:
+            self.user_cache.set(username, copy.deepcopy(user))
         return user
 
+    def invalidate_user(self, username):
+        """
+        Drop a user from the per-process cache after it changes.
+
+        Args:
+            username (str): The username of the user.
+        """
+        if self.user_cache is not None:
+            self.user_cache.delete(username)
+
+    def user_exists(self, username):
+        """
+        Check whether a user exists, with an index-only lookup.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            bool: True if the user exists.
+        """
+        return self.users_collection.count_documents({"username": username}, limit=1) > 0
+
+    def get_list_version(self, username):
+        """
+        Get the version of a user's lists, increased after every change to them
+        or to the shared lists, e.g. to validate cached pages. Always read from
+        the database, never from the user cache, so a change is seen right away
+        by every worker.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            int or None: The version, or None if the user is not found.
+        """
+        user = self.users_collection.find_one({"username": username}, {"_id": 0, "list_version": 1})
+        if user is None:
+            return None
+        return combined_list_version(user, self.counters_collection.find_one({"_id": SHARED_LISTS_COUNTER}))
+
+    def create_custom_list(self, list_name, owner=None):
+        """
+        Create a custom list, either for every user or for a single one.
+
+        Args:
+            list_name (str): The name of the new list.
+            owner (str): Username of the user the list belongs to, None to share it with every user.
+
+        Returns:
+            dict: A success message or error details.
+            int: The HTTP status code for the operation.
+        """
+        error = check_list_name(list_name)
+        if error:
+            return {"error": error}, 400
+        # A user's own list cannot share its name with a shared list, in either order
+        query = {"name": list_name} if owner is None else {"name": list_name, "owner": {"$in": [None, owner]}}
+        if list_name in DEFAULT_LISTS or self.custom_lists_collection.count_documents(query, limit=1):
+            return {"error": f"List '{list_name}' already exists"}, 409
+
+        try:
+            self.custom_lists_collection.insert_one({
+                "name": list_name,
+                "owner": owner,
+                "created_at": datetime.now(timezone.utc),
+            })
+        except DuplicateKeyError:
+            return {"error": f"List '{list_name}' already exists"}, 409
+
+        # The new list shows up on the lists pages of its owner, or of every user if shared
+        if owner is None:
+            self.counters_collection.update_one({"_id": SHARED_LISTS_COUNTER}, {"$inc": {"value": 1}}, upsert=True)
+        else:
+            self.users_collection.update_one({"username": owner}, {"$inc": {"list_version": 1}})
+        return {"message": f"Custom list {list_name} created"}, 201
+
+    def get_list_names(self, username):
+        """
+        Get the names of the lists a user can use: the default ones, then the
+        custom lists shared with every user and the user's own, oldest first.
+
+        Args:
+            username (str): The username of the user, or None for the shared lists only.
+
+        Returns:
+            list: List names.
+        """
+        custom = self.custom_lists_collection.find(custom_lists_query(username), {"_id": 0, "name": 1})
+        return DEFAULT_LISTS + [document["name"] for document in custom.sort("created_at", ASCENDING)]
+
+    def subscribe(self, listener, lists=None):
+        """
+        Register a callable notified of every effective list change.
+
+        The listener receives a dict with the `username`, the `movie_id`, the `list`
+        and the `action` ('add' or 'remove'). It runs on the request thread, so
+        slow work, such as reading the user's lists, should be handed off.
+
+        Args:
+            listener (callable): Function taking the change event.
+            lists (list): Lists whose changes are notified, None for every list.
+        """
+        self.listeners.append((listener, None if lists is None else set(lists)))
+
+    def _listeners_for(self, list_name):
+        """
+        Get the listeners notified of changes to a list.
+        """
+        return [listener for listener, lists in self.listeners if lists is None or list_name in lists]
+
+    def _emit(self, event):
+        """
+        Notify the listeners of a list change; a failing listener does not fail the update.
+        """
+        for listener in self._listeners_for(event["list"]):
+            try:
+                listener(event)
+            except Exception as e:
+                self.logger.error(f"Error notifying list change: {e}")
+
+    def get_lists(self, username, list_names=None):
+        """
+        Get the movie IDs in several lists of a user, in the order they were added.
+
+        Args:
+            username (str): The username of the user.
+            list_names (iterable): Names of the lists, None for every list.
+
+        Returns:
+            dict: List name to movie IDs; the default lists are always included.
+        """
+        query = {"username": username}
+        if list_names is not None:
+            list_names = list(list_names)
+            query["list"] = {"$in": list_names}
+        lists = {name: [] for name in (DEFAULT_LISTS if list_names is None else list_names)}
+        entries = self.entries_collection.find(query, {"_id": 0, "list": 1, "movie_id": 1})
+        for entry in entries.sort([("list", ASCENDING), ("_id", ASCENDING)]):
+            lists.setdefault(entry["list"], []).append(entry["movie_id"])
+        return lists
+
+    def get_list_status(self, username, movie_id, list_names=None):
+        """
+        Check whether a movie is in each of the given lists of a user,
+        with a single lookup on the list entries index.
+
+        Args:
+            username (str): The username of the user.
+            movie_id (int): The ID of the movie.
+            list_names (list): Names of the lists to check, every list of the user by default.
+
+        Returns:
+            dict: List name to membership flag.
+        """
+        if list_names is None:
+            list_names = self.get_list_names(username)
+        found = {
+            entry["list"]
+            for entry in self.entries_collection.find(
+                {"username": username, "list": {"$in": list(list_names)}, "movie_id": movie_id},
+                {"_id": 0, "list": 1},
+            )
+        }
+        return {name: name in found for name in list_names}
+
+    def get_list_page(self, username, list_name, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Get a page of the movie IDs in a user's list, in the order they were added.
+
+        Args:
+            username (str): The username of the user.
+            list_name (str): The name of the list.
+            limit (int): Maximum number of movie IDs in the page.
+            cursor (str): Continuation token from the previous page, None for the first one.
+
+        Returns:
+            dict or None: The `movie_ids` of the page and the `next` token (None on the
+                last page), or None if the user is not found.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed.
+        """
+        query = list_entries_query(username, list_name, cursor)
+        if not self.user_exists(username):
+            return None
+        return list_page(self._read_entries(query, limit + 1), limit)
+
+    def get_first_list_pages(self, username, list_names=DEFAULT_LISTS, limit=DEFAULT_PAGE_SIZE):
+        """
+        Get the first page of several lists of a user.
+
+        Args:
+            username (str): The username of the user.
+            list_names (list): Names of the lists.
+            limit (int): Maximum number of movie IDs per list.
+
+        Returns:
+            dict or None: List name to page, as returned by `get_list_page`,
+                or None if the user is not found.
+        """
+        if not self.user_exists(username):
+            return None
+        return {
+            name: list_page(self._read_entries(list_entries_query(username, name), limit + 1), limit)
+            for name in list_names
+        }
+
+    def get_list_counts(self, username, list_names):
+        """
+        Count the movies in several lists of a user.
+
+        Args:
+            username (str): The username of the user.
+            list_names (list): Names of the lists.
+
+        Returns:
+            dict: List name to number of movies.
+        """
+        counts = {name: 0 for name in list_names}
+        for group in self.entries_collection.aggregate(list_counts_pipeline(username, list_names)):
+            counts[group["_id"]] = group["count"]
+        return counts
+
+    def _read_entries(self, query, limit):
+        """
+        Read list entries in the order they were added.
+        """
+        cursor = self.entries_collection.find(query, {"_id": 1, "movie_id": 1})
+        return list(cursor.sort("_id", ASCENDING).limit(limit))
+
     def add_movie_to_list(self, username, movie_id, list_name):
         """
         Add a movie to a specific list for a user.
@@ -101,23 +520,16 @@ class UserService:
             dict: A success message or error details.
         """
         try:
-            # Valdate list name
-            if list_name not in ["favorites", "watched", "to_watch"]:
-                return {"error": f"Invalid list name '{list_name}'"}
-
-            # Add the movie to the specified list
-            result = self.users_collection.update_one(
-                {"username": username},
-                {"$addToSet": {f"lists.{list_name}": movie_id}}
-            )
-            
-            # Check if the user was found
-            if result.matched_count == 0:
-                return {"error": "User not found"}
+            response = self._update_lists(username, {list_name: [movie_id]}, "add")
+            if "error" in response:
+                return response
 
-            return {"message": f"Movie {movie_id} added to {list_name}"}
+            result = response["results"][0]
+            if result["status"] == "error":
+                return {"error": result["error"]}
+            return {"message": f"Movie {movie_id} added to {list_name}", "changed": result["status"] == "added"}
         except Exception as e:
-            logger.error(f"Error in add_movie_to_list: {e}")
+            self.logger.error(f"Error in add_movie_to_list: {e}")
             return {"error": str(e)}
 
 
@@ -134,18 +546,289 @@ class UserService:
         Returns:
             dict: A success message or error details.
         """
-        
-        # Validate list name
-        if list_name not in ["favorites", "watched", "to_watch"]:
-            return {"error": f"Invalid list name '{list_name}'"}, 400
-
-        # Remove the movie from the specified list
-        result = self.users_collection.update_one(
-            {"username": username},
-            {"$pull": {f"lists.{list_name}": movie_id}}
+        response = self._update_lists(username, {list_name: [movie_id]}, "remove")
+        if "error" in response:
+            return response
+
+        result = response["results"][0]
+        if result["status"] == "error":
+            return {"error": result["error"]}
+        return {"message": "Movie removed successfully", "changed": result["status"] == "removed"}
+
+    def add_movies_to_lists(self, username, lists):
+        """
+        Add many movies to several lists of a user with a single unordered insert.
+
+        Args:
+            username (str): The username of the user.
+            lists (dict): List name to IDs of the movies to add.
+
+        Returns:
+            dict: Per-item results as {"movie_id", "list", "status"} dicts, where the status is
+                'added', 'unchanged' or 'error' (with an `error` message), or error details.
+        """
+        return self._update_lists(username, lists, "add")
+
+    def remove_movies_from_lists(self, username, lists):
+        """
+        Remove many movies from several lists of a user with a single delete.
+
+        Args:
+            username (str): The username of the user.
+            lists (dict): List name to IDs of the movies to remove.
+
+        Returns:
+            dict: Per-item results as {"movie_id", "list", "status"} dicts, where the status is
+                'removed', 'unchanged' or 'error' (with an `error` message), or error details.
+        """
+        return self._update_lists(username, lists, "remove")
+
+    def _update_lists(self, username, lists, action):
+        """
+        Apply a bulk add or remove and work out the per-item results: added entries
+        are the inserts that did not hit the unique index, removed ones the entries
+        found before the delete. A change to the default lists takes two round trips:
+        the write, and the version update that also checks that the user exists.
+        """
+        known = set(DEFAULT_LISTS)
+        custom = [list_name for list_name in lists if list_name not in known]
+        if custom:
+            query = dict(custom_lists_query(username), name={"$in": custom})
+            known.update(document["name"] for document in self.custom_lists_collection.find(query, {"name": 1}))
+
+        results = []
+        valid = {}
+        for list_name, movie_ids in lists.items():
+            for movie_id in movie_ids:
+                if list_name not in known:
+                    results.append({"movie_id": movie_id, "list": list_name, "status": "error",
+                                    "error": f"Invalid list name '{list_name}'"})
+                elif not isinstance(movie_id, int) or isinstance(movie_id, bool):
+                    results.append({"movie_id": movie_id, "list": list_name, "status": "error",
+                                    "error": "Movie ID must be an integer"})
+                else:
+                    valid.setdefault(list_name, {})[movie_id] = None  # Ordered set
+                    results.append({"movie_id": movie_id, "list": list_name})
+
+        if not valid:
+            return {"results": results}
+
+        try:
+            if action == "add":
+                changed = self._insert_entries(username, valid)
+            else:
+                changed = self._delete_entries(username, valid)
+            # Bumped after the write, so a page cached under the new version is never outdated.
+            # Matching no user means it does not exist: entries inserted for it are dropped again.
+            version = self.users_collection.update_one(
+                {"username": username}, {"$inc": {"list_version": 1 if changed else 0}}
+            )
+            if version.matched_count == 0:
+                if action == "add" and changed:
+                    self._delete_entries(username, valid)
+                return {"error": USER_NOT_FOUND}
+        except Exception as e:
+            self.logger.error(f"Error in bulk list update: {e}")
+            return {"error": str(e)}
+
+        for result in results:
+            if "status" in result:
+                continue
+            key = (result["list"], result["movie_id"])
+            if key not in changed:
+                result["status"] = "unchanged"
+                continue
+
+            changed.discard(key)  # Repeated items only change once
+            list_name, movie_id = key
+            self._emit({"username": username, "movie_id": movie_id, "list": list_name, "action": action})
+            result["status"] = "added" if action == "add" else "removed"
+        return {"results": results}
+
+    def _insert_entries(self, username, lists):
+        """
+        Insert list entries, skipping the ones already present.
+
+        Returns:
+            set: (list name, movie ID) pairs actually added.
+        """
+        added_at = datetime.now(timezone.utc)
+        entries = [
+            {"username": username, "list": list_name, "movie_id": movie_id, "added_at": added_at}
+            for list_name, movie_ids in lists.items()
+            for movie_id in movie_ids
+        ]
+        duplicates = set()
+        try:
+            self.entries_collection.insert_many(entries, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every other entry was still inserted
+            for error in e.details["writeErrors"]:
+                if error.get("code") != 11000:
+                    raise
+                duplicates.add(error["index"])
+        return {(entry["list"], entry["movie_id"]) for index, entry in enumerate(entries) if index not in duplicates}
+
+    def _delete_entries(self, username, lists):
+        """
+        Delete list entries.
+
+        Returns:
+            set: (list name, movie ID) pairs actually removed.
+        """
+        query = {
+            "username": username,
+            "$or": [
+                {"list": list_name, "movie_id": {"$in": list(movie_ids)}} for list_name, movie_ids in lists.items()
+            ],
+        }
+        found = {
+            (entry["list"], entry["movie_id"])
+            for entry in self.entries_collection.find(query, {"_id": 0, "list": 1, "movie_id": 1})
+        }
+        if found:
+            self.entries_collection.delete_many(query)
+        return found
+
+    def iter_list_entries(self, username):
+        """
+        Iterate over the movies in every list of a user.
+
+        Args:
+            username (str): The username of the user.
+
+        Returns:
+            generator or None: {"list", "movie_id"} dicts, or None if the user is not found.
+        """
+        if not self.user_exists(username):
+            return None
+        entries = self.entries_collection.find({"username": username}, {"_id": 0, "list": 1, "movie_id": 1})
+        return (
+            {"list": entry["list"], "movie_id": entry["movie_id"]}
+            for entry in entries.sort([("list", ASCENDING), ("_id", ASCENDING)])
         )
-        
-        # Check if the movie was removed
-        if result.matched_count > 0:
-            return {"message": "Movie removed successfully"}
-        return {"error": "User not found or movie not in list"}
+
+    def import_list_entries(self, username, entries, batch_size=500):
+        """
+        Add a stream of movies to a user's lists, one bulk update per batch,
+        so the whole import never has to be held in memory.
+
+        Args:
+            username (str): The username of the user.
+            entries (iterable): (list name, movie ID) pairs.
+            batch_size (int): Movies written per update.
+
+        Returns:
+            dict: Counts of added, unchanged and rejected movies, or error details.
+        """
+        summary = {"added": 0, "unchanged": 0, "rejected": 0}
+        batch, size, written = {}, 0, False
+        for list_name, movie_id in entries:
+            batch.setdefault(list_name, []).append(movie_id)
+            size += 1
+            if size < batch_size:
+                continue
+
+            response = self.add_movies_to_lists(username, batch)
+            if "error" in response:
+                return response
+            self._count_results(response, summary)
+            batch, size, written = {}, 0, True
+
+        if size:
+            response = self.add_movies_to_lists(username, batch)
+            if "error" in response:
+                return response
+            self._count_results(response, summary)
+        elif not written and not self.user_exists(username):
+            return {"error": USER_NOT_FOUND}
+        return summary
+
+    @staticmethod
+    def _count_results(response, summary):
+        """
+        Add the per-item results of a bulk update to an import summary.
+        """
+        for result in response["results"]:
+            summary["rejected" if result["status"] == "error" else result["status"]] += 1
+
+    def iter_users(self, batch_size=1000):
+        """
+        Iterate over every user with their lists, without the password hashes,
+        streaming them from a cursor. The lists of each batch of users are read
+        with a single query.
+
+        Args:
+            batch_size (int): Documents fetched per round-trip.
+
+        Yields:
+            dict: Users with the `_id` as a string and their `lists`.
+        """
+        batch = []
+        for user in self.users_collection.find({}, {"password_hash": 0}, batch_size=batch_size):
+            user["_id"] = str(user["_id"])
+            batch.append(user)
+            if len(batch) >= batch_size:
+                yield from self._with_lists(batch)
+                batch = []
+        yield from self._with_lists(batch)
+
+    def _with_lists(self, users):
+        """
+        Attach the lists of a batch of users, read with one query.
+        """
+        if not users:
+            return users
+        lists = {user["username"]: {name: [] for name in DEFAULT_LISTS} for user in users}
+        entries = self.entries_collection.find(
+            {"username": {"$in": list(lists)}}, {"_id": 0, "username": 1, "list": 1, "movie_id": 1}
+        )
+        for entry in entries.sort("_id", ASCENDING):
+            lists[entry["username"]].setdefault(entry["list"], []).append(entry["movie_id"])
+        for user in users:
+            user["lists"] = lists[user["username"]]
+        return users
+
+    def migrate_embedded_lists(self, batch_size=1000):
+        """
+        Move the lists embedded in user documents by earlier versions into the
+        list entries collection, keeping their order. Safe to run again: entries
+        already moved are skipped, and a user is only cleaned up if their lists
+        did not change meanwhile.
+
+        Args:
+            batch_size (int): Users fetched per round-trip.
+
+        Returns:
+            dict: Number of users and entries migrated.
+        """
+        report = {"users": 0, "entries": 0}
+        users = self.users_collection.find({"lists": {"$exists": True}}, {"username": 1, "lists": 1},
+                                           batch_size=batch_size)
+        for user in users:
+            # Entries inserted together keep their order through the increasing `_id`
+            lists = {
+                list_name: list(dict.fromkeys(movie_ids or []))
+                for list_name, movie_ids in (user["lists"] or {}).items()
+            }
+            added = self._insert_entries(user["username"], lists) if any(lists.values()) else set()
+            self.users_collection.update_one(
+                {"_id": user["_id"], "lists": user["lists"]}, {"$unset": {"lists": ""}, "$inc": {"list_version": 1}}
+            )
+            self.invalidate_user(user["username"])
+            report["users"] += 1
+            report["entries"] += len(added)
+        self.logger.info(f"Migrated embedded lists: {report}")
+        return report
+
+
+if __name__ == "__main__":
+    # Migration from the embedded lists, also run by `flask --app app init-db`: python -m services.user_service
+    import os
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    db = MongoClient(os.getenv("DATABASE_URL", "mongodb://localhost:27017"))["watchit_db"]
+    service = UserService(db["users"])
+    service.ensure_indexes()
+    service.migrate_embedded_lists()
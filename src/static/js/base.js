@@ -0,0 +1,90 @@
+// Session state of the stored token, checked once per token and kept for the browser session
+async function getSessionState() {
+    const token = localStorage.getItem("access_token");
+    if (!token) {
+        return { authenticated: false };
+    }
+
+    const cached = JSON.parse(sessionStorage.getItem("session_state") || "null");
+    if (cached && cached.token === token && cached.state.expires * 1000 > Date.now()) {
+        return cached.state;
+    }
+
+    try {
+        const response = await fetch("/auth/session", {
+            headers: {
+                "Authorization": `Bearer ${token}`
+            }
+        });
+        const state = response.ok ? await response.json() : { authenticated: false };
+        if (state.authenticated) {
+            sessionStorage.setItem("session_state", JSON.stringify({ token, state }));
+        } else {
+            // Expired or revoked token
+            clearSession();
+        }
+        return state;
+    } catch (err) {
+        console.error("Error in session check:", err);
+        return { authenticated: false };
+    }
+}
+
+function clearSession() {
+    localStorage.removeItem("access_token");
+    sessionStorage.removeItem("session_state");
+}
+
+document.addEventListener("DOMContentLoaded", async function () {
+    const authLink = document.getElementById("auth-link");
+    const state = await getSessionState();
+
+    if (state.authenticated) {
+        authLink.textContent = "Logout";
+        authLink.href = "#";
+        authLink.addEventListener("click", function (e) {
+            e.preventDefault();
+            clearSession();
+            window.location.href = "/login";
+        });
+    } else {
+        authLink.textContent = "Login";
+        authLink.href = "/login";
+    }
+});
+
+document.getElementById("my-lists-link").addEventListener("click", async function (e) {
+    e.preventDefault();
+    const state = await getSessionState();
+
+    if (!state.authenticated) {
+        window.location.href = "/login";
+        return;
+    }
+
+    try {
+        const response = await fetch("/lists", {
+            method: "GET",
+            headers: {
+                "Authorization": `Bearer ${localStorage.getItem("access_token")}`
+            }
+        });
+
+        if (response.ok) {
+            const html = await response.text();
+            document.open();
+            document.write(html);
+            document.close();
+            history.pushState(null, "", "/lists"); // Actualizar URL
+        } else {
+            alert("Session expired. Please log in again.");
+            clearSession();
+            window.location.href = "/login";
+        }
+    } catch (error) {
+        console.error("Error connecting to /lists:", error);
+        alert("Error connecting to the server.");
+        clearSession();
+        window.location.href = "/login";
+    }
+});
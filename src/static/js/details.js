@@ -0,0 +1,55 @@
+document.addEventListener("DOMContentLoaded", function () {
+    const buttons = document.querySelectorAll(".actions .button");
+
+    buttons.forEach(button => {
+        button.addEventListener("click", async function (event) {
+            event.preventDefault();
+
+            const listName = button.dataset.list;
+            const action = button.dataset.action;
+            const movieId = parseInt(document.querySelector(".details-container").dataset.movieId, 10);
+            const token = localStorage.getItem("access_token");
+
+            if (!token) {
+                alert("You need to log in to manage your lists.");
+                return;
+            }
+
+            if (!listName || isNaN(movieId)) {
+                console.error("Invalid list name or movie ID.");
+                alert("Something went wrong. Please try again.");
+                return;
+            }
+
+            const endpoint = action === "add" ? "/movies/add_to_list" : "/movies/remove_from_list";
+
+            try {
+                const response = await fetch(endpoint, {
+                    method: "POST",
+                    headers: {
+                        "Content-Type": "application/json",
+                        "Authorization": `Bearer ${token}`
+                    },
+                    body: JSON.stringify({ movie_id: movieId, list: listName })
+                });
+
+                if (response.ok) {
+                    const newAction = action === "add" ? "remove" : "add";
+                    button.dataset.action = newAction;
+                    button.classList.toggle("add");
+                    button.classList.toggle("remove");
+                    button.textContent = newAction === "add"
+                        ? `Add to ${listName}`
+                        : `Remove from ${listName}`;
+                } else {
+                    const error = await response.json();
+                    console.error("Error updating the list:", error);
+                    alert(error.error || "Failed to update the list.");
+                }
+            } catch (err) {
+                console.error("Error updating the list:", err);
+                alert("An error occurred while updating the list.");
+            }
+        });
+    });
+});
@@ -0,0 +1,96 @@
+// Open the details page of a movie with the stored token
+async function openMovieDetails(event) {
+    event.preventDefault();
+    const movieId = this.getAttribute("data-movie-id");
+    const token = localStorage.getItem("access_token");
+
+    if (!token) {
+        alert("You need to login first.");
+        window.location.href = "/login";
+        return;
+    }
+
+    try {
+        // Fetch los detalles de la película
+        const response = await fetch(`/movies/details/${movieId}`, {
+            method: "GET",
+            headers: {
+                "Authorization": `Bearer ${token}`
+            }
+        });
+
+        if (response.ok) {
+            // Renderizar la página de detalles
+            const html = await response.text();
+            document.open();
+            document.write(html);
+            document.close();
+            // Cambiar la URL manualmente
+            history.pushState(null, "", `/movies/details/${movieId}`);
+        } else {
+            const error = await response.json();
+            alert(error.error || "Failed to fetch movie details.");
+        }
+    } catch (err) {
+        alert("Error fetching movie details.");
+    }
+}
+
+// Append the next page of a list, following the cursor returned by the previous one
+async function loadMore(event) {
+    const button = event.currentTarget;
+    const listName = button.getAttribute("data-list");
+    const token = localStorage.getItem("access_token");
+
+    try {
+        const response = await fetch(button.getAttribute("data-next"), {
+            headers: {
+                "Authorization": `Bearer ${token}`
+            }
+        });
+        if (!response.ok) {
+            const error = await response.json();
+            alert(error.error || "Failed to load more movies.");
+            return;
+        }
+        const page = await response.json();
+        const grid = document.getElementById(`movies-${listName}`);
+
+        page.movies.forEach(movie => {
+            const card = document.createElement("div");
+            card.className = "movie-card";
+            const link = document.createElement("a");
+            link.href = `/movies/details/${movie.id}`;
+            link.className = "movie-link";
+            link.setAttribute("data-movie-id", movie.id);
+            const image = document.createElement("img");
+            image.src = movie.poster_path ? `/img/w342${movie.poster_path}` : "";
+            image.alt = movie.title;
+            const title = document.createElement("h3");
+            title.textContent = movie.title;
+            link.append(image, title);
+            link.addEventListener("click", openMovieDetails);
+            card.appendChild(link);
+            grid.appendChild(card);
+        });
+
+        if (page.next) {
+            const url = new URL(button.getAttribute("data-next"), window.location.origin);
+            url.searchParams.set("cursor", page.next);
+            button.setAttribute("data-next", url.pathname + url.search);
+        } else {
+            button.remove();
+        }
+    } catch (err) {
+        alert("Error loading more movies.");
+    }
+}
+
+document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll(".movie-link").forEach(link => {
+        link.addEventListener("click", openMovieDetails);
+    });
+    document.querySelectorAll(".load-more").forEach(button => {
+        button.addEventListener("click", loadMore);
+    });
+});
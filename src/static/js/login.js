@@ -0,0 +1,31 @@
+document.getElementById("login-form").addEventListener("submit", async function (e) {
+    e.preventDefault();
+    const username = document.getElementById("username").value;
+    const password = document.getElementById("password").value;
+
+    try {
+        const response = await fetch("/login", {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+            body: new URLSearchParams({ username, password }),
+        });
+
+        if (response.ok) {
+            const data = await response.json();
+            if (data.access_token) {
+                localStorage.setItem("access_token", data.access_token); // Guarda el token JWT
+            } else {
+                alert("Error: No token received.");
+            }
+
+            window.location.href = "/"; // Redirige al home
+        } else {
+            const error = await response.json();
+            alert(error.error || "Login failed");
+        }
+    } catch (err) {
+        alert("An error occurred during login.");
+    }
+});
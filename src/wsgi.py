@@ -0,0 +1,4 @@
+# Production entry point: gunicorn --config gunicorn.conf.py wsgi:app
+from app import app
+
+__all__ = ["app"]
@@ -0,0 +1,71 @@
+import gzip
+from datetime import datetime, timezone
+import pytest
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import parse_accept_header
+from src.app import app
+from src.services.api_serialization import FastJSONProvider, compress_response, parse_fields, select_fields
+
+
+def test_fast_provider_matches_the_default_output():
+    """
+    Test that switching the JSON provider does not change the responses.
+
+    Asserts:
+        The body is byte for byte the one of the default provider, dates included.
+        Arguments only the default provider supports are still accepted.
+    """
+    value = {"title": "Heat", "id": 949, "genres": [{"name": "Crime", "id": 80}], "vote_average": 7.9,
+             "adult": False, "poster_path": None, "added_at": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+             "counts": {2: "b", 1: "a"}}
+    fast, default = FastJSONProvider(app), DefaultJSONProvider(app)
+
+    with app.app_context():
+        assert fast.response(value).data == default.response(value).data
+    assert fast.loads(fast.dumps(value)) == default.loads(default.dumps(value))
+    assert fast.dumps({"b": 1, "a": [1, 2]}, indent=2) == default.dumps({"b": 1, "a": [1, 2]}, indent=2)
+
+
+def test_sparse_fieldsets():
+    """
+    Test parsing and applying the `fields` query parameter.
+
+    Asserts:
+        Only the requested fields are kept, always with the movie ID.
+        Malformed fieldsets are rejected.
+    """
+    fields = parse_fields("title, poster_path,,")
+    assert fields == {"id", "title", "poster_path"}
+    assert select_fields([{"id": 1, "title": "Heat", "overview": "..."}], fields) == [{"id": 1, "title": "Heat"}]
+    assert select_fields([{"id": 1, "overview": "..."}], None) == [{"id": 1, "overview": "..."}]
+    assert parse_fields(None) is None
+    for value in ("", ",", "title,genres.name", "x" * 10 + ";"):
+        with pytest.raises(ValueError):
+            parse_fields(value)
+
+
+def test_compress_response():
+    """
+    Test the negotiated compression of responses.
+
+    Asserts:
+        Large responses are compressed with an encoding the client accepts, and their ETag marked.
+        Small responses, other content types and clients without gzip get the body unchanged.
+    """
+    body = b'{"movies":[' + b",".join(b'{"id":%d,"title":"Movie"}' % i for i in range(100)) + b"]}"
+    gzip_only = parse_accept_header("gzip, br;q=0")
+
+    response = Response(body, mimetype="application/json")
+    response.set_etag("abc")
+    compress_response(response, gzip_only, min_bytes=1024)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()) == body
+    assert response.get_etag() == ("abc-gzip", False)
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    small = compress_response(Response(body[:100], mimetype="application/json"), gzip_only, min_bytes=1024)
+    image = compress_response(Response(body, mimetype="image/jpeg"), gzip_only, min_bytes=1024)
+    identity = compress_response(Response(body, mimetype="application/json"), parse_accept_header(""), min_bytes=1024)
+    for response in (small, image, identity):
+        assert "Content-Encoding" not in response.headers
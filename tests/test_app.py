@@ -1,6 +1,13 @@
+import gzip
+import threading
+import time
 import pytest
-from flask import json
-from src.app import app, db
+from flask import json, render_template
+from src.app import (app, db, init_database, load_startup_movies, recommendation_cache, recommendation_service,
+                     search_index, user_cache)
+from src.services.async_runtime import AsyncRuntime
+from src.services.async_tmdb_service import AsyncTMDbService
+from src.services.cache_service import TieredCache, TTLCache
 from src.services.user_service import UserService
 from unittest.mock import patch
 from src.app import blacklist
@@ -14,12 +21,44 @@ def client():
     Yields:
         FlaskClient: A test client for the Flask application.
     """
+    init_database()
     with app.test_client() as client:
-        # Clean database before tests
+        # Clean database and cached users before tests
         db["users"].delete_many({})
+        db["list_entries"].delete_many({})
+        db["custom_lists"].delete_many({})
+        user_cache.clear()
+        recommendation_cache.clear()
         yield client
 
 
+def test_init_db_command(monkeypatch):
+    """
+    Test the one-time database setup, run with `flask --app app init-db` instead of on import.
+
+    Asserts:
+        The indexes are created.
+        Lists embedded in user documents by earlier versions are migrated.
+        The query plans are not checked under TEST_ENV, and are checked when asked to.
+    """
+    monkeypatch.setenv("TEST_ENV", "true")
+    db["users"].drop_indexes()
+    db["users"].delete_many({"username": "legacy"})
+    db["list_entries"].delete_many({"username": "legacy"})
+    db["users"].insert_one({"username": "legacy", "password_hash": "x", "role": "user",
+                            "lists": {"favorites": [5, 3], "watched": [], "to_watch": []}})
+    with patch("src.app.verify_query_plans") as verify:
+        result = app.test_cli_runner().invoke(args=["init-db"])
+        assert result.exit_code == 0
+        verify.assert_not_called()
+
+        init_database(verify_plans=True)
+        assert ("user by username", db["users"], {"username": ""}) in verify.call_args[0][0]
+    assert any(index["key"] == [("username", 1)] for index in db["users"].index_information().values())
+    assert "lists" not in db["users"].find_one({"username": "legacy"})
+    assert [entry["movie_id"] for entry in db["list_entries"].find({"username": "legacy"})] == [5, 3]
+
+
 def test_register(client):
     """
     Test user registration.
@@ -255,3 +294,615 @@ def test_revoked_token(client):
     )
     assert response.status_code == 401
     assert "Token has been revoked" in json.loads(response.data)["error"]
+
+
+def test_movie_details_list_status(client):
+    """
+    Test that the details page reflects the user's list membership.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        The status code is 200.
+        The page offers to remove the movie from the list it is in and to add it to the others.
+    """
+    user_service = UserService(db["users"])
+    user_service.create_user("testuser", "password123")
+    user_service.add_movie_to_list("testuser", 123, "favorites")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+
+    with patch("src.app.tmdb_service.get_movie_details") as mock_get_movie_details:
+        mock_get_movie_details.return_value = {"id": 123, "title": "Mocked Movie 123", "poster_path": "/mocked.jpg"}
+        response = client.get("/movies/details/123", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert b"Remove from Favorites" in response.data
+    assert b"Add to Watched" in response.data
+
+
+def test_movie_details_overlaps_gathered_calls(client):
+    """
+    Test that the details page fetches the movie and the user's list version at the same time.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        Two slow blocking calls take about as long as one.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+
+    def slow(result):
+        def call(*args):
+            time.sleep(0.3)
+            return result
+        return call
+
+    with patch("src.app.tmdb_service.get_movie_details", side_effect=slow({"id": 123, "title": "Slow Movie 123"})), \
+            patch("src.app.user_service.get_list_version", side_effect=slow(1)):
+        start = time.monotonic()
+        response = client.get("/movies/details/123", headers={"Authorization": f"Bearer {token}"})
+        elapsed = time.monotonic() - start
+
+    assert response.status_code == 200 and b"Slow Movie 123" in response.data
+    assert elapsed < 0.5
+
+
+def test_add_movie_to_list_unknown_user(client):
+    """
+    Test adding a movie for a user that no longer exists.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        The status code is 404.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    db["users"].delete_many({})
+
+    response = client.post(
+        "/movies/add_to_list",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"movie_id": 123, "list": "favorites"}
+    )
+    assert response.status_code == 404
+
+
+def test_logout_revokes_token(client):
+    """
+    Test that logging out revokes the session token.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        The token is rejected as revoked after logout.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    with client.session_transaction() as session:
+        session["token"] = token
+
+    assert client.get("/logout").status_code == 200
+    response = client.get("/lists", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert "Token has been revoked" in json.loads(response.data)["error"]
+
+
+def test_auth_me(client):
+    """
+    Test fetching the authenticated user's details.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        The status code is 200.
+        The username and role are returned.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert json.loads(response.data) == {"username": "testuser", "role": "user"}
+
+
+def test_auth_session(client):
+    """
+    Test the session state checked by the pages.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        An anonymous request is not authenticated.
+        A valid token is described without querying the user.
+        A revoked token is rejected.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/auth/session").json == {"authenticated": False}
+
+    with patch("src.app.user_service.get_user") as mock_get_user:
+        response = client.get("/auth/session", headers=headers)
+    mock_get_user.assert_not_called()
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    assert response.json["authenticated"] is True
+    assert response.json["username"] == "testuser" and response.json["role"] == "user"
+    assert response.json["expires"] > 0
+
+    from flask_jwt_extended.utils import decode_token
+    blacklist.add(decode_token(token)["jti"])
+    assert client.get("/auth/session", headers=headers).status_code == 401
+
+
+def test_list_update_invalidates_cached_user(client):
+    """
+    Test that a list update is visible right away despite the per-process user cache.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        The movie added after the lists were first loaded is returned.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with patch("src.app.tmdb_service.get_movie_details") as mock_get_movie_details:
+        mock_get_movie_details.side_effect = lambda movie_id: {"id": movie_id, "title": f"Mocked Movie {movie_id}"}
+
+        assert json.loads(client.get("/lists?format=json", headers=headers).data)["favorites"] == []
+        client.post("/movies/add_to_list", headers=headers, json={"movie_id": 123, "list": "favorites"})
+        lists = json.loads(client.get("/lists?format=json", headers=headers).data)
+
+    assert [movie["id"] for movie in lists["favorites"]] == [123]
+
+
+def test_recommendations(client):
+    """
+    Test the recommendations endpoint over movies keyed by TMDb ID.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        The status code is 200.
+        A favorite known only by its TMDb ID seeds the profile, and the similar
+        movie is recommended under its TMDb ID, never under a catalog ID.
+        Movies already in the user's favorites are not recommended.
+    """
+    # Mirrored movies have catalog IDs that collide with the bundled catalog, which has no TMDb IDs
+    mirrored = [
+        {"id": 1, "tmdb_id": 238, "title": "The Godfather", "genres": [{"id": 80, "name": "Crime"}],
+         "overview": "The aging patriarch of an organized crime dynasty transfers control to his son.",
+         "popularity": 3, "details_synced_at": 1},
+        {"id": 2, "tmdb_id": 240, "title": "The Godfather Part II", "genres": [{"id": 80, "name": "Crime"}],
+         "overview": "The early life of Vito Corleone and his son's grip on the crime family.",
+         "popularity": 2, "details_synced_at": 1},
+        {"id": 3, "tmdb_id": 157336, "title": "Interstellar", "genres": [{"id": 878, "name": "Science Fiction"}],
+         "overview": "Explorers travel through a wormhole in space.", "popularity": 1, "details_synced_at": 1},
+    ]
+    db["movies"].insert_many(mirrored)
+    try:
+        recommendation_service.build(load_startup_movies())
+    finally:
+        db["movies"].delete_many({"tmdb_id": {"$in": [238, 240, 157336]}})
+
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/movies/add_to_list", headers=headers, json={"movie_id": 238, "list": "favorites"})
+
+    response = client.get("/recommendations?limit=5", headers=headers)
+
+    assert response.status_code == 200
+    movies = json.loads(response.data)["recommendations"]
+    assert 0 < len(movies) <= 5
+    assert movies[0]["id"] == 240 and movies[0]["title"] == "The Godfather Part II"
+    assert not {238, 1, 2, 3} & {movie["id"] for movie in movies}
+
+
+def test_because_you_liked(client):
+    """
+    Test the "because you liked" endpoint reading the precomputed neighbors.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        The status code is 200.
+        The neighbors are returned with their details and scores, most similar first.
+    """
+    db["item_neighbors"].delete_many({})
+    db["item_neighbors"].insert_one({"_id": 550, "neighbors": [{"id": 13, "score": 0.9}, {"id": 680, "score": 0.5}]})
+
+    with patch("src.app.tmdb_service.get_movie_details") as mock_get_movie_details:
+        mock_get_movie_details.side_effect = lambda movie_id: {"id": movie_id, "title": f"Mocked Movie {movie_id}"}
+        response = client.get("/recommendations/because/550")
+
+    assert response.status_code == 200
+    assert json.loads(response.data)["movies"] == [
+        {"id": 13, "title": "Mocked Movie 13", "score": 0.9},
+        {"id": 680, "title": "Mocked Movie 680", "score": 0.5},
+    ]
+
+
+@pytest.fixture
+def async_mode():
+    """
+    Serve the async views as with WATCHIT_ASYNC_MODE=true: on one shared event loop,
+    with the async TMDb client reading from a cache filled by the test.
+
+    Yields:
+        TTLCache: The movie details cache of the async client.
+    """
+    runtime = AsyncRuntime()
+    details = TTLCache()
+    tmdb_client = AsyncTMDbService(cache=TieredCache(details), search_index=search_index)
+    with patch("src.app.ASYNC_MODE", True), patch("src.app.tmdb_client", tmdb_client), \
+            patch.object(app, "async_to_sync", runtime.async_to_sync):
+        yield details
+    runtime.stop()
+
+
+def test_async_mode_runs_blocking_calls_off_the_event_loop(async_mode):
+    """
+    Test the "because you liked" endpoint in async serving mode with a slow neighbors read.
+
+    Args:
+        async_mode: The async serving mode fixture.
+
+    Asserts:
+        Concurrent requests overlap instead of waiting for each other on the shared loop.
+        Each gets the neighbors with their details.
+    """
+    for movie_id in (13, 680):
+        async_mode.set(f"movie:{movie_id}", {"id": movie_id, "title": f"Movie {movie_id}"})
+
+    def slow_neighbors(movie_id, limit=None):
+        time.sleep(0.3)
+        return [{"id": 13, "score": 0.9}, {"id": 680, "score": 0.5}]
+
+    responses = []
+
+    def request():
+        with app.test_client() as client:
+            responses.append(client.get("/recommendations/because/550"))
+
+    with patch("src.app.item_similarity.get_neighbors", side_effect=slow_neighbors):
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 0.9
+    assert [response.status_code for response in responses] == [200] * 4
+    assert json.loads(responses[0].data)["movies"] == [
+        {"id": 13, "title": "Movie 13", "score": 0.9},
+        {"id": 680, "title": "Movie 680", "score": 0.5},
+    ]
+
+
+def test_async_mode_search_and_details(async_mode):
+    """
+    Test the search and details pages in async serving mode.
+
+    Args:
+        async_mode: The async serving mode fixture.
+
+    Asserts:
+        Searching and rendering in worker threads still see the request context.
+    """
+    async_mode.set("movie:157336", {"id": 157336, "title": "Interstellar", "overview": "Space.", "genres": []})
+    search_index.add_many([{"id": 157336, "title": "Interstellar", "overview": "Space."}])
+
+    with app.test_client() as client:
+        search = client.get("/movies/search?query=interstellar")
+        details = client.get("/movies/details/157336")
+
+    assert search.status_code == 200 and b"Interstellar" in search.data
+    assert details.status_code == 200 and b"Interstellar" in details.data
+
+
+def test_bulk_list_updates(client):
+    """
+    Test adding and removing many movies across lists in one request each.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        Each movie and list gets its own result.
+        The lists hold the expected movies afterwards.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/movies/add_to_list", headers=headers, json={"movie_id": 13, "list": "watched"})
+
+    response = client.post("/movies/add_to_list/bulk", headers=headers, json={
+        "lists": {"watched": [13, 550, 680, 550], "favorites": [550], "seen": [1], "to_watch": ["x"]},
+    })
+    assert response.status_code == 200
+    # The test client sends the lists with sorted keys
+    assert [(result["movie_id"], result["list"], result["status"]) for result in response.json["results"]] == [
+        (550, "favorites", "added"),
+        (1, "seen", "error"),
+        ("x", "to_watch", "error"),
+        (13, "watched", "unchanged"),
+        (550, "watched", "added"),
+        (680, "watched", "added"),
+        (550, "watched", "unchanged"),
+    ]
+
+    response = client.post("/movies/remove_from_list/bulk", headers=headers, json={
+        "lists": {"watched": [13, 999], "favorites": [550]},
+    })
+    assert [result["status"] for result in response.json["results"]] == ["removed", "removed", "unchanged"]
+
+    lists = UserService(db["users"]).get_lists("testuser")
+    assert lists == {"favorites": [], "watched": [550, 680], "to_watch": []}
+
+
+def test_bulk_list_update_validation(client):
+    """
+    Test malformed and oversized bulk requests.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        Malformed bodies are rejected with 400, oversized ones with 413 and unknown users with 404.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.post("/movies/add_to_list/bulk", headers=headers, json={"lists": [1, 2]}).status_code == 400
+    assert client.post("/movies/add_to_list/bulk", headers=headers,
+                       json={"lists": {"watched": list(range(1001))}}).status_code == 413
+
+    db["users"].delete_many({})
+    assert client.post("/movies/add_to_list/bulk", headers=headers, json={"lists": {"watched": [1]}}).status_code == 404
+
+
+def test_import_and_export_lists(client):
+    """
+    Test importing lists from NDJSON and CSV and exporting them back.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        Valid records are added and invalid lines are reported with their line number.
+        The export streams one record per movie in both formats.
+    """
+    UserService(db["users"]).create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    ndjson = '{"list": "watched", "movie_id": 550}\n\nnot json\n{"list": "watched", "movie_id": 550}\n{"list": "seen", "movie_id": 1}\n'
+    response = client.post("/lists/import", headers=headers, data=ndjson)
+    assert response.status_code == 200
+    assert response.json["added"] == 1
+    assert response.json["unchanged"] == 1
+    assert response.json["rejected"] == 1
+    assert response.json["invalid"] == 1
+    assert response.json["errors"][0]["line"] == 3
+
+    response = client.post("/lists/import?format=csv", headers=headers, data="list,movie_id\nfavorites,13\nto_watch,x\n")
+    assert response.json["added"] == 1
+    assert response.json["errors"] == [{"line": 3, "error": "Each record needs a 'list' and an integer 'movie_id'"}]
+
+    response = client.get("/lists/export", headers=headers)
+    assert response.mimetype == "application/x-ndjson"
+    assert [json.loads(line) for line in response.data.decode().splitlines()] == [
+        {"list": "favorites", "movie_id": 13},
+        {"list": "watched", "movie_id": 550},
+    ]
+    response = client.get("/lists/export?format=csv", headers=headers)
+    assert response.data.decode().splitlines() == ["list,movie_id", "favorites,13", "watched,550"]
+
+
+def test_admin_users_export(client):
+    """
+    Test the admin dump of every user.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        Regular users are rejected.
+        The dump contains every user without password hashes.
+        Custom lists are exported too, in a single CSV column.
+    """
+    user_service = UserService(db["users"])
+    user_service.create_user("testuser", "password123")
+    user_service.create_user("admin", "password123", role="admin")
+    user_service.add_movie_to_list("testuser", 550, "watched")
+    user_service.create_custom_list("road trip", owner="testuser")
+    user_service.add_movie_to_list("testuser", 13, "road trip")
+    user_token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    admin_token = client.post("/login", data={"username": "admin", "password": "password123"}).json["access_token"]
+
+    assert client.get("/admin/users/export", headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+
+    response = client.get("/admin/users/export", headers={"Authorization": f"Bearer {admin_token}"})
+    users = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [user["username"] for user in users] == ["testuser", "admin"]
+    assert all("password_hash" not in user for user in users)
+    assert users[0]["lists"]["road trip"] == [13]
+
+    response = client.get("/admin/users/export?format=csv", headers={"Authorization": f"Bearer {admin_token}"})
+    lines = response.data.decode().splitlines()
+    assert lines[0] == "_id,username,role,lists.favorites,lists.watched,lists.to_watch,lists.custom"
+    assert lines[1].endswith(',testuser,user,,550,,"{""road trip"": [13]}"')
+    assert lines[2].endswith(",admin,admin,,,,")
+
+
+def test_paginated_lists(client):
+    """
+    Test paging through a list from `/lists` to `/movies/list/<list_name>`.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        `/lists` returns the first page of each list and links to the next one.
+        Following the cursors returns every movie once.
+    """
+    user_service = UserService(db["users"])
+    user_service.create_user("testuser", "password123")
+    user_service.add_movies_to_lists("testuser", {"watched": [1, 2, 3, 4, 5]})
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with patch("src.app.tmdb_service.get_movie_details") as mock_get_movie_details:
+        mock_get_movie_details.side_effect = lambda movie_id: {"id": movie_id, "title": f"Mocked Movie {movie_id}"}
+
+        response = client.get("/lists?format=json&limit=2", headers=headers)
+        assert [movie["id"] for movie in response.json["watched"]] == [1, 2]
+        next_url = response.headers["Link"].split(">")[0][1:]
+        assert next_url.startswith("/movies/list/watched?")
+
+        movie_ids = []
+        while next_url:
+            page = client.get(next_url, headers=headers).json
+            movie_ids += [movie["id"] for movie in page["movies"]]
+            next_url = page["next"] and f"/movies/list/watched?limit=2&cursor={page['next']}"
+
+    assert movie_ids == [3, 4, 5]
+    assert client.get("/movies/list/watched?cursor=bogus", headers=headers).status_code == 400
+    assert client.get("/movies/list/seen", headers=headers).status_code == 400
+
+
+def test_custom_lists(client):
+    """
+    Test creating custom lists and using them like the default ones.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        Only admins create shared lists; every user creates their own.
+        Custom lists appear in `/lists` and can be paged with their movie count.
+    """
+    user_service = UserService(db["users"])
+    user_service.create_user("testuser", "password123")
+    user_service.create_user("admin", "password123", role="admin")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    admin_token = client.post("/login", data={"username": "admin", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.post("/admin/create_list", headers=headers, json={"list_name": "classics"}).status_code == 403
+    response = client.post("/admin/create_list", headers={"Authorization": f"Bearer {admin_token}"},
+                           json={"list_name": "classics"})
+    assert response.status_code == 201
+    assert client.post("/lists/custom", headers=headers, json={"list_name": "road trip"}).status_code == 201
+    assert client.post("/lists/custom", headers=headers, json={"list_name": "classics"}).status_code == 409
+    assert client.post("/lists/custom", headers=headers, json={}).status_code == 400
+
+    client.post("/movies/add_to_list/bulk", headers=headers, json={"lists": {"road trip": [1, 2, 3]}})
+
+    with patch("src.app.tmdb_service.get_movie_details") as mock_get_movie_details:
+        mock_get_movie_details.side_effect = lambda movie_id: {"id": movie_id, "title": f"Mocked Movie {movie_id}"}
+
+        lists = client.get("/lists?format=json", headers=headers).json
+        assert list(lists) == ["classics", "favorites", "road trip", "to_watch", "watched"]
+        assert [movie["id"] for movie in lists["road trip"]] == [1, 2, 3]
+
+        page = client.get("/movies/list/road trip?limit=2", headers=headers).json
+        assert page["count"] == 3
+        assert [movie["id"] for movie in page["movies"]] == [1, 2]
+        assert "count" not in client.get(f"/movies/list/road trip?cursor={page['next']}", headers=headers).json
+
+    assert client.get("/movies/list/unknown", headers=headers).status_code == 400
+
+
+def test_conditional_get(client):
+    """
+    Test that unchanged detail and list pages are revalidated without a body.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        A request with the ETag of the current page gets an empty 304 response.
+        Changing the user's lists changes the ETag, so the page is sent again.
+        A movie summary is rendered once for the same TMDb content.
+    """
+    user_service = UserService(db["users"])
+    user_service.create_user("testuser", "password123")
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with patch("src.app.tmdb_service.get_movie_details") as mock_get_movie_details, \
+            patch("src.app.render_template", wraps=render_template) as mock_render:
+        mock_get_movie_details.side_effect = lambda movie_id: {"id": movie_id, "title": f"Mocked Movie {movie_id}"}
+
+        for url in ("/movies/details/123", "/lists"):
+            first = client.get(url, headers=headers)
+            assert first.status_code == 200 and first.headers["ETag"]
+
+            rendered = mock_render.call_count
+            revalidated = client.get(url, headers={**headers, "If-None-Match": first.headers["ETag"]})
+            assert revalidated.status_code == 304
+            assert revalidated.data == b""
+            assert revalidated.headers["ETag"] == first.headers["ETag"]
+            assert mock_render.call_count == rendered
+
+        user_service.add_movie_to_list("testuser", 123, "favorites")
+
+        changed = client.get("/movies/details/123", headers={**headers, "If-None-Match": first.headers["ETag"]})
+        assert changed.status_code == 200
+        assert b"Remove from Favorites" in changed.data
+        assert [call.args[0] for call in mock_render.call_args_list].count("movie_summary.html") == 1
+        assert client.get("/lists", headers={**headers, "If-None-Match": first.headers["ETag"]}).status_code == 200
+
+
+def test_sparse_and_compressed_lists(client):
+    """
+    Test trimming and compressing the JSON lists.
+
+    Args:
+        client: The test client fixture.
+
+    Asserts:
+        `fields` keeps only the requested movie fields and rejects malformed fieldsets.
+        A large response is gzipped for a client accepting it, and revalidated with its ETag.
+    """
+    user_service = UserService(db["users"])
+    user_service.create_user("testuser", "password123")
+    user_service.add_movies_to_lists("testuser", {"watched": list(range(1, 21))})
+    token = client.post("/login", data={"username": "testuser", "password": "password123"}).json["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with patch("src.app.tmdb_service.get_movie_details") as mock_get_movie_details:
+        mock_get_movie_details.side_effect = lambda movie_id: {"id": movie_id, "title": f"Mocked Movie {movie_id}",
+                                                               "overview": "A long overview " * 10}
+
+        lists = client.get("/lists?format=json&fields=title", headers=headers).json
+        assert lists["watched"][0] == {"id": 1, "title": "Mocked Movie 1"}
+        assert client.get("/lists?format=json&fields=a.b", headers=headers).status_code == 400
+        page = client.get("/movies/list/watched?fields=title&limit=1", headers=headers).json
+        assert page["movies"] == [{"id": 1, "title": "Mocked Movie 1"}]
+
+        compressed = client.get("/lists?format=json", headers={**headers, "Accept-Encoding": "gzip"})
+        assert compressed.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(compressed.data))["watched"][19]["id"] == 20
+        revalidated = client.get("/lists?format=json", headers={**headers, "Accept-Encoding": "gzip",
+                                                                "If-None-Match": compressed.headers["ETag"]})
+        assert revalidated.status_code == 304
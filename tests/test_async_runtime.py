@@ -0,0 +1,48 @@
+import asyncio
+import contextvars
+import time
+from src.services.async_runtime import AsyncRuntime, resolve
+
+request_id = contextvars.ContextVar("request_id")
+
+
+def test_runtime_runs_coroutines_concurrently_in_caller_context():
+    """
+    Test that coroutines run on the shared loop, concurrently and with the caller's context.
+
+    Asserts:
+        The caller's context variables are visible inside the coroutine.
+        Awaited calls overlap instead of running one after another.
+    """
+    runtime = AsyncRuntime()
+    request_id.set("abc")
+
+    async def slow_call():
+        await asyncio.sleep(0.2)
+        return request_id.get()
+
+    async def view():
+        return await asyncio.gather(slow_call(), slow_call(), slow_call())
+
+    try:
+        start = time.monotonic()
+        assert runtime.run(view()) == ["abc", "abc", "abc"]
+        assert time.monotonic() - start < 0.5
+    finally:
+        runtime.stop()
+
+
+def test_resolve_accepts_blocking_and_async_results():
+    """
+    Test that views can await results from blocking and async clients alike.
+
+    Asserts:
+        Plain values and coroutines are both resolved.
+    """
+    async def async_client():
+        return {"id": 2}
+
+    async def view():
+        return await resolve({"id": 1}), await resolve(async_client())
+
+    assert asyncio.run(view()) == ({"id": 1}, {"id": 2})
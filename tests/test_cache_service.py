@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from src.app import db
+from src.services.cache_service import MongoCache, TieredCache, TTLCache
+
+
+class FakeClock:
+    """
+    Manually advanced time source for TTL tests.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_and_evicts():
+    """
+    Test TTL expiry and least-recently-used eviction.
+
+    Asserts:
+        Entries are served until their TTL, then only as stale.
+        The least recently used entry is evicted when the cache is full.
+    """
+    clock = FakeClock()
+    cache = TTLCache(max_size=2, ttl=10, stale_ttl=5, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    clock.now = 12
+    assert cache.get("a") is None
+    assert cache.lookup("a") == (1, False)
+
+    clock.now = 16
+    assert cache.lookup("a") is None
+
+
+def test_tiered_cache_single_flight():
+    """
+    Test that concurrent misses for the same key trigger a single load.
+
+    Asserts:
+        Every caller gets the loaded value.
+        The loader runs once.
+    """
+    cache = TieredCache(TTLCache())
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(1)
+        return {"id": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("movie:1", loader))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{"id": 1}] * 5
+    assert len(calls) == 1
+    assert cache.get_stats()["coalesced"] == 4
+
+
+def test_tiered_cache_async_waiters_survive_a_cancelled_load():
+    """
+    Test concurrent async misses when the caller running the load is cancelled.
+
+    Asserts:
+        The waiters are released and load the value themselves instead of hanging.
+    """
+    cache = TieredCache(TTLCache())
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.2 if len(calls) == 1 else 0)
+        return {"id": 1}
+
+    async def requests():
+        leader = asyncio.ensure_future(cache.get_or_load_async("movie:1", loader))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.ensure_future(cache.get_or_load_async("movie:1", loader)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.wait_for(asyncio.gather(*waiters), 1)
+
+    assert asyncio.run(requests()) == [{"id": 1}] * 3
+    assert len(calls) == 2
+
+
+def test_tiered_cache_serves_stale_while_revalidating():
+    """
+    Test that a stale entry is served while it is refreshed in the background.
+
+    Asserts:
+        The stale value is returned immediately.
+        The refreshed value is served afterwards.
+    """
+    clock = FakeClock()
+    cache = TieredCache(TTLCache(ttl=10, stale_ttl=100, clock=clock))
+    cache.get_or_load("movie:1", lambda: "old")
+
+    clock.now = 20
+    assert cache.get_or_load("movie:1", lambda: "new") == "old"
+    cache.executor.shutdown(wait=True)
+
+    assert cache.get_or_load("movie:1", lambda: "newer") == "new"
+    assert cache.get_stats()["stale_hits"] == 1
+
+
+def test_tiered_cache_shares_entries_through_mongo():
+    """
+    Test that a value loaded by one process-level cache is served from MongoDB to another.
+
+    Asserts:
+        The second cache does not call its loader.
+    """
+    db["tmdb_cache_test"].delete_many({})
+    first = TieredCache(TTLCache(), MongoCache(db["tmdb_cache_test"]))
+    second = TieredCache(TTLCache(), MongoCache(db["tmdb_cache_test"]))
+
+    first.get_or_load("movie:1", lambda: {"id": 1})
+
+    def loader():
+        raise AssertionError("The shared entry should have been used")
+
+    assert second.get_or_load("movie:1", loader) == {"id": 1}
+    assert second.get_stats()["l2_hits"] == 1
+
+
+def test_mongo_cache_iter_values_newest_first():
+    """
+    Test reading a bounded number of entries back from the shared cache.
+
+    Asserts:
+        The entries expiring last come first, and only `limit` of them are read.
+    """
+    db["tmdb_cache_test"].delete_many({})
+    for movie_id, ttl in ((1, 10), (2, 30), (3, 20)):
+        MongoCache(db["tmdb_cache_test"], ttl=ttl).set(f"movie:{movie_id}", {"id": movie_id})
+
+    cache = MongoCache(db["tmdb_cache_test"])
+    assert list(cache.iter_values(limit=2)) == [{"id": 2}, {"id": 3}]
+    assert len(list(cache.iter_values())) == 3
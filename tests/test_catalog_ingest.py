@@ -0,0 +1,144 @@
+import gzip
+import io
+import json
+from src.app import db
+from src.services.catalog_ingest import iter_json_values, validate_batch
+from src.services.movie_service import MovieService
+
+
+def test_iter_json_values_streams_arrays_and_ndjson():
+    """
+    Test the streaming reader with values split across read chunks.
+
+    Asserts:
+        JSON arrays and NDJSON give the same records, whatever the chunk size.
+    """
+    movies = [{"id": i, "title": f"Movie [{i}], \"quoted\"", "rating": i / 3} for i in range(50)]
+    array = json.dumps(movies, indent=2)
+    ndjson = "\n".join(json.dumps(movie) for movie in movies) + "\n"
+
+    for text in (array, ndjson):
+        for chunk_size in (1, 7, 4096):
+            assert list(iter_json_values(io.StringIO(text), chunk_size)) == movies
+    assert list(iter_json_values(io.StringIO("[1, 23, 456]"), 2)) == [1, 23, 456]
+
+
+def test_validate_batch():
+    """
+    Test the batch validation of required fields and rating bounds.
+
+    Asserts:
+        Missing fields, empty values and out of range ratings are rejected.
+    """
+    movies = [
+        {"title": "Ok", "genre": "Drama", "rating": 7},
+        {"title": "No genre", "rating": 7},
+        {"title": "", "genre": "Drama", "rating": 7},
+        {"title": "Too high", "genre": "Drama", "rating": 11},
+        {"title": "Not a number", "genre": "Drama", "rating": "7"},
+    ]
+    assert validate_batch(movies, ["title", "genre", "rating"]).tolist() == [True, False, False, False, False]
+    assert validate_batch([{"id": 1, "title": "A"}, {"id": 2, "title": "B", "vote_average": -1}],
+                          ["id", "title"], rating_field="vote_average").tolist() == [True, False]
+
+
+def test_ingest_catalog_deduplicates():
+    """
+    Test loading the bundled catalog and loading it again.
+
+    Asserts:
+        Repeated titles are stored once with new unique IDs.
+        A second load only reports duplicates and allocates no IDs.
+    """
+    db["counters"].delete_many({})
+    collection = db["movies_ingest"]
+    collection.drop()
+    service = MovieService(collection)
+
+    report = service.ingest_file("src/data/movies.json", batch_size=4, writers=2)
+    assert report["read"] == 30
+    assert report["invalid"] == 1
+    assert report["inserted"] == collection.count_documents({})
+    assert report["duplicates"] == 29 - report["inserted"]
+    titles = [movie["title"] for movie in collection.find()]
+    assert titles.count("Tenet") == 1
+    assert len({movie["id"] for movie in collection.find()}) == report["inserted"]
+
+    counter = db["counters"].find_one({"_id": "movies"})["value"]
+    again = service.ingest_file("src/data/movies.json", batch_size=4, writers=2)
+    assert again["inserted"] == 0
+    assert again["duplicates"] == 29
+    assert db["counters"].find_one({"_id": "movies"})["value"] == counter
+
+
+def test_ingest_deduplicates_across_batches():
+    """
+    Test a title repeated across batches written in parallel.
+
+    Asserts:
+        It is stored once and its copies are reported as duplicates, not failures.
+    """
+    collection = db["movies_ingest"]
+    collection.drop()
+    movie = {"title": "Tenet", "year": 2020, "genre": "Action", "rating": 7.5}
+
+    report = MovieService(collection).ingest((dict(movie) for _ in range(20)), batch_size=1, writers=4)
+    assert (report["inserted"], report["duplicates"], report["failed"]) == (1, 19, 0)
+    assert collection.count_documents({"title": "Tenet"}) == 1
+
+
+def test_ingest_tmdb_export_updates_in_place(tmp_path):
+    """
+    Test loading a gzip-compressed TMDb export twice.
+
+    Asserts:
+        Records are keyed by their TMDb ID, take no catalog ID and are refreshed on the second load.
+    """
+    db["counters"].delete_many({})
+    collection = db["movies_ingest"]
+    collection.drop()
+    path = tmp_path / "movie_ids.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write('{"id": 550, "original_title": "Fight Club", "popularity": 60.1}\n')
+        file.write('{"id": 13, "original_title": "Forrest Gump", "popularity": 50.2}\n')
+        file.write('{"original_title": "No ID"}\n')
+
+    service = MovieService(collection)
+    assert service.ingest_file(str(path), source="tmdb")["inserted"] == 2
+    assert "id" not in collection.find_one({"tmdb_id": 550})
+
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write('{"id": 550, "original_title": "Fight Club", "popularity": 70.5}\n')
+    report = service.ingest_file(str(path), source="tmdb")
+
+    assert (report["inserted"], report["updated"]) == (0, 1)
+    assert collection.find_one({"tmdb_id": 550})["popularity"] == 70.5
+    assert collection.find_one({"tmdb_id": 550})["title"] == "Fight Club"
+    assert collection.count_documents({}) == 2
+    assert db["counters"].find_one({"_id": "movies", "value": {"$gt": 0}}) is None
+
+
+def test_catalog_leaves_out_mirrored_movies(tmp_path):
+    """
+    Test the catalog queries with mirrored TMDb records stored alongside the catalog movies.
+
+    Asserts:
+        Only catalog movies are listed and paged, including one with a TMDb ID.
+    """
+    db["counters"].delete_many({})
+    collection = db["movies_ingest"]
+    collection.drop()
+    path = tmp_path / "movie_ids.json"
+    path.write_text('{"id": 550, "original_title": "Fight Club"}\n{"id": 13, "original_title": "Forrest Gump"}\n')
+    service = MovieService(collection)
+    service.ingest_file(str(path), source="tmdb")
+    service.ingest([{"title": "Tenet", "genre": "Action", "rating": 7.5, "tmdb_id": 577922},
+                    {"title": "Up", "genre": "Animation", "rating": 8.3}])
+    service.add_movie({"title": "Added", "genre": "Drama", "rating": 6})
+
+    titles = ["Tenet", "Up", "Added"]
+    assert [movie["title"] for movie in service.get_all_movies()] == titles
+    first = service.get_movies_page(limit=2)
+    second = service.get_movies_page(limit=2, cursor=first["next"])
+    assert [movie["title"] for movie in first["movies"] + second["movies"]] == titles
+    assert second["next"] is None
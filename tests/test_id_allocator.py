@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pymongo.errors import DuplicateKeyError
+from src.app import db
+from src.services.id_allocator import IdAllocator
+from src.services.movie_service import MovieService
+
+
+def test_allocator_reserves_blocks():
+    """
+    Test that IDs are handed out from blocks reserved on the shared counter.
+
+    Asserts:
+        IDs are consecutive within a block and one round-trip reserves a whole block.
+        Two allocators sharing the counter never return the same ID.
+        `ensure_at_least` skips IDs already in use.
+    """
+    db["counters"].delete_many({})
+    first = IdAllocator(db["counters"], "movies", block_size=10)
+    second = IdAllocator(db["counters"], "movies", block_size=10)
+
+    assert [first.allocate() for _ in range(3)] == [1, 2, 3]
+    assert db["counters"].find_one({"_id": "movies"})["value"] == 10
+    assert second.allocate() == 11
+
+    first.ensure_at_least(50)
+    assert first.allocate() == 51
+    first.ensure_at_least(5)
+    assert first.allocate() == 52
+
+
+def test_allocator_is_thread_safe():
+    """
+    Test concurrent allocations from one process.
+
+    Asserts:
+        Every allocated ID is unique.
+    """
+    db["counters"].delete_many({})
+    allocator = IdAllocator(db["counters"], "movies", block_size=7)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = list(executor.map(lambda _: allocator.allocate(), range(200)))
+
+    assert len(set(ids)) == 200
+
+
+def test_add_movie_uses_unique_ids():
+    """
+    Test movie ID allocation in MovieService.
+
+    Asserts:
+        New movies get IDs past the highest existing catalog ID.
+        The unique index rejects a duplicated catalog ID, and add_movie skips past it.
+    """
+    db["counters"].delete_many({})
+    collection = db["movies_ids"]
+    collection.drop()
+    collection.insert_many([
+        {"id": 7, "title": "Tenet", "genre": "Sci-Fi", "rating": 7.8},
+        {"id": 550, "title": "Fight Club", "list": "favorites"},
+    ])
+    service = MovieService(collection)
+    service.ensure_indexes()
+
+    movie = service.add_movie({"title": "Arrival", "genre": "Sci-Fi", "rating": 7.9})
+    assert movie["id"] == 8
+
+    with pytest.raises(DuplicateKeyError):
+        collection.insert_one({"id": 8, "title": "Copy"})
+
+    collection.insert_one({"id": 9, "title": "Inserted elsewhere"})
+    assert service.add_movie({"title": "Dune", "genre": "Sci-Fi", "rating": 8.0})["id"] == 10
@@ -0,0 +1,151 @@
+import io
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import pytest
+from src.app import app
+from src.services.image_proxy import ImageProxy, ImageStore
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """
+    Serve a local directory as a stub of the TMDb image server.
+
+    Yields:
+        tuple: (base URL, directory served, list of requested paths).
+    """
+    root = tmp_path / "origin"
+    root.mkdir()
+    requested = []
+
+    class Handler(QuietHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", root, requested
+    server.shutdown()
+    server.server_close()
+
+
+def add_image(root, size, name, data):
+    (root / size).mkdir(exist_ok=True)
+    (root / size / name).write_bytes(data)
+
+
+def read(proxy, size, path):
+    digest, file, _ = proxy.open_image(size, path)
+    with file:
+        return digest, file.read()
+
+
+def test_images_are_downloaded_once(origin, tmp_path):
+    """
+    Test the disk cache in front of the origin.
+
+    Asserts:
+        An image is downloaded on the first request only, also by a new process.
+        Identical images are stored once.
+        Unknown images and invalid paths are rejected.
+    """
+    url, root, requested = origin
+    add_image(root, "w342", "a.jpg", b"poster a")
+    add_image(root, "w500", "a.jpg", b"poster a")
+    proxy = ImageProxy(ImageStore(str(tmp_path / "cache")), origin=url, resize=False)
+
+    assert read(proxy, "w342", "a.jpg")[1] == b"poster a"
+    assert read(proxy, "w342", "a.jpg")[1] == b"poster a"
+    assert read(proxy, "w500", "a.jpg")[1] == b"poster a"
+    assert requested == ["/w342/a.jpg", "/w500/a.jpg"]
+    assert proxy.store.get_stats()["images"] == 1
+
+    restarted = ImageProxy(ImageStore(str(tmp_path / "cache")), origin=url, resize=False)
+    assert read(restarted, "w342", "a.jpg")[1] == b"poster a"
+    assert len(requested) == 2
+
+    with pytest.raises(LookupError):
+        proxy.open_image("w342", "missing.jpg")
+    for size, path in (("w123", "a.jpg"), ("w342", "..%2Fa.jpg"), ("w342", "a.exe")):
+        with pytest.raises(ValueError):
+            proxy.open_image(size, path)
+
+
+def test_least_recently_used_images_are_evicted(origin, tmp_path):
+    """
+    Test the disk budget of the cache.
+
+    Asserts:
+        Once the budget is exceeded, the least recently used image is deleted and downloaded again.
+    """
+    url, root, requested = origin
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        add_image(root, "w342", name, name.encode() * 100)
+    proxy = ImageProxy(ImageStore(str(tmp_path / "cache"), max_bytes=1000), origin=url, resize=False)
+
+    read(proxy, "w342", "a.jpg")
+    read(proxy, "w342", "b.jpg")
+    read(proxy, "w342", "a.jpg")  # b.jpg is now the least recently used
+    read(proxy, "w342", "c.jpg")
+
+    assert proxy.get_stats()["evictions"] == 1
+    assert proxy.get_stats()["bytes"] == 1000
+    read(proxy, "w342", "a.jpg")
+    read(proxy, "w342", "b.jpg")
+    assert requested.count("/w342/a.jpg") == 1
+    assert requested.count("/w342/b.jpg") == 2
+
+
+def test_thumbnails_are_resized_from_one_source(origin, tmp_path):
+    """
+    Test the on-demand resizing into the thumbnail widths.
+
+    Asserts:
+        Every width is resized from a single download of the source rendition.
+    """
+    Image = pytest.importorskip("PIL.Image")
+    url, root, requested = origin
+    source = io.BytesIO()
+    Image.new("RGB", (780, 1170), "red").save(source, "JPEG")
+    add_image(root, "w780", "a.jpg", source.getvalue())
+    proxy = ImageProxy(ImageStore(str(tmp_path / "cache")), origin=url, resize=True)
+
+    for size, width in (("w185", 185), ("w342", 342), ("w780", 780)):
+        with Image.open(io.BytesIO(read(proxy, size, "a.jpg")[1])) as thumbnail:
+            assert thumbnail.size == (width, round(1170 * width / 780))
+    assert requested == ["/w780/a.jpg"]
+
+
+def test_image_route(origin, tmp_path):
+    """
+    Test the `/img/<size>/<path>` route.
+
+    Asserts:
+        Images are served with immutable cache headers and revalidated by digest.
+        Unknown images are not found.
+    """
+    url, root, _ = origin
+    add_image(root, "w342", "a.jpg", b"poster a")
+    proxy = ImageProxy(ImageStore(str(tmp_path / "cache")), origin=url, resize=False)
+
+    with patch("src.app.image_proxy", proxy), app.test_client() as client:
+        response = client.get("/img/w342/a.jpg")
+        assert response.status_code == 200
+        assert response.data == b"poster a"
+        assert response.mimetype == "image/jpeg"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert response.cache_control.max_age == 365 * 24 * 3600
+
+        revalidated = client.get("/img/w342/a.jpg", headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+        assert client.get("/img/w342/missing.jpg").status_code == 404
+        assert client.get("/img/huge/a.jpg").status_code == 404
@@ -0,0 +1,227 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from src.app import db
+from src.services.item_similarity import ItemSimilarityService
+from src.services.user_service import UserService
+
+
+def build_service(**kwargs):
+    """
+    Create the service over clean users and neighbors collections with a few users.
+
+    Returns:
+        ItemSimilarityService: The service.
+    """
+    db["users"].delete_many({})
+    db["list_entries"].delete_many({})
+    db["item_neighbors"].delete_many({})
+    db["item_cooccurrence"].delete_many({})
+    users = {
+        "ana": {"favorites": [1, 2], "watched": [3], "to_watch": [9]},
+        "bob": {"favorites": [1], "watched": [2]},
+        "eva": {"favorites": [1, 3]},
+        "leo": {"watched": [4], "to_watch": [1]},
+        "new": {},
+    }
+    user_service = UserService(db["users"])
+    user_service.ensure_indexes()
+    db["users"].insert_many([{"username": username} for username in users])
+    for username, lists in users.items():
+        user_service.add_movies_to_lists(username, lists)
+    service = ItemSimilarityService(db["list_entries"], db["item_neighbors"], db["item_cooccurrence"], **kwargs)
+    service.ensure_indexes()
+    return service
+
+
+def test_build_persists_top_neighbors():
+    """
+    Test that the batch job writes each movie's neighbors ranked by cosine similarity.
+
+    Asserts:
+        Pairs shared by fewer users than the threshold are left out.
+        Movies only found in `to_watch` lists are ignored.
+    """
+    service = build_service(min_cooccurrence=2)
+
+    assert service.build() == {"users": 4, "movies": 3}
+
+    assert service.get_neighbors(1) == [{"id": 3, "score": 0.8165}, {"id": 2, "score": 0.8165}]
+    assert service.get_neighbors(2) == [{"id": 1, "score": 0.8165}]
+    assert service.get_neighbors(9) == []
+    assert service.get_neighbors(4) == []
+
+
+def test_build_flushes_pair_counts_in_chunks():
+    """
+    Test a build whose pair counts do not fit in the in-memory chunk.
+
+    Asserts:
+        The counts flushed chunk by chunk add up to the same neighbors.
+        Every pair is stored in its own document, both ways, next to the count of each movie.
+        The staging collection is dropped once the counts are written.
+    """
+    service = build_service(min_cooccurrence=2, max_pending_pairs=1)
+
+    assert service.build() == {"users": 4, "movies": 3}
+
+    assert service.get_neighbors(1) == [{"id": 3, "score": 0.8165}, {"id": 2, "score": 0.8165}]
+    pairs = {(pair["movie_id"], pair["other_id"]): pair["count"] for pair in db["item_cooccurrence"].find()}
+    assert pairs[1, 2] == pairs[2, 1] == 2
+    assert pairs[1, 1] == 3
+    assert (1, 9) not in pairs
+    assert "item_cooccurrence_build" not in db.list_collection_names()
+
+
+def test_build_keeps_top_k_and_drops_stale_neighbors():
+    """
+    Test the neighbors limit and that a rebuild removes movies without neighbors.
+
+    Asserts:
+        Only `top_k` neighbors are stored per movie.
+        A movie that lost its neighbors is removed after the rebuild.
+    """
+    service = build_service(min_cooccurrence=1, top_k=1)
+    service.build()
+    assert len(service.get_neighbors(1)) == 1
+
+    db["list_entries"].delete_many({"movie_id": 2})
+    service.build()
+
+    assert service.get_neighbors(2) == []
+    assert service.get_neighbors(1, limit=5) == [{"id": 3, "score": 0.8165}]
+
+
+def test_list_changes_update_neighbors_incrementally():
+    """
+    Test that list changes emitted by UserService update the counts and invalidate neighbors.
+
+    Asserts:
+        Invalidated neighbors are served as they are until recomputed.
+        A new pair becomes a neighbor after enough users add it, without a rebuild.
+        Removing the movie again restores the previous neighbors.
+        Moving a movie between feedback lists and changing `to_watch` leave the counts alone.
+    """
+    service = build_service(min_cooccurrence=2)
+    service.build()
+    user_service = UserService(db["users"])
+    user_service.subscribe(service.apply_change)
+    assert service.get_neighbors(4) == []
+
+    user_service.add_movie_to_list("bob", 4, "watched")
+    assert service.get_neighbors(4) == []
+    user_service.add_movie_to_list("eva", 4, "favorites")
+    assert service.get_neighbors(4) == []
+    assert service.refresh_stale() == 4
+    assert service.get_neighbors(4) == [{"id": 1, "score": 0.6667}]
+    assert {"id": 4, "score": 0.6667} in service.get_neighbors(1)
+
+    user_service.add_movie_to_list("eva", 4, "watched")
+    user_service.remove_movie_from_list("eva", 4, "favorites")
+    user_service.add_movie_to_list("ana", 4, "to_watch")
+    service.refresh_stale()
+    assert service.get_neighbors(4) == [{"id": 1, "score": 0.6667}]
+
+    user_service.remove_movie_from_list("eva", 4, "watched")
+    service.refresh_stale()
+    assert service.get_neighbors(4) == []
+    assert service.get_neighbors(1) == [{"id": 3, "score": 0.8165}, {"id": 2, "score": 0.8165}]
+
+
+def test_stale_neighbors_are_refreshed_in_the_background():
+    """
+    Test the recomputation of stale neighbors after their reads.
+
+    Asserts:
+        The read returns the stale neighbors and the recomputation runs on the executor.
+        Only the most shared pairs of the movie are read.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    service = build_service(min_cooccurrence=1, max_candidates=1, executor=executor)
+    service.build()
+    user_service = UserService(db["users"])
+    user_service.subscribe(service.apply_change)
+
+    user_service.add_movie_to_list("leo", 2, "favorites")
+    assert service.get_neighbors(2) == [{"id": 1, "score": 0.8165}, {"id": 3, "score": 0.5}]
+    executor.submit(lambda: None).result()
+
+    assert service.get_neighbors(2) == [{"id": 1, "score": 0.6667}]
+    executor.shutdown()
+
+
+def test_build_keeps_changes_applied_meanwhile():
+    """
+    Test list changes applied while a build runs.
+
+    Asserts:
+        Counts and neighbors changed after the build read the lists are not overwritten.
+    """
+    service = build_service(min_cooccurrence=2)
+    service.build()
+    user_service = UserService(db["users"])
+    user_service.subscribe(service.apply_change)
+    count = service._count
+
+    def count_then_change():
+        counts = count()
+        user_service.add_movie_to_list("bob", 4, "watched")
+        user_service.add_movie_to_list("eva", 4, "favorites")
+        return counts
+
+    with patch.object(service, "_count", side_effect=count_then_change):
+        service.build()
+
+    service.refresh_stale()
+    assert service.get_neighbors(4) == [{"id": 1, "score": 0.6667}]
+    assert db["item_cooccurrence"].find_one({"movie_id": 4, "other_id": 4})["count"] == 3
+
+
+def test_list_change_events():
+    """
+    Test the events emitted by UserService.
+
+    Asserts:
+        Only effective changes are emitted.
+        Emitting them reads none of the user's lists.
+    """
+    build_service()
+    user_service = UserService(db["users"])
+    events = []
+    user_service.subscribe(events.append)
+
+    with patch.object(user_service, "get_lists", side_effect=AssertionError), \
+            patch.object(user_service, "user_exists", side_effect=AssertionError):
+        user_service.add_movie_to_list("bob", 7, "favorites")
+        user_service.add_movie_to_list("bob", 7, "favorites")
+        user_service.remove_movie_from_list("bob", 8, "favorites")
+        user_service.remove_movie_from_list("bob", 7, "favorites")
+        assert user_service.add_movie_to_list("nobody", 7, "favorites") == {"error": "User not found"}
+
+    assert events == [
+        {"username": "bob", "movie_id": 7, "list": "favorites", "action": "add"},
+        {"username": "bob", "movie_id": 7, "list": "favorites", "action": "remove"},
+    ]
+    assert db["list_entries"].count_documents({"username": "nobody"}) == 0
+
+
+def test_late_list_changes_are_skipped():
+    """
+    Test list changes applied after the lists changed again, as on the background thread.
+
+    Asserts:
+        An addition already removed again, and its removal, leave the counts alone.
+    """
+    service = build_service(min_cooccurrence=1)
+    service.build()
+    counts = {(pair["movie_id"], pair["other_id"]): pair["count"] for pair in db["item_cooccurrence"].find()}
+    user_service = UserService(db["users"])
+    events = []
+    user_service.subscribe(events.append)
+
+    user_service.add_movie_to_list("bob", 4, "favorites")
+    user_service.remove_movie_from_list("bob", 4, "favorites")
+    for event in events:
+        service.apply_change(event)
+
+    assert {(pair["movie_id"], pair["other_id"]): pair["count"]
+            for pair in db["item_cooccurrence"].find() if pair["count"]} == counts
@@ -0,0 +1,107 @@
+import pytest
+from src.app import db
+from src.services.movie_service import MovieService
+from src.services.pagination import InvalidCursorError, decode_cursor, encode_cursor, page_limit
+from src.services.user_service import UserService
+
+
+def collect_pages(get_page, key):
+    """
+    Follow the continuation tokens of a paginated method until the last page.
+
+    Args:
+        get_page (callable): Function taking a cursor and returning a page.
+        key (str): Page field holding the items.
+
+    Returns:
+        list: Items of every page, in order.
+    """
+    items, cursor = [], None
+    while True:
+        page = get_page(cursor)
+        items.extend(page[key])
+        cursor = page["next"]
+        if cursor is None:
+            return items
+
+
+def test_cursor_round_trip_and_validation():
+    """
+    Test encoding and decoding continuation tokens and the page size limits.
+
+    Asserts:
+        Tokens decode to the encoded position and malformed ones are rejected.
+        Page sizes are clamped to the allowed range.
+    """
+    assert decode_cursor(encode_cursor({"id": 5, "_id": "abc"})) == {"id": 5, "_id": "abc"}
+    assert decode_cursor(None) is None
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not a cursor")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor([1, 2]).rstrip())
+
+    assert page_limit(None) == 20
+    assert page_limit("500") == 100
+    assert page_limit("0") == 1
+    with pytest.raises(ValueError):
+        page_limit("ten")
+
+
+def test_movies_keyset_pages():
+    """
+    Test paging through the catalog and a list of movies.
+
+    Asserts:
+        Every movie is returned once, ordered by ID, including movies sharing an ID.
+        Movies inserted before the cursor position are not repeated.
+    """
+    collection = db["movies_pagination"]
+    collection.delete_many({})
+    collection.insert_many([{"id": movie_id, "title": f"Movie {movie_id}", "list": "classics" if movie_id % 2 else "new"}
+                            for movie_id in [5, 1, 4, 2, 3, 3]])
+    service = MovieService(collection)
+
+    movies = collect_pages(lambda cursor: service.get_movies_page(2, cursor), "movies")
+    assert [movie["id"] for movie in movies] == [1, 2, 3, 3, 4, 5]
+    assert all("_id" not in movie for movie in movies)
+
+    first = service.get_movies_page(2)
+    collection.insert_one({"id": 0, "title": "Movie 0"})
+    second = service.get_movies_page(2, first["next"])
+    assert [movie["id"] for movie in second["movies"]] == [3, 3]
+
+    classics = collect_pages(lambda cursor: service.get_movies_from_list_page("classics", 2, cursor), "movies")
+    assert [movie["id"] for movie in classics] == [1, 3, 3, 5]
+
+
+def test_user_list_pages_survive_removals():
+    """
+    Test paging through a user's list while it changes.
+
+    Asserts:
+        Pages follow the order movies were added in.
+        Removing movies already seen does not skip any movie on the next page.
+        Unknown users get None.
+    """
+    db["users"].delete_many({})
+    db["list_entries"].delete_many({})
+    service = UserService(db["users"])
+    service.create_user("testuser", "password123")
+    service.add_movies_to_lists("testuser", {"watched": list(range(10, 20))})
+
+    assert collect_pages(lambda cursor: service.get_list_page("testuser", "watched", 3, cursor), "movie_ids") == \
+        list(range(10, 20))
+
+    first = service.get_list_page("testuser", "watched", 3)
+    assert first["movie_ids"] == [10, 11, 12]
+    service.remove_movies_from_lists("testuser", {"watched": [10, 11]})
+    assert service.get_list_page("testuser", "watched", 3, first["next"])["movie_ids"] == [13, 14, 15]
+
+    second = service.get_list_page("testuser", "watched", 3, first["next"])
+    service.remove_movies_from_lists("testuser", {"watched": [15]})
+    assert service.get_list_page("testuser", "watched", 3, second["next"])["movie_ids"] == [16, 17, 18]
+
+    pages = service.get_first_list_pages("testuser", limit=3)
+    assert pages["watched"]["movie_ids"] == [12, 13, 14]
+    assert pages["favorites"] == {"movie_ids": [], "next": None}
+    assert service.get_list_page("nobody", "watched") is None
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import runpy
+import threading
+import pytest
+from src.app import db
+from src.services.password_hasher import HasherBusyError, PasswordHasher, default_pool_size, get_rounds
+from src.services.user_service import UserService
+
+
+def test_hasher_runs_in_process_pool():
+    """
+    Test hashing and verification in the worker process pool.
+
+    Asserts:
+        The hash uses the configured cost factor.
+        The right password matches and a wrong one does not.
+    """
+    hasher = PasswordHasher(rounds=4, workers=1)
+    password_hash = hasher.hash("password123")
+
+    assert get_rounds(password_hash) == 4
+    assert hasher.verify("password123", password_hash)
+    assert not hasher.verify("wrongpassword", password_hash)
+
+
+def test_hasher_rejects_work_when_queue_is_full():
+    """
+    Test the backpressure of the bounded hashing queue.
+
+    Asserts:
+        HasherBusyError is raised when no slot frees up in time.
+    """
+    hasher = PasswordHasher(rounds=4, max_pending=1, queue_timeout=0.05)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_job():
+        started.set()
+        release.wait(1)
+
+    worker = threading.Thread(target=hasher._run, args=(slow_job,))
+    worker.start()
+    started.wait(1)
+    try:
+        with pytest.raises(HasherBusyError):
+            hasher.hash("password123")
+    finally:
+        release.set()
+        worker.join()
+
+
+def test_login_rehashes_outdated_cost():
+    """
+    Test that a successful login upgrades a hash made with an outdated cost factor.
+
+    Asserts:
+        The stored hash uses the new cost factor after login.
+        The password still authenticates.
+    """
+    db["users"].delete_many({})
+    UserService(db["users"], password_hasher=PasswordHasher(rounds=4)).create_user("testuser", "password123")
+    user_service = UserService(db["users"], password_hasher=PasswordHasher(rounds=5))
+
+    assert user_service.authenticate_user("testuser", "password123")
+    stored = db["users"].find_one({"username": "testuser"})
+    assert get_rounds(stored["password_hash"]) == 5
+    assert user_service.authenticate_user("testuser", "password123")
+
+
+def test_pool_size_is_capped_per_host(monkeypatch):
+    """
+    Test the pool sizing of the server workers sharing a host.
+
+    Asserts:
+        The pools of all the workers use about one process per CPU, at least one each.
+        gunicorn.conf.py hands every worker that size unless it is set explicitly.
+    """
+    assert default_pool_size(4, cpu_count=8) == 2
+    assert default_pool_size(17, cpu_count=8) == 1
+    assert default_pool_size(cpu_count=8) == 8
+
+    config = os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py")
+    monkeypatch.setattr(os, "environ", {"GUNICORN_WORKERS": "3"})
+    monkeypatch.setattr(multiprocessing, "cpu_count", lambda: 8)
+    runpy.run_path(config)
+    assert os.environ["PASSWORD_HASH_WORKERS"] == "2"
+
+    monkeypatch.setattr(os, "environ", {"GUNICORN_WORKERS": "3", "PASSWORD_HASH_WORKERS": "1"})
+    runpy.run_path(config)
+    assert os.environ["PASSWORD_HASH_WORKERS"] == "1"
@@ -0,0 +1,45 @@
+import pytest
+from src.services.query_plans import QueryPlanError, plan_stages, verify_query_plans
+
+
+class FakeCollection:
+    """
+    Collection stub whose `find().explain()` returns a fixed winning plan.
+    """
+    name = "users"
+
+    def __init__(self, winning_plan):
+        self.winning_plan = winning_plan
+
+    def find(self, query):
+        return self
+
+    def explain(self):
+        return {"queryPlanner": {"winningPlan": self.winning_plan}}
+
+
+def test_plan_stages_collects_nested_stages():
+    """
+    Test that nested input stages are collected from a query plan.
+
+    Asserts:
+        Every stage name is returned in order.
+    """
+    plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "username_1"}}
+    assert plan_stages(plan) == ["FETCH", "IXSCAN"]
+
+
+def test_verify_query_plans_fails_on_collection_scan():
+    """
+    Test that a hot query without an index fails the check.
+
+    Asserts:
+        Indexed queries pass.
+        A collection scan raises QueryPlanError.
+    """
+    indexed = FakeCollection({"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}})
+    verify_query_plans([("user by username", indexed, {"username": ""})])
+
+    scanned = FakeCollection({"stage": "COLLSCAN"})
+    with pytest.raises(QueryPlanError):
+        verify_query_plans([("user by username", scanned, {"username": ""})])
@@ -0,0 +1,89 @@
+from src.services.recommendation_service import RecommendationService
+
+
+def build_recommender():
+    """
+    Build a recommender over a small catalog with catalog and TMDb-shaped records.
+
+    Returns:
+        RecommendationService: The populated recommender.
+    """
+    recommender = RecommendationService()
+    recommender.build([
+        {"id": 1, "title": "The Godfather", "genre": "Crime", "rating": 9.7},
+        {"id": 240, "title": "The Godfather Part II", "genres": [{"id": 80, "name": "Crime"}],
+         "overview": "The early life of Vito Corleone and his son Michael's grip on the family.",
+         "vote_average": 8.6},
+        {"id": 3, "title": "Interstellar", "genre": "Sci-Fi", "rating": 8.6},
+        {"id": 27205, "title": "Inception", "genres": [{"id": 878, "name": "Science Fiction"}, {"id": 878, "name": "Sci-Fi"}],
+         "overview": "A thief who steals secrets through dream-sharing technology.", "vote_average": 8.4},
+        {"id": 4, "title": "The Dark Knight", "genre": "Action", "rating": 9.0},
+    ])
+    return recommender
+
+
+def test_recommend_ranks_similar_movies_first():
+    """
+    Test that movies sharing genres and terms with the user's lists rank first.
+
+    Asserts:
+        The sequel of a favorite movie is the top recommendation.
+        Scores are sorted from best to worst.
+    """
+    recommender = build_recommender()
+
+    movies = recommender.recommend({"favorites": [1], "watched": [], "to_watch": []})
+
+    assert movies[0]["id"] == 240
+    scores = [movie["score"] for movie in movies]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_recommend_excludes_seen_movies():
+    """
+    Test that favorite and watched movies are never recommended.
+
+    Asserts:
+        Only movies outside the user's favorites and watched lists are returned.
+        Users without seeds get no recommendations.
+    """
+    recommender = build_recommender()
+
+    movies = recommender.recommend({"favorites": [3], "watched": [1, 240, 999]}, limit=10)
+
+    assert {movie["id"] for movie in movies} == {27205, 4}
+    assert recommender.recommend({"to_watch": [3]}) == []
+
+
+def test_recommend_many_matches_single_user_results():
+    """
+    Test that batched scoring gives the same results as scoring each user alone.
+
+    Asserts:
+        Each user's batched recommendations equal their individual ones.
+    """
+    recommender = build_recommender()
+    users_lists = [{"favorites": [1]}, {"watched": [3]}, {}]
+
+    batched = recommender.recommend_many(users_lists, limit=3)
+
+    assert batched == [recommender.recommend(lists, limit=3) for lists in users_lists]
+
+
+def test_add_movie_after_build():
+    """
+    Test that movies fetched after the build can be recommended.
+
+    Asserts:
+        The new movie is recommended for a user who likes the same genre.
+        Re-adding a movie replaces it instead of duplicating it.
+    """
+    recommender = build_recommender()
+    for movie_id in range(100, 120):
+        recommender.add({"id": movie_id, "title": f"Crime Story {movie_id}", "genre": "Crime"})
+    recommender.add({"id": 100, "title": "Crime Story", "genre": "Crime"})
+
+    movies = recommender.recommend({"favorites": [1]}, limit=30)
+
+    assert len(recommender) == 25
+    assert [movie["title"] for movie in movies].count("Crime Story") == 1
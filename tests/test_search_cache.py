@@ -0,0 +1,65 @@
+from src.services.search_cache import SearchCache, normalize_query
+
+
+def test_normalize_query():
+    """
+    Test that equivalent spellings of a query are normalized to the same key.
+
+    Asserts:
+        Case, whitespace and unicode compatibility forms are folded.
+    """
+    assert normalize_query("  The   GODFATHER ") == "the godfather"
+    assert normalize_query("Ｍｕｌａｎ") == normalize_query("mulan")
+
+
+def test_search_cache_hits_normalized_query():
+    """
+    Test that a repeated query with different spelling is served from the cache.
+
+    Asserts:
+        The cached results are returned.
+        The hit is counted.
+    """
+    cache = SearchCache()
+    cache.set("The Godfather", [{"id": 238, "title": "The Godfather"}])
+
+    assert cache.get("the  godfather") == [{"id": 238, "title": "The Godfather"}]
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_search_cache_reuses_complete_prefix():
+    """
+    Test that a refined query is answered by filtering a complete prefix entry.
+
+    Asserts:
+        Only the matching titles are returned.
+        Incomplete prefixes are not reused.
+    """
+    results = [
+        {"id": 238, "title": "The Godfather"},
+        {"id": 240, "title": "The Godfather Part II"},
+        {"id": 11, "title": "Godzilla"},
+    ]
+    cache = SearchCache(prefix_reuse=True)
+    cache.set("godf", results, complete=True)
+    cache.set("godz", results, complete=False)
+
+    assert [movie["id"] for movie in cache.get("godfather part")] == [240]
+    assert cache.get("godzilla") is None
+
+
+def test_search_cache_respects_memory_cap():
+    """
+    Test that the least recently used entries are evicted once over budget.
+
+    Asserts:
+        The oldest entry is evicted.
+        The estimated size stays within the budget.
+    """
+    cache = SearchCache(max_bytes=200)
+    for query in ("alien", "aliens", "alien 3"):
+        cache.set(query, [{"id": 1, "title": "x" * 40}])
+
+    assert cache.get("alien") is None
+    assert cache.get("alien 3") is not None
+    assert cache.size <= 200
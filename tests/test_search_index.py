@@ -0,0 +1,93 @@
+from src.app import db
+from src.services.movie_service import MovieService
+from src.services.search_index import SearchIndex
+
+
+def build_index():
+    """
+    Build a small index with catalog and TMDb-shaped records.
+
+    Returns:
+        SearchIndex: The populated index.
+    """
+    index = SearchIndex()
+    index.add_many([
+        {"id": 1, "title": "The Godfather", "genre": "Crime", "rating": 9.7},
+        {"id": 3, "title": "Interstellar", "genre": "Sci-Fi", "rating": 8.6},
+        {"id": 155, "title": "The Dark Knight", "genres": [{"id": 28, "name": "Action"}]},
+        {"id": 240, "title": "The Godfather Part II", "genres": [{"id": 80, "name": "Crime"}]},
+    ])
+    return index
+
+
+def test_search_index_ranks_and_matches_all_terms():
+    """
+    Test that results must match every query term and are ranked with BM25.
+
+    Asserts:
+        The closest title is ranked first.
+        Queries with an unmatched term return nothing.
+    """
+    index = build_index()
+
+    assert [movie["id"] for movie in index.search("godfather")] == [1, 240]
+    assert [movie["id"] for movie in index.search("godfather part")] == [240]
+    assert index.search("the matrix") == []
+
+
+def test_search_index_prefix_and_fuzzy_matching():
+    """
+    Test type-ahead prefixes and misspelled terms.
+
+    Asserts:
+        A partial last term matches by prefix.
+        A misspelled term matches through trigrams.
+    """
+    index = build_index()
+
+    assert [movie["id"] for movie in index.search("interst")] == [3]
+    assert [movie["id"] for movie in index.search("dark night")] == [155]
+
+
+def test_search_index_remove_prunes_terms():
+    """
+    Test that replacing and removing movies drops the terms nobody has anymore.
+
+    Asserts:
+        A replaced title is no longer found and its words leave the vocabulary and trigrams.
+        Words still used by another movie are kept.
+    """
+    index = build_index()
+    vocabulary = (set(index._terms), set(index._trigrams))
+
+    index.add({"id": 3, "title": "Tenet", "genre": "Sci-Fi"})
+    assert index.search("interstellar") == []
+    assert "interstellar" not in index._terms and "interstellar" not in index._postings
+    assert all("interstellar" not in terms for terms in index._trigrams.values())
+
+    index.remove(240)
+    assert [movie["id"] for movie in index.search("godfather")] == [1]
+    assert "part" not in index._terms and "godfather" in index._terms
+
+    index.add({"id": 3, "title": "Interstellar", "genre": "Sci-Fi"})
+    index.add({"id": 240, "title": "The Godfather Part II", "genres": [{"id": 80, "name": "Crime"}]})
+    assert (set(index._terms), set(index._trigrams)) == vocabulary
+    assert len(index._terms) == len(index._postings)
+
+
+def test_add_movie_updates_search_index():
+    """
+    Test that movies inserted through MovieService are searchable right away under their TMDb ID.
+
+    Asserts:
+        A movie with a TMDb ID is found by title, with that ID.
+        A catalog-only movie is not indexed, since its ID would open another TMDb movie.
+    """
+    db["movies_test"].delete_many({})
+    index = SearchIndex()
+    movie_service = MovieService(db["movies_test"], search_index=index)
+
+    movie_service.add_movie({"title": "Arrival", "genre": "Sci-Fi", "rating": 7.9, "tmdb_id": 329865})
+    movie_service.add_movie({"title": "Arrival Home", "genre": "Drama", "rating": 6.0})
+
+    assert [result["id"] for result in index.search("arrival")] == [329865]
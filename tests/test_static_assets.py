@@ -0,0 +1,64 @@
+import gzip
+import json
+from unittest.mock import patch
+from src.app import app
+from src.services.static_assets import STATIC_DIR, StaticAssets, build_assets
+
+
+def test_build_assets(tmp_path):
+    """
+    Test the asset build.
+
+    Asserts:
+        Every asset is copied under a name derived from its content.
+        Text assets get a gzip variant with the same content.
+        A rebuild of unchanged assets gives the same names.
+    """
+    source = tmp_path / "static"
+    (source / "js").mkdir(parents=True)
+    (source / "js" / "app.js").write_text("console.log('watchit');\n" * 50)
+    (source / "logo.png").write_bytes(b"\x89PNG")
+    (source / "notes.txt").write_text("not an asset")
+    output = tmp_path / "static" / "dist"
+
+    manifest = build_assets(str(source), str(output))
+
+    assert sorted(manifest["files"]) == ["js/app.js", "logo.png"]
+    built = manifest["files"]["js/app.js"]
+    assert built.startswith("js/app.") and built.endswith(".js")
+    assert gzip.decompress((output / (built + ".gz")).read_bytes()) == (source / "js" / "app.js").read_bytes()
+    assert manifest["encodings"][manifest["files"]["logo.png"]] == []
+    assert json.loads((output / "manifest.json").read_text()) == manifest
+    assert build_assets(str(source), str(output)) == manifest
+
+
+def test_built_assets_are_served_precompressed(tmp_path):
+    """
+    Test serving the built assets.
+
+    Asserts:
+        Pages link the fingerprinted assets.
+        The compressed variant accepted by the client is sent with immutable cache headers.
+        Assets outside the build are not found.
+    """
+    build_assets(STATIC_DIR, str(tmp_path / "dist"))
+    assets = StaticAssets(str(tmp_path / "dist"))
+    built = assets.built_name("js/base.js")
+
+    with patch("src.app.static_assets", assets), app.test_client() as client:
+        page = client.get("/login")
+        assert f"/assets/{built}".encode() in page.data
+        assert b"<script>" not in page.data
+
+        response = client.get(f"/assets/{built}", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.mimetype in ("application/javascript", "text/javascript")
+        assert "immutable" in response.headers["Cache-Control"]
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert b"getSessionState" in gzip.decompress(response.data)
+
+        plain = client.get(f"/assets/{built}")
+        assert "Content-Encoding" not in plain.headers
+        assert client.get("/assets/manifest.json").status_code == 404
+        assert client.get("/assets/js/base.js").status_code == 404
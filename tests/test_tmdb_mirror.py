@@ -0,0 +1,158 @@
+import gzip
+import json
+from datetime import date, timedelta
+from unittest.mock import patch
+from src.app import db
+from src.services.catalog_ingest import iter_records
+from src.services.tmdb_mirror import TMDbMirror, TMDbMirrorSync, changed_ids
+from src.services.tmdb_service import TMDbService
+
+
+def make_mirror():
+    """
+    Create an empty mirror on dedicated collections.
+    """
+    db["mirror_movies"].drop()
+    db["mirror_state"].drop()
+    mirror = TMDbMirror(db["mirror_movies"], state_collection=db["mirror_state"])
+    mirror.ensure_indexes()
+    return mirror
+
+
+def write_export(path, ids):
+    """
+    Write a daily ID export in the TMDb format: gzipped NDJSON.
+    """
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        for movie_id in ids:
+            file.write(json.dumps({"adult": False, "id": movie_id, "original_title": f"Original {movie_id}",
+                                   "popularity": movie_id / 10, "video": False}) + "\n")
+    return str(path)
+
+
+def fetch_details(movie_id):
+    return {"id": movie_id, "title": f"Localized {movie_id}", "overview": "Plot"}
+
+
+def test_sync_replays_export_and_changes(tmp_path):
+    """
+    Test a sync replayed from local export and changes files.
+
+    Asserts:
+        New movies are downloaded once and served from the mirror.
+        Reloading an export keeps the downloaded details and removes deleted movies.
+        Only the changed movies are downloaded again.
+    """
+    mirror = make_mirror()
+    service = TMDbService()
+    sync = TMDbMirrorSync(mirror, service, workers=2)
+
+    report = sync.sync_export(write_export(tmp_path / "day1.json.gz", [10, 11]), date(2024, 5, 1))
+    assert report["inserted"] == 2 and report["removed"] == 0
+    assert mirror.get(10) is None  # Not downloaded yet
+
+    with patch.object(service, "fetch_movie_details", side_effect=fetch_details) as mock_fetch:
+        assert sync.refresh() == {"refreshed": 2, "failed": 0}
+        assert sync.refresh() == {"refreshed": 0, "failed": 0}
+    assert mock_fetch.call_count == 2
+    assert mirror.get(10) == {"id": 10, "title": "Localized 10", "overview": "Plot", "adult": False,
+                              "original_title": "Original 10", "popularity": 1.0, "video": False}
+
+    # Movie 11 was deleted from TMDb and movie 12 added
+    report = sync.sync_export(write_export(tmp_path / "day2.json.gz", [10, 12]), date(2024, 5, 2))
+    assert (report["inserted"], report["updated"], report["removed"]) == (1, 1, 1)
+    assert mirror.get(10)["title"] == "Localized 10"
+    assert mirror.get(11) is None
+
+    changes = tmp_path / "changes.json"
+    changes.write_text(json.dumps({"results": [{"id": 10, "adult": False}, {"id": 99}], "page": 1, "total_pages": 1}))
+    assert sync.sync_changes(changed_ids(iter_records(str(changes))), until=date(2024, 5, 2)) == 1
+    assert mirror.get_state() == {"export_date": "2024-05-02", "changes_until": "2024-05-02"}
+
+    with patch.object(service, "fetch_movie_details", side_effect=fetch_details) as mock_fetch:
+        assert sync.refresh() == {"refreshed": 2, "failed": 0}
+    assert sorted(call.args[0] for call in mock_fetch.call_args_list) == [10, 12]
+
+
+def test_refresh_leaves_failures_stale():
+    """
+    Test that a movie failing to download does not stop the refresh.
+
+    Asserts:
+        The failure is counted once and the movie stays stale for the next sync.
+    """
+    mirror = make_mirror()
+    db["mirror_movies"].insert_many([{"id": i, "tmdb_id": i, "title": f"T{i}", "popularity": i} for i in (1, 2, 3)])
+    service = TMDbService()
+    sync = TMDbMirrorSync(mirror, service, batch_size=2)
+
+    def flaky(movie_id):
+        if movie_id == 3:
+            raise Exception("Error: 500 - Server Error")
+        return fetch_details(movie_id)
+
+    with patch.object(service, "fetch_movie_details", side_effect=flaky):
+        assert sync.refresh() == {"refreshed": 2, "failed": 1}
+    assert mirror.get_stale_ids(10) == [3]
+
+
+def test_sync_changes_reads_the_feed_in_windows():
+    """
+    Test that the changes feed is read from the last day applied, in periods TMDb accepts.
+
+    Asserts:
+        A month of changes is requested as windows of at most 14 days.
+        The last day applied is recorded.
+    """
+    mirror = make_mirror()
+    today = date(2024, 5, 31)
+    mirror.update_state(changes_until="2024-05-01")
+    service = TMDbService()
+    sync = TMDbMirrorSync(mirror, service)
+
+    with patch.object(service, "get_changed_movie_ids", return_value=iter([])) as mock_changes:
+        sync.sync_changes(until=today)
+
+    windows = [call.args for call in mock_changes.call_args_list]
+    assert windows[0][0] == date(2024, 5, 1) and windows[-1][1] == today
+    assert all(end - start <= timedelta(days=13) for start, end in windows)
+    assert mirror.get_state()["changes_until"] == "2024-05-31"
+
+
+def test_get_movie_details_reads_the_mirror_first():
+    """
+    Test that movie details are served from the mirror before calling TMDb.
+
+    Asserts:
+        A mirrored movie does not reach the API; an unknown one does.
+    """
+    mirror = make_mirror()
+    db["mirror_movies"].insert_one({"id": 500, "tmdb_id": 7, "title": "Mirrored", "details_synced_at": 1})
+    service = TMDbService(mirror=mirror)
+
+    with patch.object(service, "fetch_movie_details", side_effect=fetch_details) as mock_fetch:
+        assert service.get_movie_details(7) == {"id": 7, "title": "Mirrored"}
+        assert service.get_movie_details(8)["title"] == "Localized 8"
+    mock_fetch.assert_called_once_with(8)
+
+
+def test_iter_movies_reads_the_most_popular_synced_movies():
+    """
+    Test the bounded read of mirrored movies done at startup.
+
+    Asserts:
+        Only movies with details are read, most popular first, up to the limit.
+        Movies are keyed by their TMDb ID, not the catalog one.
+    """
+    mirror = make_mirror()
+    db["mirror_movies"].insert_many([
+        {"id": 1, "tmdb_id": 550, "title": "Fight Club", "popularity": 50, "details_synced_at": 1},
+        {"id": 2, "tmdb_id": 238, "title": "The Godfather", "popularity": 80, "details_synced_at": 1},
+        {"id": 3, "tmdb_id": 155, "title": "The Dark Knight", "popularity": 90, "details_synced_at": None},
+        {"id": 4, "tmdb_id": 13, "title": "Forrest Gump", "popularity": 10, "details_synced_at": 1},
+    ])
+
+    movies = list(mirror.iter_movies(limit=2, batch_size=1))
+
+    assert [(movie["id"], movie["title"]) for movie in movies] == [(238, "The Godfather"), (550, "Fight Club")]
+    assert all("tmdb_id" not in movie and "details_synced_at" not in movie for movie in movies)
@@ -0,0 +1,88 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from unittest.mock import patch
+from src.services.tmdb_service import TMDbService
+
+
+def test_get_movie_details_many_deduplicates_ids():
+    """
+    Test that duplicated IDs are fetched only once in a bulk request.
+
+    Asserts:
+        Every unique ID is requested exactly once.
+        The details are keyed by movie ID.
+    """
+    service = TMDbService()
+    with patch.object(service, "get_movie_details") as mock_get_movie_details:
+        mock_get_movie_details.side_effect = lambda movie_id: {"id": movie_id}
+
+        details = service.get_movie_details_many([1, 2, 1, 3, 2])
+
+        assert details == {1: {"id": 1}, 2: {"id": 2}, 3: {"id": 3}}
+        assert mock_get_movie_details.call_count == 3
+
+
+def test_get_movie_details_many_skips_failures():
+    """
+    Test that a failing movie does not break the whole batch.
+
+    Asserts:
+        The failing ID is left out of the result.
+        The remaining details are returned.
+    """
+    service = TMDbService()
+
+    def mock_response(movie_id):
+        if movie_id == 2:
+            raise Exception("Error: 404 - Not Found")
+        return {"id": movie_id}
+
+    with patch.object(service, "get_movie_details", side_effect=mock_response):
+        details = service.get_movie_details_many([1, 2, 3])
+
+    assert details == {1: {"id": 1}, 3: {"id": 3}}
+
+
+def test_session_retries_and_reuses_connections():
+    """
+    Test that the shared session retries throttled requests and keeps
+    its connection alive between calls.
+
+    Asserts:
+        The movie details are returned after a 429 response.
+        The retry is counted.
+        The second request reuses the pooled connection.
+    """
+    responses = [(429, b"{}"), (200, b'{"id": 1}'), (200, b'{"id": 2}')]
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, body = responses.pop(0)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        with patch("src.services.tmdb_service.TMDB_BASE_URL", base_url):
+            service = TMDbService(backoff_factor=0)
+            assert service.get_movie_details(1) == {"id": 1}
+            assert service.get_movie_details(2) == {"id": 2}
+
+        stats = service.get_stats()
+        assert stats["retries"] == 1
+        assert stats["pool_misses"] == 1
+        assert stats["pool_hits"] == 2
+    finally:
+        server.shutdown()
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from src.app import db
+from src.services.token_blocklist import BloomFilter, TokenBlocklist
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """
+    Test that every added key is reported as present.
+
+    Asserts:
+        All added keys are found.
+        Most missing keys are not.
+    """
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+
+    assert all(f"jti-{i}" in bloom for i in range(1000))
+    assert sum(f"other-{i}" in bloom for i in range(1000)) < 50
+
+
+def test_revocations_are_shared_between_processes():
+    """
+    Test that a token revoked by one process is rejected by another after a refresh.
+
+    Asserts:
+        Unrevoked tokens are accepted.
+        The revocation is stored with the token expiry.
+        The other process sees the revocation.
+    """
+    db["revoked_tokens_test"].delete_many({})
+    first = TokenBlocklist(db["revoked_tokens_test"], refresh_interval=0)
+    second = TokenBlocklist(db["revoked_tokens_test"], refresh_interval=0)
+    assert not second.is_revoked("abc")
+
+    expires_at = int(datetime(2030, 1, 1, tzinfo=timezone.utc).timestamp())
+    first.add("abc", expires_at)
+
+    assert first.is_revoked("abc")
+    assert second.is_revoked("abc")
+    assert not second.is_revoked("def")
+    stored = db["revoked_tokens_test"].find_one({"_id": "abc"})
+    assert stored["expires_at"].replace(tzinfo=timezone.utc) == datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+def test_false_positives_are_not_cached():
+    """
+    Test a token hitting the Bloom filter without being revoked, then revoked by another process.
+
+    Asserts:
+        The false positive is accepted.
+        The later revocation is seen before the next refresh of the filter.
+    """
+    db["revoked_tokens_test"].delete_many({})
+    first = TokenBlocklist(db["revoked_tokens_test"], refresh_interval=3600)
+    second = TokenBlocklist(db["revoked_tokens_test"], refresh_interval=3600)
+    first.is_revoked("warm-up")
+    first.filter.add("abc")  # Same outcome as a false positive
+
+    assert not first.is_revoked("abc")
+    second.add("abc")
+    assert first.is_revoked("abc")
@@ -0,0 +1,91 @@
+from src.app import db
+from src.services.user_service import UserService
+
+
+def make_service():
+    """
+    Create the service over clean collections with one user.
+
+    Returns:
+        UserService: The service.
+    """
+    for name in ("users", "list_entries", "custom_lists"):
+        db[name].delete_many({})
+    db["counters"].delete_many({"_id": "shared_lists"})
+    service = UserService(db["users"])
+    service.ensure_indexes()
+    service.create_user("testuser", "password123")
+    return service
+
+
+def test_lists_are_stored_apart_from_the_user():
+    """
+    Test that list entries live in their own collection.
+
+    Asserts:
+        The user document holds no lists.
+        Membership flags and counts are read from the entries.
+        The list version is increased by changes only.
+    """
+    service = make_service()
+    assert service.get_list_version("testuser") == 0
+    service.add_movies_to_lists("testuser", {"watched": [1, 2, 3], "favorites": [2]})
+    service.add_movie_to_list("testuser", 1, "watched")
+    assert service.get_list_version("testuser") == 1
+    assert service.get_list_version("nobody") is None
+
+    assert "lists" not in service.get_user("testuser")
+    assert db["list_entries"].count_documents({"username": "testuser"}) == 4
+    assert service.get_list_status("testuser", 2) == {"favorites": True, "watched": True, "to_watch": False}
+    assert service.get_list_counts("testuser", ["watched", "to_watch"]) == {"watched": 3, "to_watch": 0}
+
+
+def test_custom_lists():
+    """
+    Test shared and per-user custom lists.
+
+    Asserts:
+        Shared lists are available to every user, private ones only to their owner.
+        Duplicated and invalid names are rejected, also across shared and private lists.
+        Creating a shared list changes every user's list version with a single write.
+        Movies can be added to a custom list the user can use, and only then.
+    """
+    service = make_service()
+    service.create_user("other", "password123")
+
+    versions = {username: service.get_list_version(username) for username in ("testuser", "other")}
+    assert service.create_custom_list("classics") == ({"message": "Custom list classics created"}, 201)
+    assert all(service.get_list_version(username) > versions[username] for username in versions)
+    assert [user.get("list_version", 0) for user in db["users"].find()] == [0, 0]
+    assert service.create_custom_list("road trip", owner="testuser")[1] == 201
+    assert service.create_custom_list("classics", owner="testuser")[1] == 409
+    assert service.create_custom_list("road trip")[1] == 409
+    assert service.create_custom_list("watched")[1] == 409
+    assert service.create_custom_list(" ")[1] == 400
+    assert service.create_custom_list("x" * 51)[1] == 400
+
+    assert service.get_list_names("testuser") == ["favorites", "watched", "to_watch", "classics", "road trip"]
+    assert service.get_list_names("other") == ["favorites", "watched", "to_watch", "classics"]
+
+    assert service.add_movie_to_list("testuser", 550, "road trip")["changed"] is True
+    assert service.add_movie_to_list("other", 550, "road trip") == {"error": "Invalid list name 'road trip'"}
+    assert service.get_list_page("testuser", "road trip") == {"movie_ids": [550], "next": None}
+    assert service.get_list_status("testuser", 550)["road trip"] is True
+
+
+def test_migrate_embedded_lists():
+    """
+    Test moving the lists embedded by earlier versions into the entries collection.
+
+    Asserts:
+        Every movie is moved, in order, and the embedded lists are removed.
+        Running the migration again does nothing.
+    """
+    service = make_service()
+    db["users"].insert_one({"username": "legacy", "password_hash": "x", "role": "user",
+                            "lists": {"favorites": [5, 3], "watched": [3, 9, 3], "to_watch": []}})
+
+    assert service.migrate_embedded_lists() == {"users": 1, "entries": 4}
+    assert "lists" not in db["users"].find_one({"username": "legacy"})
+    assert service.get_lists("legacy") == {"favorites": [5, 3], "watched": [3, 9], "to_watch": []}
+    assert service.migrate_embedded_lists() == {"users": 0, "entries": 0}